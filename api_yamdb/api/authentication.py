@@ -0,0 +1,112 @@
+"""
+JWT-аутентификация без чтения таблицы пользователей.
+
+TokenView кладет в access-токен username, role и is_superuser, и по
+этим claims собирается users.TokenUser: права и авторство проверяются
+без запроса к users_user. Разобранные токены держатся в LRU-кэше с TTL,
+повторный запрос с тем же токеном не проверяет подпись заново. Токены
+без claims по-прежнему ищут пользователя в базе.
+
+Роль в токене не меняется до его истечения, поэтому для чтения смена
+роли или блокировка вступают в силу не позже ACCESS_TOKEN_LIFETIME.
+Запросы на запись загружают пользователя из базы: удаленный или
+неактивный пользователь получает 401, а права считаются по текущей роли.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import TokenUser
+
+CLAIMS = ('username', 'role', 'is_superuser')
+
+
+def access_token_for(user):
+    token = AccessToken.for_user(user)
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def token_user(token):
+    user = TokenUser(
+        username=token['username'],
+        role=token['role'],
+        is_superuser=token['is_superuser'],
+        is_active=True,
+        **{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]},
+    )
+    user._state.adding = False
+    return user
+
+
+class TokenCache:
+    """
+    LRU на TOKEN_CACHE_SIZE токенов. Запись живет TOKEN_CACHE_TTL
+    секунд, но не дольше самого токена.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        expires_at = min(self.clock() + settings.TOKEN_CACHE_TTL, expires_at)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None or request.method in SAFE_METHODS:
+            return result
+        user, validated_token = result
+        if isinstance(user, TokenUser):
+            user = super().get_user(validated_token)
+        return user, validated_token
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, token, token['exp'])
+        return token
+
+    def get_user(self, validated_token):
+        if all(claim in validated_token for claim in CLAIMS):
+            return token_user(validated_token)
+        return super().get_user(validated_token)
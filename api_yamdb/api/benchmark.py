@@ -0,0 +1,450 @@
+"""
+Прогон эндпоинтов API с бюджетами по времени, SQL-запросам и памяти.
+
+Сценарии строятся по маршрутам api.urls.router_v1: для каждого вьюсета
+list, retrieve, create, GET-действия и фильтры из FILTERS. Вложенные
+маршруты отзывов и комментариев получают id самого популярного
+произведения и его отзыва. Запросы идут через django.test.Client
+с JWT администратора, как у настоящего клиента.
+
+Каждый сценарий выполняется в два прохода: первый измеряет время
+и число запросов к базе, второй под tracemalloc — пик выделенной
+памяти на запрос. Трассировка замедляет код в разы, поэтому время
+в этом проходе не учитывается. Кэш ответов по умолчанию очищается
+перед каждым запросом, чтобы измерялся полный путь, а не попадание.
+Ограничители частоты работают, но с корзинами в отдельном файле и
+с запасом, которого хватает на весь прогон.
+"""
+import gc
+import itertools
+import json
+import math
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from statistics import median
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, connections
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.settings import api_settings
+
+from reviews.models import Comment, Review, Title
+from users.models import Roles, User
+from users.signup import register
+
+from .authentication import access_token_for
+from .cache import get_cache
+from .urls import router_v1
+
+API_PREFIX = '/api/v1/'
+BENCH_USERNAME = 'bench-admin'
+DEFAULT_REQUESTS = 30
+WARMUP_REQUESTS = 3
+ALLOCATION_WARMUP_REQUESTS = 2
+ALLOCATION_REQUESTS = 9
+DEFAULT_TOLERANCE = 0.5
+# Изменения меньше этих порогов — шум измерения, а не регрессия.
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_ALLOCATION_DELTA_KB = 16.0
+BULK_TITLES = 10
+BENCH_THROTTLE_RATE = '1000000/s'
+
+# Строки запроса фильтров по basename маршрута. Слаги и имена
+# совпадают с reviews.synthetic.
+FILTERS = {
+    'title': {
+        'genre': 'genre=genre-1,genre-2',
+        'genre_all': 'genre=genre-1,genre-2&genre_match=all',
+        'category_year': 'category=category-1&year=2000',
+        'name': 'name=ночь',
+        'cursor': 'pagination=cursor',
+    },
+    'genre': {'search': 'search=Дра'},
+    'category': {'search': 'search=Фил'},
+    'users': {'search': 'search=user1'},
+    'review': {'cursor': 'pagination=cursor'},
+    'comment': {'cursor': 'pagination=cursor'},
+}
+
+
+def title_payload(number, targets):
+    return {
+        'name': f'Бенчмарк {number}',
+        'year': 2000,
+        'category': 'category-1',
+        'genre': ['genre-1', 'genre-2'],
+    }
+
+
+# Тела POST-запросов по имени сценария. number уникален в пределах
+# сценария, поэтому уникальные поля не повторяются.
+PAYLOADS = {
+    'users.create': lambda number, targets: {
+        'username': f'bench{number}', 'email': f'bench{number}@yamdb.fake',
+    },
+    'title.create': title_payload,
+    'title.bulk': lambda number, targets: [
+        title_payload(number * BULK_TITLES + index, targets)
+        for index in range(BULK_TITLES)
+    ],
+    'genre.create': lambda number, targets: {
+        'name': f'Жанр {number}', 'slug': f'bench-genre-{number}',
+    },
+    'category.create': lambda number, targets: {
+        'name': f'Категория {number}', 'slug': f'bench-category-{number}',
+    },
+    'review.create': lambda number, targets: {
+        'text': 'Отзыв из бенчмарка.', 'score': 7,
+    },
+    'comment.create': lambda number, targets: {
+        'text': 'Комментарий из бенчмарка.',
+    },
+}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Targets:
+    """Объекты, к которым обращаются detail- и вложенные маршруты."""
+
+    def __init__(self):
+        # Самое популярное произведение среди тех, у отзывов которых
+        # есть комментарии: вложенные маршруты используют одни id.
+        review = Review.objects.filter(comments__isnull=False).order_by(
+            '-title__review_count', 'title_id', 'id'
+        ).select_related('title').first()
+        if review is None:
+            raise BenchmarkError('В базе нет отзыва с комментарием.')
+        title = review.title
+        comment = Comment.objects.filter(review=review).order_by('id').first()
+        self.title_id = title.id
+        self.review_id = review.id
+        self.lookups = {
+            'users': User.objects.order_by('id').first().username,
+            'title': title.id,
+            'review': review.id,
+            'comment': comment.id,
+        }
+        # Администратор бенчмарка новый, поэтому отзыва на эти
+        # произведения у него еще нет.
+        self.free_titles = list(
+            Title.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def fill(self, prefix):
+        """Подставляет id в именованные группы регулярного префикса."""
+        return re.sub(
+            r'\(\?P<(\w+)>[^)]*\)',
+            lambda match: str(getattr(self, match.group(1))),
+            prefix,
+        )
+
+
+class Scenario:
+
+    def __init__(self, name, method, url, payload=None,
+                 expected=200):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.payload = payload
+        self.expected = expected
+
+    def send(self, client, number, targets):
+        url = self.url(number) if callable(self.url) else self.url
+        if self.method == 'get':
+            response = client.get(url)
+        else:
+            response = client.post(
+                url,
+                data=json.dumps(self.payload(number, targets)),
+                content_type='application/json',
+            )
+        if response.status_code != self.expected:
+            raise BenchmarkError(
+                f'{self.name}: {self.method.upper()} {url} вернул '
+                f'{response.status_code} вместо {self.expected}.'
+            )
+        return response
+
+
+def review_url(targets):
+    """Каждый отзыв — на новое произведение: второй отзыв автора запрещен."""
+    def url(number):
+        return f'{API_PREFIX}titles/{targets.free_titles[number]}/reviews/'
+    return url
+
+
+def viewset_scenarios(prefix, viewset, basename, targets):
+    base = API_PREFIX + targets.fill(prefix) + '/'
+    scenarios = []
+    if hasattr(viewset, 'list'):
+        scenarios.append(Scenario(f'{basename}.list', 'get', base))
+        for name, query in FILTERS.get(basename, {}).items():
+            scenarios.append(
+                Scenario(f'{basename}.list[{name}]', 'get', f'{base}?{query}')
+            )
+    if hasattr(viewset, 'retrieve') and basename in targets.lookups:
+        scenarios.append(Scenario(
+            f'{basename}.retrieve', 'get',
+            f'{base}{targets.lookups[basename]}/',
+        ))
+    if hasattr(viewset, 'create') and f'{basename}.create' in PAYLOADS:
+        url = review_url(targets) if basename == 'review' else base
+        scenarios.append(Scenario(
+            f'{basename}.create', 'post', url,
+            PAYLOADS[f'{basename}.create'], expected=201,
+        ))
+    for action in viewset.get_extra_actions():
+        if action.detail:
+            continue
+        name = f'{basename}.{action.__name__}'
+        url = f'{base}{action.url_path}/'
+        if 'get' in action.mapping:
+            scenarios.append(Scenario(name, 'get', url))
+        elif 'post' in action.mapping and name in PAYLOADS:
+            scenarios.append(
+                Scenario(name, 'post', url, PAYLOADS[name], expected=201)
+            )
+    return scenarios
+
+
+def build_scenarios(targets):
+    scenarios = []
+    for prefix, viewset, basename in router_v1.registry:
+        scenarios.extend(
+            viewset_scenarios(prefix, viewset, basename, targets)
+        )
+    return scenarios
+
+
+def bench_client():
+    admin, _ = User.objects.get_or_create(
+        username=BENCH_USERNAME,
+        defaults={'email': f'{BENCH_USERNAME}@yamdb.fake',
+                  'role': Roles.ADMIN},
+    )
+    return Client(
+        HTTP_AUTHORIZATION=f'Bearer {access_token_for(admin)}'
+    )
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def traced_peak(call):
+    """
+    Пик выделений за вызов, КБ. Мусор прошлых запросов собирается
+    заранее, а сборщик на время вызова выключен: иначе сборка посреди
+    запроса освобождает чужую память и пик выходит то вдвое меньше,
+    то нет.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call()
+        return (tracemalloc.get_traced_memory()[1] - before) / 1024
+    finally:
+        gc.enable()
+
+
+def measure(scenario, client, targets, requests, warm_cache=False):
+    """Время, запросы к базе и память одного сценария."""
+    numbers = itertools.count()
+    cache = get_cache()
+
+    def call():
+        scenario.send(client, next(numbers), targets)
+
+    def reset():
+        # Очистка кэша в замер не входит: меряется только сам запрос.
+        if not warm_cache:
+            cache.clear()
+
+    for _ in range(WARMUP_REQUESTS):
+        reset()
+        call()
+    timings, queries = [], []
+    for _ in range(requests):
+        reset()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+    allocations = []
+    tracemalloc.start()
+    try:
+        # Первые запросы под tracemalloc прогревают его собственные
+        # структуры и в выборку не идут.
+        for index in range(ALLOCATION_WARMUP_REQUESTS + ALLOCATION_REQUESTS):
+            reset()
+            allocated = traced_peak(call)
+            if index >= ALLOCATION_WARMUP_REQUESTS:
+                allocations.append(allocated)
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': max(queries),
+        'alloc_kb': round(median(allocations), 1),
+    }
+
+
+def run_benchmarks(requests=DEFAULT_REQUESTS, warm_cache=False,
+                   only=None):
+    """Прогоняет сценарии по текущей базе, возвращает {имя: метрики}."""
+    targets = Targets()
+    client = bench_client()
+    scenarios = build_scenarios(targets)
+    needed = (
+        WARMUP_REQUESTS + requests + ALLOCATION_WARMUP_REQUESTS
+        + ALLOCATION_REQUESTS
+    )
+    if len(targets.free_titles) < needed:
+        raise BenchmarkError(
+            f'Для review.create нужно хотя бы {needed} произведений.'
+        )
+    results = {}
+    with generous_throttles():
+        for scenario in scenarios:
+            if only and not any(part in scenario.name for part in only):
+                continue
+            results[scenario.name] = measure(
+                scenario, client, targets, requests, warm_cache
+            )
+    return results
+
+
+def exceeds(value, base, tolerance, min_delta):
+    return value > base * (1 + tolerance) and value - base > min_delta
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Список регрессий относительно baseline. Число запросов к базе
+    детерминировано и сравнивается строго, время и память — с допуском.
+    Хвост распределения шумнее медианы, поэтому допуск для p95 вдвое шире.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if metrics['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов к базе {metrics["queries"]} '
+                f'(было {base["queries"]})'
+            )
+        for key, share in (('p50_ms', tolerance), ('p95_ms', tolerance * 2)):
+            if exceeds(metrics[key], base[key], share, MIN_LATENCY_DELTA_MS):
+                regressions.append(
+                    f'{name}: {key[:3]} {metrics[key]} мс '
+                    f'(было {base[key]} мс)'
+                )
+        if exceeds(metrics['alloc_kb'], base['alloc_kb'], tolerance,
+                   MIN_ALLOCATION_DELTA_KB):
+            regressions.append(
+                f'{name}: память {metrics["alloc_kb"]} КБ '
+                f'(было {base["alloc_kb"]} КБ)'
+            )
+    return regressions
+
+
+@contextmanager
+def generous_throttles():
+    """Свой файл корзин и частоты, которые прогон не исчерпает."""
+    rates = {
+        scope: BENCH_THROTTLE_RATE
+        for scope in api_settings.DEFAULT_THROTTLE_RATES
+    }
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+        THROTTLE_DB_PATH=os.path.join(directory, 'throttle.sqlite3'),
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates,
+        },
+    ):
+        yield
+
+
+@contextmanager
+def temporary_database(name=None):
+    """
+    Тестовая база на время прогона, рабочие данные не затрагиваются.
+    name — файл SQLite вместо базы в памяти (нужен для WAL).
+    """
+    setup_test_environment()
+    if name:
+        connection.settings_dict['TEST']['NAME'] = name
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def signup_worker(index, signups, use_upsert):
+    timings, errors = [], {}
+    try:
+        for number in range(signups):
+            username = f'signup{index}x{number}'
+            start = time.perf_counter()
+            try:
+                register(username, f'{username}@yamdb.fake',
+                         use_upsert=use_upsert)
+            except (IntegrityError, DatabaseError) as error:
+                name = type(error).__name__
+                errors[name] = errors.get(name, 0) + 1
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+def signup_throughput(threads, signups, use_upsert=None):
+    """
+    Регистрации из threads потоков, по signups в каждом, тем же путем,
+    что и SignUp: пользователь с кодом и письмо в очереди одной
+    транзакцией. Возвращает скорость, задержки и ошибки по типам.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(
+            signup_worker, range(threads), [signups] * threads,
+            [use_upsert] * threads,
+        ))
+    elapsed = time.perf_counter() - start
+    timings = [value for worker, _ in results for value in worker]
+    errors = {}
+    for _, worker_errors in results:
+        for name, count in worker_errors.items():
+            errors[name] = errors.get(name, 0) + count
+    return {
+        'signups': len(timings),
+        'seconds': round(elapsed, 3),
+        'per_second': round(len(timings) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'errors': errors,
+    }
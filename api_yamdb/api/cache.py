@@ -0,0 +1,232 @@
+"""
+Кэш ответов для читающих эндпоинтов каталога.
+
+Ключ ответа состоит из версии группы (titles, genres, categories),
+версии объекта для detail-запросов и хэша пути с отсортированной
+строкой запроса (в нее входит номер страницы). Сигналы моделей
+увеличивают версии после коммита, и старые записи просто перестают
+читаться, а затем вытесняются по таймауту. Ответы лежат в кэше Django
+с алиасом API_CACHE_ALIAS и могут быть своими у каждого воркера, а
+версии — в общем файле CACHE_VERSIONS_DB_PATH (api.localstore), так
+что запись в одном воркере сбрасывает кэш всех остальных. Версии,
+увеличенные в одной транзакции, пишутся в файл один раз после коммита.
+Если файл версий недоступен, запрос идет мимо кэша, а ошибка пишется
+в лог: кэш не должен ронять API.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .localstore import LocalStore
+from .metrics import record_cache
+
+TITLES = 'titles'
+GENRES = 'genres'
+CATEGORIES = 'categories'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS versions (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+'''
+INSERT_MISSING = 'INSERT OR IGNORE INTO versions (key, value) VALUES (?, ?)'
+INCREMENT = (
+    'INSERT INTO versions (key, value) VALUES (?, ?) '
+    'ON CONFLICT (key) DO UPDATE SET value = value + 1'
+)
+
+logger = logging.getLogger(__name__)
+versions_store = LocalStore('CACHE_VERSIONS_DB_PATH', SCHEMA)
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+class CacheStats:
+    """Счетчики попаданий и промахов кэша ответов в этом процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+        record_cache(hit=True)
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+        record_cache(hit=False)
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def snapshot(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def version_key(group, pk=None):
+    if pk is None:
+        return f'api:v:{group}'
+    return f'api:v:{group}:{pk}'
+
+
+def initial_version():
+    # Версия, потерянная вместе с файлом, начнется с текущего времени
+    # и не совпадет с версиями уже закэшированных ответов.
+    return int(time.time() * 1000)
+
+
+def read_versions(keys):
+    placeholders = ', '.join(['?'] * len(keys))
+    return dict(versions_store.read(
+        f'SELECT key, value FROM versions WHERE key IN ({placeholders})',
+        keys,
+    ))
+
+
+def get_versions(keys):
+    versions = read_versions(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        versions_store.write(
+            INSERT_MISSING, [(key, initial_version()) for key in missing]
+        )
+        versions.update(read_versions(missing))
+    return [versions[key] for key in keys]
+
+
+class PendingBumps:
+    """Версии, которые увеличатся после коммита текущей транзакции."""
+
+    def __init__(self):
+        self.keys = {}
+
+    def __call__(self):
+        try:
+            versions_store.write(INCREMENT, [
+                (key, initial_version()) for key in self.keys
+            ])
+        except sqlite3.Error as error:
+            logger.error(
+                'Не удалось увеличить версии кэша %s: %s',
+                ', '.join(self.keys), error,
+            )
+
+
+def bump(group, pk=None):
+    """
+    Делает недействительными закэшированные ответы группы или объекта.
+    Версия растет после коммита: иначе другой воркер успел бы положить
+    в кэш старые данные под новой версией. Повторы ключа в одной
+    транзакции (каскадное удаление жанра) сливаются в одно увеличение.
+    """
+    key = version_key(group, pk)
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_cache_bumps', None)
+    # Откат снимает колбэк из run_on_commit, и его ключи теряются вместе
+    # с ним; вне транзакции колбэк выполняется сразу.
+    if pending is not None and any(
+        entry[1] is pending for entry in connection.run_on_commit
+    ):
+        pending.keys[key] = None
+        return
+    pending = connection.pending_cache_bumps = PendingBumps()
+    pending.keys[key] = None
+    transaction.on_commit(pending)
+
+
+def invalidate(*groups):
+    for group in groups:
+        bump(group)
+
+
+def invalidate_titles(*title_ids):
+    """Сбрасывает списки произведений и карточки перечисленных."""
+    bump(TITLES)
+    for title_id in title_ids:
+        bump(TITLES, title_id)
+
+
+def request_fingerprint(request):
+    """Хост входит в ключ: ссылки next и previous в ответе абсолютные."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return hashlib.sha1(
+        f'{request.get_host()}{request.path}?{query}'.encode()
+    ).hexdigest()
+
+
+def response_key(group, request, pk=None):
+    keys = [version_key(group)]
+    if pk is not None:
+        keys.append(version_key(group, pk))
+    versions = '.'.join(str(version) for version in get_versions(keys))
+    return f'api:r:{group}:{versions}:{request_fingerprint(request)}'
+
+
+class ResponseCacheMixin:
+    """Отдает закэшированные данные ответа или кэширует новые."""
+    cache_group = None
+    cache_header = 'X-Cache'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        try:
+            key = response_key(
+                self.cache_group, request, kwargs.get(self.lookup_field)
+            )
+        except sqlite3.Error as error:
+            logger.warning('Кэш ответов пропущен: %s', error)
+            response = handler(request, *args, **kwargs)
+            response[self.cache_header] = 'BYPASS'
+            return response
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            stats.hit()
+            response = Response(data)
+            response[self.cache_header] = 'HIT'
+            return response
+        stats.miss()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response[self.cache_header] = 'MISS'
+        return response
+
+
+class CachedListMixin(ResponseCacheMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(ResponseCacheMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,97 @@
+"""
+Условные GET-запросы (If-None-Match / If-Modified-Since).
+
+Валидаторы берутся из дешевых источников — версии и даты изменения
+произведения или общей версии группы titles из api.cache, — поэтому
+ответ 304 отдается без выборки объектов и без сериализаторов. Все
+валидаторы одинаковы во всех воркерах.
+"""
+import hashlib
+import logging
+import sqlite3
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from reviews.models import Title
+from .cache import TITLES, get_versions, request_fingerprint, version_key
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(request, *parts):
+    """ETag зависит от формата ответа и строки запроса."""
+    raw = ':'.join(str(part) for part in parts + (
+        request.accepted_media_type, request_fingerprint(request)
+    ))
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def title_validators(request, title_id):
+    """
+    ETag и Last-Modified по версии и дате изменения произведения.
+    Отзывы и комментарии меняют версию своего произведения, поэтому
+    валидаторы годятся и для вложенных эндпоинтов.
+    """
+    validators = Title.objects.filter(pk=title_id).values_list(
+        'version', 'modified'
+    ).first()
+    if validators is None:
+        return None, None
+    version, modified = validators
+    return make_etag(request, 'title', title_id, version, modified), modified
+
+
+def titles_list_validators(request):
+    """
+    ETag списка по версии группы titles: ее увеличивает любая запись,
+    меняющая списки произведений, а читается она из общего файла без
+    запроса к базе. Last-Modified не отдается.
+    """
+    try:
+        version, = get_versions([version_key(TITLES)])
+    except sqlite3.Error as error:
+        logger.warning('ETag списка произведений пропущен: %s', error)
+        return None, None
+    return make_etag(request, 'titles', version), None
+
+
+class ConditionalGetMixin:
+
+    def get_validators(self, request, *args, **kwargs):
+        """Возвращает пару (etag, last_modified) или (None, None)."""
+        return None, None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        timestamp = last_modified and int(last_modified.timestamp())
+        if etag or timestamp:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is not None:
+                return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if etag:
+                response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,66 @@
+from rest_framework.relations import (
+    MANY_RELATION_KWARGS,
+    ManyRelatedField,
+    SlugRelatedField,
+)
+
+
+class ManySlugRelatedField(ManyRelatedField):
+    """Список слагов, который разрешается одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.to_internal_values(data)
+
+
+class BulkSlugRelatedField(SlugRelatedField):
+    """
+    SlugRelatedField, который при many=True ищет все объекты
+    одним запросом slug__in вместо отдельного SELECT на каждый слаг.
+    Если в context['resolved_slugs'][модель] заранее переданы объекты
+    по слагам (массовая загрузка), запросов не будет вовсе.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManySlugRelatedField(**list_kwargs)
+
+    def get_resolved(self):
+        return self.context.get('resolved_slugs', {}).get(self.queryset.model)
+
+    def to_internal_value(self, data):
+        resolved = self.get_resolved()
+        if resolved is None:
+            return super().to_internal_value(data)
+        if str(data) not in resolved:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+        return resolved[str(data)]
+
+    def to_internal_values(self, data):
+        slugs = []
+        for value in data:
+            if not isinstance(value, (str, int)) or isinstance(value, bool):
+                self.fail('invalid')
+            slugs.append(str(value))
+        slugs = list(dict.fromkeys(slugs))
+        found = self.get_resolved()
+        if found is None:
+            found = {
+                getattr(obj, self.slug_field): obj
+                for obj in self.get_queryset().filter(
+                    **{f'{self.slug_field}__in': slugs}
+                )
+            }
+        for slug in slugs:
+            if slug not in found:
+                self.fail(
+                    'does_not_exist', slug_name=self.slug_field, value=slug
+                )
+        return [found[slug] for slug in slugs]
@@ -1,13 +1,37 @@
 from django_filters import rest_framework as filters
 
 from reviews.models import Title
+from reviews.search import search_titles
 
 
 class TitleFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
-    genre = filters.CharFilter(field_name='genre__slug')
+    name = filters.CharFilter(method='filter_name')
+    genre = filters.CharFilter(method='filter_genre')
+    genre_match = filters.ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')),
+        method='filter_genre_match',
+    )
     category = filters.CharFilter(field_name='category__slug')
 
     class Meta:
         model = Title
-        fields = ('name', 'category', 'genre', 'year')
+        fields = ('name', 'category', 'genre', 'genre_match', 'year')
+
+    def filter_name(self, queryset, name, value):
+        """Поиск по подстроке через FTS-индекс, по релевантности."""
+        return search_titles(queryset, value)
+
+    def filter_genre(self, queryset, name, value):
+        """
+        Несколько жанров через запятую: ?genre=drama,comedy.
+        По умолчанию подходит любой из жанров, с genre_match=all — все.
+        """
+        slugs = [slug.strip() for slug in value.split(',') if slug.strip()]
+        if not slugs:
+            return queryset
+        match_all = self.form.cleaned_data.get('genre_match') == 'all'
+        return queryset.filter_genres(slugs, match_all=match_all)
+
+    def filter_genre_match(self, queryset, name, value):
+        """Режим сопоставления учитывается в filter_genre."""
+        return queryset
@@ -0,0 +1,88 @@
+"""
+Общее для процессов хранилище в локальном файле SQLite.
+
+Счетчики метрик должны складываться со всех воркеров одного сервера,
+а ходить за ними в основную базу или во внешний сервис дорого. Файл
+SQLite в режиме WAL дает атомарный UPSERT из любого процесса, читатели
+не блокируют писателя. Соединение открывается на поток и пересоздается
+после fork и при смене пути в настройках.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+def set_busy_timeout(connection, seconds):
+    connection.execute(f'PRAGMA busy_timeout = {int(seconds * 1000)}')
+
+
+class LocalStore:
+
+    def __init__(self, path_setting, schema):
+        self.path_setting = path_setting
+        self.schema = schema
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        return str(getattr(settings, self.path_setting))
+
+    def connection(self):
+        local = self._local
+        key = (os.getpid(), self.path)
+        if getattr(local, 'key', None) != key:
+            if getattr(local, 'connection', None) is not None:
+                local.connection.close()
+            local.connection = self.connect(key[1])
+            local.key = key
+        return local.connection
+
+    def connect(self, path):
+        connection = sqlite3.connect(
+            path, timeout=settings.LOCAL_STORE_TIMEOUT,
+            isolation_level=None, check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(self.schema)
+        return connection
+
+    @contextmanager
+    def transaction(self, timeout=None):
+        """
+        Транзакция с блокировкой на запись, отдает соединение.
+        timeout — сколько секунд ждать чужую блокировку вместо
+        LOCAL_STORE_TIMEOUT; 0 — не ждать, сразу sqlite3.OperationalError.
+        """
+        connection = self.connection()
+        if timeout is not None:
+            set_busy_timeout(connection, timeout)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+        finally:
+            if timeout is not None:
+                set_busy_timeout(connection, settings.LOCAL_STORE_TIMEOUT)
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def write(self, sql, rows, timeout=None):
+        """executemany в одной транзакции, см. transaction()."""
+        with self.transaction(timeout) as connection:
+            connection.executemany(sql, rows)
+
+    def read(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    def execute(self, sql, params=()):
+        """
+        Один запрос в режиме автокоммита, например UPSERT ... RETURNING:
+        он атомарен сам по себе и обходится без BEGIN и COMMIT.
+        """
+        return self.connection().execute(sql, params).fetchall()
@@ -0,0 +1,117 @@
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import (
+    DEFAULT_REQUESTS,
+    DEFAULT_TOLERANCE,
+    BenchmarkError,
+    compare,
+    run_benchmarks,
+    temporary_database,
+)
+from reviews.synthetic import CatalogSpec
+
+SIZES = ('users', 'genres', 'categories', 'titles', 'reviews', 'comments')
+BASELINE_PATH = os.path.join(settings.BASE_DIR, 'benchmarks', 'endpoints.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'прогон эндпоинтов router_v1 на синтетическом каталоге '
+        'во временной базе и сравнение с baseline'
+    )
+
+    def add_arguments(self, parser):
+        defaults = CatalogSpec()
+        for name in SIZES:
+            parser.add_argument(
+                f'--{name}', type=int, default=getattr(defaults, name),
+            )
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument(
+            '--requests', type=int, default=DEFAULT_REQUESTS,
+            help='измеряемых запросов на сценарий',
+        )
+        parser.add_argument(
+            '--only', nargs='*',
+            help='только сценарии, в имени которых есть одна из строк',
+        )
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='не очищать кэш ответов между запросами',
+        )
+        parser.add_argument('--baseline', default=BASELINE_PATH)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='записать результаты в --baseline вместо сравнения',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+            help='допустимый относительный рост времени и памяти',
+        )
+
+    def handle(self, *args, **options):
+        catalog = {name: options[name] for name in SIZES + ('seed',)}
+        results = self.run_isolated(catalog, options)
+        self.write_table(results)
+        if options['save_baseline']:
+            self.save_baseline(options['baseline'], catalog, results)
+            return
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('Baseline не найден, сравнение пропущено.')
+            return
+        with open(options['baseline'], encoding='utf8') as stream:
+            baseline = json.load(stream)
+        if baseline.get('catalog') != catalog:
+            self.stdout.write(self.style.WARNING(
+                'Размеры каталога отличаются от baseline, '
+                'сравнение может быть неточным.'
+            ))
+        regressions = compare(
+            results, baseline['results'], options['tolerance']
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно baseline:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def run_isolated(self, catalog, options):
+        """Каталог загружается во временную тестовую базу."""
+        try:
+            with temporary_database():
+                call_command('gendata', stdout=io.StringIO(), **catalog)
+                return run_benchmarks(
+                    options['requests'], options['warm_cache'],
+                    options['only'],
+                )
+        except BenchmarkError as error:
+            raise CommandError(error)
+
+    def write_table(self, results):
+        width = max(len(name) for name in results)
+        self.stdout.write(
+            f'{"сценарий":<{width}} {"p50, мс":>9} {"p95, мс":>9} '
+            f'{"запросов":>8} {"память, КБ":>10}'
+        )
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<{width}} {metrics["p50_ms"]:>9.2f} '
+                f'{metrics["p95_ms"]:>9.2f} {metrics["queries"]:>8} '
+                f'{metrics["alloc_kb"]:>10.1f}'
+            )
+
+    def save_baseline(self, path, catalog, results):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf8') as stream:
+            json.dump(
+                {'catalog': catalog, 'results': results}, stream,
+                ensure_ascii=False, indent=2, sort_keys=True,
+            )
+            stream.write('\n')
+        self.stdout.write(f'Baseline записан в {path}.')
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from api.readers import serialize_titles, title_rows
+from api.serializers import GetTitleSerializer
+from api.views import TitleViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'сравнение стоимости сериализации произведений: '
+        'GetTitleSerializer и быстрый путь api.readers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='сколько произведений сериализовать за проход',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='число проходов, берется лучшее время',
+        )
+
+    def handle(self, *args, **options):
+        limit, repeat = options['limit'], max(options['repeat'], 1)
+        queryset = TitleViewSet.queryset.all()[:limit]
+        paths = {
+            'serializer': lambda: GetTitleSerializer(
+                queryset.all(), many=True
+            ).data,
+            'fast': lambda: serialize_titles(title_rows(queryset.all())),
+        }
+        rendered = {}
+        results = {}
+        for name, build in paths.items():
+            best = None
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    data = build()
+                    elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            rendered[name] = JSONRenderer().render(data)
+            results[name] = (best, len(captured.captured_queries), len(data))
+
+        for name, (best, queries, count) in results.items():
+            per_title = best / count * 1e6 if count else 0.0
+            self.stdout.write(
+                f'{name:<11} {count} произведений, {queries} запросов, '
+                f'{best * 1000:.2f} мс, {per_title:.1f} мкс на произведение'
+            )
+        slow, fast = results['serializer'][0], results['fast'][0]
+        if fast:
+            self.stdout.write(f'ускорение: {slow / fast:.1f}x')
+        if rendered['serializer'] != rendered['fast']:
+            self.stderr.write('JSON быстрого пути отличается от сериализатора')
+        else:
+            self.stdout.write('JSON совпадает байт в байт')
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.benchmark import signup_throughput, temporary_database
+
+JOURNAL_MODES = ('wal', 'delete')
+
+
+class Command(BaseCommand):
+    help = (
+        'скорость параллельных регистраций на временной базе SQLite '
+        '(по умолчанию в режиме WAL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--signups', type=int, default=200,
+            help='регистраций на поток',
+        )
+        parser.add_argument(
+            '--journal-mode', choices=JOURNAL_MODES, default='wal',
+        )
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='прогнать и прежний путь get_or_create + save',
+        )
+
+    def handle(self, *args, **options):
+        modes = [('upsert', True)]
+        if options['compare']:
+            modes.append(('get_or_create', False))
+        for label, use_upsert in modes:
+            result = self.run(options, use_upsert)
+            errors = ', '.join(
+                f'{name}: {count}' for name, count in result['errors'].items()
+            ) or 'нет'
+            self.stdout.write(
+                f'{label}: {result["signups"]} регистраций за '
+                f'{result["seconds"]:.2f} с ({result["per_second"]:.0f}/с), '
+                f'p50 {result["p50_ms"]:.2f} мс, p95 {result["p95_ms"]:.2f} '
+                f'мс, ошибки: {errors}'
+            )
+
+    def run(self, options, use_upsert):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'signup.sqlite3')
+            # Письма только ставятся в очередь, как при отдельном воркере.
+            with override_settings(
+                EMAIL_OUTBOX_EAGER=False, EMAIL_OUTBOX_THREADS=0
+            ), temporary_database(name) as connection:
+                if connection.vendor != 'sqlite':
+                    raise CommandError('Бенчмарк рассчитан на SQLite.')
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'PRAGMA journal_mode={options["journal_mode"]}'
+                    )
+                return signup_throughput(
+                    options['threads'], options['signups'], use_upsert
+                )
@@ -0,0 +1,57 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import FORMATS, TABLES, export_lines
+
+
+class Command(BaseCommand):
+    help = 'потоковая выгрузка произведений, отзывов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*',
+            help=f'таблицы для выгрузки: {", ".join(TABLES)}; '
+                 'по умолчанию все',
+        )
+        parser.add_argument(
+            '--format', dest='export_format', choices=list(FORMATS),
+            default='csv',
+        )
+        parser.add_argument(
+            '--output', default='.',
+            help='каталог для файлов <таблица>.<формат>',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help='строк, читаемых из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(TABLES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные таблицы: {", ".join(sorted(unknown))}'
+            )
+        os.makedirs(options['output'], exist_ok=True)
+        for table in options['tables'] or TABLES:
+            file_name = os.path.join(
+                options['output'], f'{table}.{options["export_format"]}'
+            )
+            start = time.perf_counter()
+            with open(file_name, 'w', newline='', encoding='utf8') as file:
+                lines = export_lines(
+                    table, options['export_format'], options['chunk_size']
+                )
+                count = 0
+                for line in lines:
+                    file.write(line)
+                    count += 1
+            if options['export_format'] == 'csv':
+                count -= 1
+            self.stdout.write(
+                f'{table}: {count} строк в {file_name} за '
+                f'{time.perf_counter() - start:.2f} с'
+            )
@@ -0,0 +1,259 @@
+"""
+Метрики API в текстовом формате Prometheus.
+
+Запрос только увеличивает числа в словаре процесса под коротким
+замком. Не чаще раза в METRICS_FLUSH_INTERVAL секунд накопленные
+приращения одной транзакцией прибавляются к счетчикам в общем файле
+METRICS_DB_PATH (api.localstore), поэтому /api/v1/metrics видит сумму
+по всем воркерам сервера с задержкой около интервала сброса. Сброс из
+запроса не ждет блокировку файла: если другой воркер как раз пишет,
+приращения останутся в буфере до следующей попытки.
+Гистограммы хранятся как в Prometheus: накопительные корзины _bucket,
+_sum и _count.
+"""
+import atexit
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .localstore import LocalStore
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUESTS = 'yamdb_http_requests_total'
+REQUEST_DURATION = 'yamdb_http_request_duration_seconds'
+DB_QUERIES = 'yamdb_db_queries_total'
+DB_DURATION = 'yamdb_db_query_duration_seconds_total'
+CACHE_REQUESTS = 'yamdb_cache_requests_total'
+CACHE_HIT_RATIO = 'yamdb_cache_hit_ratio'
+EMAIL_DURATION = 'yamdb_email_send_duration_seconds'
+
+FAMILIES = {
+    REQUESTS: ('counter', 'Запросы к API по вью, методу и статусу.'),
+    REQUEST_DURATION: ('histogram', 'Время ответа по вью.'),
+    DB_QUERIES: ('counter', 'Запросы к базе по вью.'),
+    DB_DURATION: ('counter', 'Время запросов к базе по вью.'),
+    CACHE_REQUESTS: ('counter', 'Обращения к кэшу ответов.'),
+    CACHE_HIT_RATIO: ('gauge', 'Доля попаданий в кэш ответов.'),
+    EMAIL_DURATION: ('histogram', 'Время отправки письма.'),
+}
+SUFFIXES = ('_bucket', '_sum', '_count')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+) WITHOUT ROWID;
+'''
+UPSERT = (
+    'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+    'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value'
+)
+LE_LABEL = re.compile(r',?le="([^"]*)"')
+
+store = LocalStore('METRICS_DB_PATH', SCHEMA)
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+def format_bound(bound):
+    return f'{bound:g}'
+
+
+def with_label(text, label):
+    return f'{text},{label}' if text else label
+
+
+class MetricsBuffer:
+    """Приращения счетчиков этого процесса с последнего сброса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._values = defaultdict(float)
+        self._last_flush = time.monotonic()
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, format_labels(labels))
+        with self._lock:
+            self._values[key] += value
+
+    def observe(self, name, value, bounds, labels=()):
+        text = format_labels(labels)
+        keys = [
+            (f'{name}_bucket', with_label(text, f'le="{format_bound(bound)}"'))
+            for bound in bounds if value <= bound
+        ]
+        keys.append((f'{name}_bucket', with_label(text, 'le="+Inf"')))
+        keys.append((f'{name}_count', text))
+        with self._lock:
+            for key in keys:
+                self._values[key] += 1
+            self._values[(f'{name}_sum', text)] += value
+
+    def take(self):
+        with self._lock:
+            values, self._values = self._values, defaultdict(float)
+            self._last_flush = time.monotonic()
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] += value
+
+    def flush(self, blocking=True):
+        """
+        Переносит приращения в общий файл. Если файл занят дольше
+        LOCAL_STORE_TIMEOUT, они возвращаются в буфер до следующего раза.
+        С blocking=False сброс не ждет ни другой поток процесса, ни чужую
+        транзакцию в файле: занято — приращения остаются в буфере.
+        """
+        if not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            values = self.take()
+            if not values:
+                return
+            try:
+                store.write(UPSERT, (
+                    (name, labels, value)
+                    for (name, labels), value in values.items()
+                ), timeout=None if blocking else 0)
+            except sqlite3.Error:
+                self.merge(values)
+                raise
+        finally:
+            self._flush_lock.release()
+
+    def maybe_flush(self, force=False):
+        """
+        Из запроса сброс только пробует взять блокировку, чтобы ответ не
+        ждал чужую запись; при выходе процесса (force) — ждет ее.
+        """
+        elapsed = time.monotonic() - self._last_flush
+        if not force and elapsed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        try:
+            self.flush(blocking=force)
+        except sqlite3.Error:
+            pass
+
+    def reset(self):
+        self.take()
+
+
+buffer = MetricsBuffer()
+atexit.register(buffer.maybe_flush, force=True)
+
+
+def record_request(view, method, status, total_ms, db_ms, queries):
+    buffer.inc(REQUESTS, (
+        ('view', view), ('method', method), ('status', status),
+    ))
+    labels = (('view', view),)
+    buffer.observe(
+        REQUEST_DURATION, total_ms / 1000, request_bounds(), labels
+    )
+    buffer.inc(DB_QUERIES, labels, queries)
+    buffer.inc(DB_DURATION, labels, db_ms / 1000)
+    buffer.maybe_flush()
+
+
+def request_bounds():
+    return [bound / 1000 for bound in settings.TIMING_BUCKETS_MS]
+
+
+def record_cache(hit):
+    buffer.inc(CACHE_REQUESTS, (('result', 'hit' if hit else 'miss'),))
+
+
+@contextmanager
+def email_timer():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        buffer.observe(
+            EMAIL_DURATION, time.perf_counter() - start,
+            settings.METRICS_EMAIL_BUCKETS,
+        )
+
+
+def family_of(name):
+    for suffix in SUFFIXES:
+        base = name[:-len(suffix)]
+        if name.endswith(suffix) and base in FAMILIES:
+            return base
+    return name
+
+
+def sample_order(sample):
+    """Корзины одного набора меток подряд, по возрастанию le."""
+    name, labels, _ = sample
+    suffix = name[len(family_of(name)):]
+    rank = SUFFIXES.index(suffix) if suffix else 0
+    match = LE_LABEL.search(labels)
+    bound = float(match.group(1)) if match else 0.0
+    return LE_LABEL.sub('', labels), rank, bound
+
+
+def cache_ratio(samples):
+    counts = {
+        labels: value for name, labels, value in samples
+        if name == CACHE_REQUESTS
+    }
+    hits = counts.get('result="hit"', 0)
+    total = hits + counts.get('result="miss"', 0)
+    return [(CACHE_HIT_RATIO, '', hits / total if total else 0.0)]
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render(samples):
+    """Текст для Prometheus из строк (name, labels, value)."""
+    samples = list(samples)
+    samples += cache_ratio(samples)
+    families = defaultdict(list)
+    for sample in samples:
+        families[family_of(sample[0])].append(sample)
+    lines = []
+    for family, (kind, description) in FAMILIES.items():
+        if family not in families:
+            continue
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in sorted(families[family], key=sample_order):
+            series = f'{name}{{{labels}}}' if labels else name
+            lines.append(f'{series} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def exposition():
+    """Сбрасывает буфер процесса и отдает сумму по всем процессам."""
+    buffer.flush()
+    return render(store.read('SELECT name, labels, value FROM metrics'))
+
+
+def reset():
+    """Очищает буфер и общий файл (для тестов)."""
+    buffer.reset()
+    store.write('DELETE FROM metrics', [()])
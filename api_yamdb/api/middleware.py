@@ -0,0 +1,153 @@
+from contextlib import ExitStack, contextmanager, nullcontext
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .timing import histograms
+
+
+def view_name(view_func, method):
+    """«TitleViewSet.list» для вьюсетов, «SignUp.post» для APIView."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    method = method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+def milliseconds(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start) * 1000
+
+
+class RequestTiming:
+    """
+    Отметки времени одного запроса. Экземпляр подключается как
+    execute_wrapper и заодно считает запросы к базе и их время.
+    """
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.end = None
+        self.view_name = None
+        self.view_start = None
+        self.view_end = None
+        self.render_end = None
+        self.serialize_ms = None
+        self._serializing = 0
+        self.db_ms = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (perf_counter() - start) * 1000
+            self.queries += 1
+
+    @contextmanager
+    def serializing(self):
+        """Отрезок сериализации; вложенные отрезки не суммируются дважды."""
+        self._serializing += 1
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._serializing -= 1
+            if not self._serializing:
+                self.serialize_ms = (self.serialize_ms or 0.0) + (
+                    perf_counter() - start
+                ) * 1000
+
+    def rendered(self, response):
+        self.render_end = perf_counter()
+
+    def finish(self):
+        self.end = perf_counter()
+        if self.view_start is not None and self.view_end is None:
+            self.view_end = self.end
+
+    @property
+    def total_ms(self):
+        return milliseconds(self.start, self.end)
+
+    def phases(self):
+        """
+        view — обработчик с запросами к базе, но без сериализации,
+        serialize — сбор response.data сериализаторами, render —
+        превращение response.data в JSON, total — весь запрос
+        с промежуточными слоями. db пересекается с view и serialize.
+        """
+        view_ms = milliseconds(self.view_start, self.view_end)
+        if view_ms is not None and self.serialize_ms is not None:
+            view_ms -= self.serialize_ms
+        return (
+            ('view', view_ms),
+            ('serialize', self.serialize_ms),
+            ('render', milliseconds(self.view_end, self.render_end)),
+            ('total', self.total_ms),
+        )
+
+    def header(self):
+        metrics = [
+            f'db;desc="{self.queries} queries";dur={self.db_ms:.3f}'
+        ]
+        metrics.extend(
+            f'{name};dur={duration:.3f}'
+            for name, duration in self.phases() if duration is not None
+        )
+        return ', '.join(metrics)
+
+
+def serialize_timer(request):
+    """Контекст замера сериализации; без ServerTimingMiddleware — пустой."""
+    timing = getattr(request, 'timing', None)
+    return timing.serializing() if timing is not None else nullcontext()
+
+
+class ServerTimingMiddleware:
+    """
+    Заголовок Server-Timing и гистограммы api.timing.histograms.
+    Стоит первым в MIDDLEWARE, чтобы total покрывал все слои.
+    """
+    header = 'Server-Timing'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        timing.finish()
+        if settings.SERVER_TIMING_HEADER:
+            response[self.header] = timing.header()
+        if timing.view_name is not None:
+            histograms.observe(
+                timing.view_name, timing.total_ms, timing.db_ms,
+                timing.queries,
+            )
+        metrics.record_request(
+            timing.view_name or 'unresolved', request.method,
+            response.status_code, timing.total_ms, timing.db_ms,
+            timing.queries,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_name = view_name(view_func, request.method)
+        request.timing.view_start = perf_counter()
+
+    def process_template_response(self, request, response):
+        # Вызывается последним перед render(): DRF отдает Response,
+        # который превращается в байты уже после выхода из вью.
+        request.timing.view_end = perf_counter()
+        response.add_post_render_callback(request.timing.rendered)
+        return response
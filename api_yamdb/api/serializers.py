@@ -1,20 +1,43 @@
-from django.db.models import Avg
+from django.db import transaction
 from rest_framework.serializers import (
     CharField,
     EmailField,
+    IntegerField,
+    ListSerializer,
     ModelSerializer,
     RegexField,
     Serializer,
-    SerializerMethodField,
     SlugRelatedField,
     ValidationError,
 )
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    TitleGenre,
+)
 from users.models import User
+from .cache import TITLES, invalidate
+from .fields import BulkSlugRelatedField
+from .middleware import serialize_timer
+
+
+class TimedModelSerializer(ModelSerializer):
+    """
+    Сериализатор, чье представление замеряется как фаза serialize
+    Server-Timing. ListSerializer зовет to_representation у дочернего
+    на каждый объект, вложенные вызовы отрезки не удваивают.
+    """
 
+    def to_representation(self, instance):
+        with serialize_timer(self.context.get('request')):
+            return super().to_representation(instance)
 
-class UserSerializer(ModelSerializer):
+
+class UserSerializer(TimedModelSerializer):
     """ Сериализатор для юзера."""
 
     class Meta:
@@ -59,7 +82,7 @@ class TokenSerializer(Serializer):
         fields = ('username', 'confirmation_code')
 
 
-class ReviewSerializer(ModelSerializer):
+class ReviewSerializer(TimedModelSerializer):
     """Сериализатор отзывов."""
     author = SlugRelatedField(
         many=False,
@@ -83,7 +106,7 @@ class ReviewSerializer(ModelSerializer):
         return attrs
 
 
-class CommentSerializer(ModelSerializer):
+class CommentSerializer(TimedModelSerializer):
     """Сериализатор комментариев."""
     author = SlugRelatedField(
         read_only=True,
@@ -96,7 +119,7 @@ class CommentSerializer(ModelSerializer):
         read_only_fields = ('id', 'review', )
 
 
-class GenreSerializer(ModelSerializer):
+class GenreSerializer(TimedModelSerializer):
     """Сериализатор жанров"""
 
     class Meta:
@@ -104,7 +127,7 @@ class GenreSerializer(ModelSerializer):
         fields = ('name', 'slug')
 
 
-class CategorySerializer(ModelSerializer):
+class CategorySerializer(TimedModelSerializer):
     """Сериализатор категорий."""
 
     class Meta:
@@ -112,38 +135,116 @@ class CategorySerializer(ModelSerializer):
         fields = ('name', 'slug')
 
 
-class GetTitleSerializer(ModelSerializer):
+class GetTitleSerializer(TimedModelSerializer):
     """Сериализатор получения произведений"""
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
-    rating = SerializerMethodField()
+    rating = IntegerField(read_only=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = (
+            'id', 'genre', 'category', 'rating', 'name', 'year', 'description'
+        )
         read_only_fields = ('rating', 'category', 'genre')
 
-    def get_rating(self, obj):
-        rating = obj.reviews.all().aggregate(Avg('score'))['score__avg']
-        if rating:
-            return round(rating)
-        else:
-            return None
+
+class BulkTitleListSerializer(ListSerializer):
+    """Массовое создание произведений одной транзакцией."""
+
+    @staticmethod
+    def resolve_slugs(data):
+        """
+        Находит все категории и жанры из пачки двумя запросами.
+        Результат передается полям через context['resolved_slugs'].
+        """
+        category_slugs, genre_slugs = set(), set()
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            category = item.get('category')
+            if isinstance(category, (str, int)):
+                category_slugs.add(str(category))
+            genres = item.get('genre')
+            if isinstance(genres, list):
+                genre_slugs.update(
+                    str(slug) for slug in genres
+                    if isinstance(slug, (str, int))
+                )
+        return {
+            Category: Category.objects.in_bulk(
+                category_slugs, field_name='slug'
+            ),
+            Genre: Genre.objects.in_bulk(genre_slugs, field_name='slug'),
+        }
+
+    def create(self, validated_data):
+        titles, title_genres = [], []
+        for item in validated_data:
+            genres = item.pop('genre', [])
+            item['genre_mask'] = sum(genre.mask for genre in genres)
+            titles.append(Title(**item))
+            title_genres.append(genres)
+        with transaction.atomic():
+            Title.objects.bulk_create(titles)
+            TitleGenre.objects.bulk_create(
+                TitleGenre(title=title, genre=genre)
+                for title, genres in zip(titles, title_genres)
+                for genre in genres
+            )
+        # bulk_create не отправляет post_save, сбрасываем кэш сами.
+        invalidate(TITLES)
+        return titles
 
 
-class PostTitleSerializer(ModelSerializer):
+class PostTitleSerializer(TimedModelSerializer):
     """Сериализатор создания произведений"""
-    genre = SlugRelatedField(
+    genre = BulkSlugRelatedField(
         slug_field='slug',
         queryset=Genre.objects.all(),
         many=True,
         required=False
     )
-    category = SlugRelatedField(
+    category = BulkSlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all(),
     )
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'genre', 'category', 'name', 'year', 'description')
+        list_serializer_class = BulkTitleListSerializer
+
+    def create(self, validated_data):
+        genres = validated_data.pop('genre', [])
+        validated_data['genre_mask'] = sum(genre.mask for genre in genres)
+        title = Title.objects.create(**validated_data)
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=title, genre=genre) for genre in genres
+        )
+        return title
+
+    def update(self, instance, validated_data):
+        """Жанры обновляются разницей: только добавленные и удаленные."""
+        genres = validated_data.pop('genre', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if genres is None:
+            instance.save()
+            return instance
+        current = set(
+            TitleGenre.objects.filter(title=instance)
+            .values_list('genre_id', flat=True)
+        )
+        new = {genre.pk for genre in genres}
+        if current - new:
+            TitleGenre.objects.filter(
+                title=instance, genre_id__in=current - new
+            ).delete()
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=instance, genre=genre)
+            for genre in genres if genre.pk not in current
+        )
+        instance.genre_mask = sum(genre.mask for genre in genres)
+        instance.save(update_fields=instance.get_update_fields('genre_mask'))
+        return instance
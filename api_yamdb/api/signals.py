@@ -0,0 +1,49 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Category, Genre, Review, Title, TitleGenre
+from .cache import (
+    CATEGORIES,
+    GENRES,
+    TITLES,
+    invalidate,
+    invalidate_titles,
+)
+
+
+@receiver((post_save, post_delete), sender=Title)
+def invalidate_title(sender, instance, **kwargs):
+    invalidate_titles(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=TitleGenre)
+def invalidate_title_genre(sender, instance, **kwargs):
+    invalidate_titles(instance.title_id)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Жанр встречается во многих произведениях: сбрасываем группу.
+        invalidate(TITLES)
+    else:
+        invalidate_titles(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Review)
+def invalidate_title_rating(sender, instance, **kwargs):
+    invalidate_titles(instance.title_id)
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def invalidate_genre(sender, instance, **kwargs):
+    # Название жанра выводится в карточках произведений.
+    invalidate(GENRES, TITLES)
+
+
+@receiver((post_save, post_delete), sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    invalidate(CATEGORIES, TITLES)
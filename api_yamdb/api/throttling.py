@@ -0,0 +1,189 @@
+"""
+Ограничение частоты запросов корзинами токенов.
+
+Корзина вмещает N токенов и пополняется со скоростью N за период
+из DEFAULT_THROTTLE_RATES ('20/min'); запрос забирает один токен.
+Корзины лежат в общем файле THROTTLE_DB_PATH (api.localstore), поэтому
+лимит общий для всех воркеров сервера. Все корзины запроса (по IP и по
+пользователю) пополняются одним UPSERT ... RETURNING (SQLite 3.35+, на
+старых версиях — чтением и записью), и только если ни одна не отказала,
+из каждой списывается токен. Все это — одна транзакция: отказ не тратит
+токены корзин, которые пропустили бы запрос.
+Корзина, простоявшая дольше capacity / rate, снова полна и ничем не
+отличается от отсутствующей, поэтому с вероятностью THROTTLE_EXPIRE_SHARE
+запрос заодно удаляет такие корзины. Если файл занят дольше
+LOCAL_STORE_TIMEOUT, запрос пропускается с предупреждением в лог:
+ограничитель не должен ронять API.
+"""
+import logging
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .localstore import LocalStore
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS token_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    capacity REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS token_buckets_full_at
+    ON token_buckets (updated + capacity / rate);
+'''
+REFILL = (
+    'INSERT INTO token_buckets (key, tokens, capacity, rate, updated) '
+    'VALUES {values} '
+    'ON CONFLICT (key) DO UPDATE SET '
+    'tokens = min(excluded.capacity, '
+    'tokens + max(excluded.updated - updated, 0) * excluded.rate), '
+    'capacity = excluded.capacity, rate = excluded.rate, '
+    'updated = excluded.updated '
+    'RETURNING tokens, rate'
+)
+DEBIT = 'UPDATE token_buckets SET tokens = tokens - 1 WHERE key IN ({keys})'
+SELECT = 'SELECT tokens, updated FROM token_buckets WHERE key = ?'
+REPLACE = 'INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?, ?, ?)'
+EXPIRE = 'DELETE FROM token_buckets WHERE updated + capacity / rate < ?'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+logger = logging.getLogger(__name__)
+store = LocalStore('THROTTLE_DB_PATH', SCHEMA)
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 20 / 60): емкость и токенов в секунду."""
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def upsert_supported():
+    return sqlite3.sqlite_version_info >= (3, 35)
+
+
+def take(buckets, now, use_upsert=None):
+    """
+    Забирает по токену из корзин [(key, rate)], если все они
+    пропускают запрос. Возвращает, через сколько секунд появится токен
+    в самой пустой из отказавших корзин, или None, если запрос прошел.
+    """
+    if use_upsert is None:
+        use_upsert = upsert_supported()
+    buckets = [(key, *parse_rate(rate)) for key, rate in buckets]
+    refill = refill_upsert if use_upsert else refill_locked
+    with store.transaction() as connection:
+        if random.random() < settings.THROTTLE_EXPIRE_SHARE:
+            connection.execute(EXPIRE, (now,))
+        waits = [
+            (1 - tokens) / per_second
+            for tokens, per_second in refill(connection, buckets, now)
+            if tokens < 1
+        ]
+        if not waits:
+            connection.execute(
+                DEBIT.format(keys=', '.join(['?'] * len(buckets))),
+                [key for key, _, _ in buckets],
+            )
+    return max(waits) if waits else None
+
+
+def refill_upsert(connection, buckets, now):
+    """Пополняет корзины, возвращает [(tokens, rate)]."""
+    params = []
+    for key, capacity, per_second in buckets:
+        params += [key, capacity, capacity, per_second, now]
+    sql = REFILL.format(values=', '.join(['(?, ?, ?, ?, ?)'] * len(buckets)))
+    return connection.execute(sql, params).fetchall()
+
+
+def refill_locked(connection, buckets, now):
+    """То же, что refill_upsert, для SQLite старше 3.35."""
+    levels = []
+    for key, capacity, per_second in buckets:
+        row = connection.execute(SELECT, (key,)).fetchone()
+        tokens = capacity if row is None else min(
+            capacity, row[0] + max(now - row[1], 0) * per_second
+        )
+        connection.execute(REPLACE, (key, tokens, capacity, per_second, now))
+        levels.append((tokens, per_second))
+    return levels
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Корзины по IP (ip_scope) и по пользователю (user_scope).
+    Scope без частоты в DEFAULT_THROTTLE_RATES не ограничивается.
+    """
+    ip_scope = None
+    user_scope = None
+    methods = None
+    timer = time.time
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_user_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+    def get_buckets(self, request):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        idents = (
+            (self.ip_scope, self.get_ident(request)),
+            (self.user_scope, self.get_user_ident(request)),
+        )
+        return [
+            (f'{scope}:{ident}', rates[scope])
+            for scope, ident in idents
+            if scope and ident is not None and rates.get(scope)
+        ]
+
+    def allow_request(self, request, view):
+        if self.methods and request.method not in self.methods:
+            return True
+        buckets = self.get_buckets(request)
+        if not buckets:
+            return True
+        try:
+            self.wait_seconds = take(buckets, self.timer())
+        except sqlite3.Error as error:
+            logger.warning(
+                'Ограничитель частоты пропускает запрос: %s', error
+            )
+            return True
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AuthThrottle(TokenBucketThrottle):
+    """
+    Регистрация и выдача токена: по IP и по паре IP и username из
+    запроса. Username присылает неаутентифицированный клиент, поэтому
+    корзина только по нему позволила бы любому опустошить чужую.
+    """
+    ip_scope = 'auth_ip'
+    user_scope = 'auth_user'
+
+    def get_user_ident(self, request):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if not isinstance(username, str) or not username:
+            return None
+        return f'{self.get_ident(request)}:{username.lower()}'
+
+
+class CreateThrottle(TokenBucketThrottle):
+    """Создание отзывов и комментариев: по IP и по автору."""
+    ip_scope = 'create_ip'
+    user_scope = 'create_user'
+    methods = ('POST',)
@@ -0,0 +1,131 @@
+"""
+Скользящие гистограммы времени ответа по вьюсетам и действиям.
+
+Окно TIMING_WINDOW секунд разбито на TIMING_SLICES отрезков. Каждый
+отрезок хранит счетчики по корзинам TIMING_BUCKETS_MS, сумму времени,
+время в базе и число запросов к ней. Отрезки старше окна выбрасываются
+при следующей записи или чтении, поэтому память не растет, а снимок
+показывает только недавние запросы. Данные — в памяти процесса.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from django.conf import settings
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class TimeSlice:
+    __slots__ = ('index', 'counts', 'total_ms', 'db_ms', 'queries')
+
+    def __init__(self, index, size):
+        self.index = index
+        self.counts = [0] * size
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+
+
+class RollingHistogram:
+
+    def __init__(self, bounds, window, slices, clock=time.monotonic):
+        self.bounds = tuple(bounds)
+        self.slice_seconds = window / slices
+        self.max_slices = slices
+        self.clock = clock
+        self.slices = deque()
+
+    def current_index(self):
+        return int(self.clock() // self.slice_seconds)
+
+    def expire(self, index):
+        while self.slices and self.slices[0].index <= index - self.max_slices:
+            self.slices.popleft()
+
+    def observe(self, total_ms, db_ms=0.0, queries=0):
+        index = self.current_index()
+        self.expire(index)
+        if not self.slices or self.slices[-1].index != index:
+            self.slices.append(TimeSlice(index, len(self.bounds) + 1))
+        current = self.slices[-1]
+        current.counts[bisect_left(self.bounds, total_ms)] += 1
+        current.total_ms += total_ms
+        current.db_ms += db_ms
+        current.queries += queries
+
+    def quantile(self, counts, count, share):
+        """
+        Верхняя граница корзины, в которую попадает квантиль;
+        '+Inf' — за последней границей (строкой: JSON не знает Infinity).
+        """
+        rank = share * count
+        seen = 0
+        for bound, bucket in zip(self.bounds, counts):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return '+Inf'
+
+    def snapshot(self):
+        self.expire(self.current_index())
+        counts = [0] * (len(self.bounds) + 1)
+        total_ms = db_ms = 0.0
+        queries = 0
+        for piece in self.slices:
+            counts = [a + b for a, b in zip(counts, piece.counts)]
+            total_ms += piece.total_ms
+            db_ms += piece.db_ms
+            queries += piece.queries
+        count = sum(counts)
+        result = {
+            'count': count,
+            'buckets': dict(zip(
+                [str(bound) for bound in self.bounds] + ['+Inf'], counts
+            )),
+            'mean_ms': round(total_ms / count, 3) if count else None,
+            'db_mean_ms': round(db_ms / count, 3) if count else None,
+            'queries_mean': round(queries / count, 2) if count else None,
+        }
+        for share in QUANTILES:
+            result[f'p{round(share * 100)}_ms'] = (
+                self.quantile(counts, count, share) if count else None
+            )
+        return result
+
+
+class TimingRegistry:
+    """Гистограммы по имени вида «TitleViewSet.list»."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def make_histogram(self):
+        return RollingHistogram(
+            settings.TIMING_BUCKETS_MS, settings.TIMING_WINDOW,
+            settings.TIMING_SLICES, self.clock,
+        )
+
+    def observe(self, name, total_ms, db_ms=0.0, queries=0):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = self.make_histogram()
+            histogram.observe(total_ms, db_ms, queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: histogram.snapshot()
+                for name, histogram in sorted(self._histograms.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+histograms = TimingRegistry()
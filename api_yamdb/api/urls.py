@@ -1,9 +1,10 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
     CategoryViewSet, GenreViewSet, TitleViewSet, SignUp,
-    TokenView, UsersViewSet, CommentViewSet, ReviewViewSet
+    TokenView, UsersViewSet, CommentViewSet, ReviewViewSet, ExportView,
+    MetricsView, TimingsView
 )
 
 app_name = 'api'
@@ -30,4 +31,12 @@ urlpatterns = [
     path('auth/signup/', SignUp.as_view(),
          name='signup'),
     path('auth/token/', TokenView.as_view(), name='get_token'),
+    path('timings/', TimingsView.as_view(), name='timings'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    re_path(
+        r'^export/(?P<table>titles|reviews|comments)'
+        r'\.(?P<export_format>ndjson|csv)$',
+        ExportView.as_view(),
+        name='export'
+    ),
 ]
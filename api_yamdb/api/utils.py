@@ -1,13 +1,17 @@
 from rest_framework import filters, mixins, viewsets
 
+from .cache import CachedListMixin
 from .permissions import IsAdminOrReadOnly
 
 
 MAX_TITLE_LENGTH = 200
 MAX_STR_TEXT_LIMIT = 15
+# Битов в маске жанров произведения: BigIntegerField без знакового бита.
+GENRE_MASK_BITS = 63
 
 
 class CatGenreViewSet(
+    CachedListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -1,7 +1,8 @@
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from functools import cached_property
+
 from django.db import IntegrityError
-from django.db.models import Avg
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status
 from rest_framework.decorators import action
@@ -10,16 +11,35 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import AccessToken
 
-from api_yamdb.settings import EMAIL_HOST_USER
+from api_yamdb.settings import EMAIL_HOST_USER, TITLES_BULK_LIMIT
+from .authentication import access_token_for
+from .cache import (
+    CATEGORIES,
+    GENRES,
+    TITLES,
+    CachedListMixin,
+    CachedRetrieveMixin,
+)
+from .conditional import (
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    title_validators,
+    titles_list_validators,
+)
+from .export import FORMATS as EXPORT_FORMATS, export_lines
 from .filters import TitleFilter
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, exposition
+from .middleware import serialize_timer
+from .pagination import PageNumberOrKeysetPagination
 from .permissions import (
     IsAdmin,
     IsAdminOrReadOnly,
     IsAuthorAdminModeratorOrReadOnly,
 )
+from .readers import FastTitleReadMixin
 from .serializers import (
+    BulkTitleListSerializer,
     CategorySerializer,
     CommentSerializer,
     GenreSerializer,
@@ -30,9 +50,12 @@ from .serializers import (
     TokenSerializer,
     UserSerializer,
 )
+from .throttling import AuthThrottle, CreateThrottle
+from .timing import histograms
 from .utils import CatGenreViewSet
 from reviews.models import Category, Genre, Review, Title
 from users.models import User
+from users.signup import redeem, register
 
 
 class SignUp(APIView):
@@ -41,14 +64,15 @@ class SignUp(APIView):
     письмо с confirmation_code на email.
     """
     permission_classes = (AllowAny,)
+    throttle_classes = (AuthThrottle,)
 
     def post(self, request):
         serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
-            user, _ = User.objects.get_or_create(
-                email=serializer.data['email'],
-                username=serializer.data['username']
+            register(
+                serializer.data['username'], serializer.data['email'],
+                from_email=EMAIL_HOST_USER,
             )
         except IntegrityError:
             return Response(
@@ -56,17 +80,6 @@ class SignUp(APIView):
                  'уже существует'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        confirmation_code = default_token_generator.make_token(user)
-        user.confirmation_code = confirmation_code
-        user.save()
-        send_mail(
-            subject='Код подтверждения регистрации',
-            message='Вы зарегистрировались в "YAMDB"! '
-                    f'Ваш код подтвержения: {confirmation_code}',
-            from_email=EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -75,19 +88,20 @@ class TokenView(APIView):
     Получает email и confirmation_code, возвращает токен
     """
     permission_classes = (AllowAny,)
+    throttle_classes = (AuthThrottle,)
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         username = serializer.data['username']
-        user = get_object_or_404(User, username=username)
-        confirmation_code = serializer.data['confirmation_code']
-        if not default_token_generator.check_token(user, confirmation_code):
+        user = redeem(username, serializer.data['confirmation_code'])
+        if user is None:
+            get_object_or_404(User.objects.only('pk'), username=username)
             return Response(
                 {'confirmation_code': 'Неверный код'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        token = AccessToken.for_user(user)
+        token = access_token_for(user)
         return Response({'token': str(token)}, status=status.HTTP_200_OK)
 
 
@@ -108,22 +122,37 @@ class UsersViewSet(ModelViewSet):
         methods=['get', 'patch'],
     )
     def me(self, request):
+        # В request.user может быть TokenUser из claims токена,
+        # для профиля нужны все поля из базы.
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'GET':
-            serializer = self.get_serializer(request.user)
+            serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         serializer = self.get_serializer(
-            request.user, data=request.data, partial=True
+            user, data=request.data, partial=True
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save(role=request.user.role, partial=True)
+        serializer.save(role=user.role, partial=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    FastTitleReadMixin,
+    ModelViewSet,
+):
     """Вьюсет для произведений."""
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
+    cache_group = TITLES
+    queryset = Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', queryset=Genre.objects.order_by('id'))
+    ).order_by('id')
     permission_classes = (IsAdminOrReadOnly,)
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('id',)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
 
@@ -133,48 +162,147 @@ class TitleViewSet(ModelViewSet):
             return GetTitleSerializer
         return PostTitleSerializer
 
+    def get_validators(self, request, *args, **kwargs):
+        if self.action == 'retrieve':
+            return title_validators(request, kwargs.get(self.lookup_field))
+        return titles_list_validators(request)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Создает список произведений одной транзакцией.
+        Если хотя бы один элемент невалиден, ничего не создается,
+        а ошибки возвращаются списком в порядке элементов.
+        """
+        data = request.data
+        if not isinstance(data, list):
+            return Response(
+                {'non_field_errors': 'Ожидается список произведений.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not data or len(data) > TITLES_BULK_LIMIT:
+            return Response(
+                {'non_field_errors': 'Количество произведений должно быть '
+                 f'от 1 до {TITLES_BULK_LIMIT}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        context = self.get_serializer_context()
+        context['resolved_slugs'] = BulkTitleListSerializer.resolve_slugs(data)
+        serializer = PostTitleSerializer(data=data, many=True, context=context)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        titles = serializer.save()
+        queryset = self.get_queryset().filter(
+            pk__in=[title.pk for title in titles]
+        )
+        with serialize_timer(request):
+            data = GetTitleSerializer(
+                queryset, many=True, context=context
+            ).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
 
 class GenreViewSet(CatGenreViewSet):
     """Вьюсет для жанров"""
+    cache_group = GENRES
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
 
 
 class CategoryViewSet(CatGenreViewSet):
     """Вьюсет для категорий"""
+    cache_group = CATEGORIES
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    ModelViewSet,
+):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthorAdminModeratorOrReadOnly]
+    throttle_classes = (CreateThrottle,)
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('pub_date', 'id')
 
-    def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(
-            Review, pk=review_id, title_id=title_id,
+    @cached_property
+    def review(self):
+        """Отзыв из URL, один запрос на весь запрос к API."""
+        return get_object_or_404(
+            Review,
+            pk=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id'),
         )
-        return review.comments.all()
+
+    def get_queryset(self):
+        return self.review.comments.select_related('author')
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(
-            Review, pk=review_id, title_id=title_id,
-        )
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.review)
 
+    def get_validators(self, request, *args, **kwargs):
+        return title_validators(request, kwargs.get('title_id'))
 
-class ReviewViewSet(ModelViewSet):
+
+class ReviewViewSet(
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    ModelViewSet,
+):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthorAdminModeratorOrReadOnly]
+    throttle_classes = (CreateThrottle,)
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('pub_date', 'id')
+
+    @cached_property
+    def title(self):
+        """Произведение из URL, один запрос на весь запрос к API."""
+        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all().order_by('id')
+        return self.title.reviews.select_related('author').order_by('id')
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.title)
+
+    def get_validators(self, request, *args, **kwargs):
+        return title_validators(request, kwargs.get('title_id'))
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка произведений, отзывов или комментариев
+    в NDJSON или CSV. Доступна только администратору.
+    """
+    permission_classes = (IsAdmin,)
+
+    def get(self, request, table, export_format):
+        response = StreamingHttpResponse(
+            export_lines(table, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{table}.{export_format}"'
+        )
+        return response
+
+
+class TimingsView(APIView):
+    """Скользящие гистограммы времени ответа этого процесса."""
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return Response(histograms.snapshot())
+
+
+class MetricsView(APIView):
+    """Счетчики всех воркеров в текстовом формате Prometheus."""
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return HttpResponse(exposition(), content_type=METRICS_CONTENT_TYPE)
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,6 +74,57 @@ DATABASES = {
     }
 }
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+API_CACHE_ALIAS = 'default'
+# Записи сбрасываются сигналами моделей, таймаут лишь вытесняет старые.
+API_CACHE_TIMEOUT = 60 * 60
+# Общий для воркеров файл версий кэша ответов: кэш API_CACHE_ALIAS
+# может быть своим у каждого процесса.
+CACHE_VERSIONS_DB_PATH = os.getenv(
+    'CACHE_VERSIONS_DB_PATH', BASE_DIR / 'cache_versions.sqlite3'
+)
+
+# Заголовок Server-Timing с временем базы, вью, сериализации и рендера.
+SERVER_TIMING_HEADER = True
+# Скользящие гистограммы времени ответа: окно в секундах, число отрезков
+# окна и верхние границы корзин в миллисекундах.
+TIMING_WINDOW = 5 * 60
+TIMING_SLICES = 10
+TIMING_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Общий для воркеров файл счетчиков /api/v1/metrics и интервал,
+# с которым процесс сбрасывает в него накопленное, в секундах.
+METRICS_DB_PATH = os.getenv('METRICS_DB_PATH', BASE_DIR / 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+# Корзины гистограммы времени отправки писем, в секундах.
+METRICS_EMAIL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Сколько секунд ждать блокировку файла локального хранилища.
+LOCAL_STORE_TIMEOUT = 5
+
+# Общий для воркеров файл корзин токенов ограничителя частоты запросов.
+THROTTLE_DB_PATH = os.getenv(
+    'THROTTLE_DB_PATH', BASE_DIR / 'throttle.sqlite3'
+)
+# Доля запросов, которые заодно удаляют простоявшие и снова полные корзины.
+THROTTLE_EXPIRE_SHARE = 0.01
+
+# LRU-кэш разобранных JWT: число токенов и время жизни записи, секунды.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60
+
+# Максимум произведений в одном запросе POST /api/v1/titles/bulk/
+TITLES_BULK_LIMIT = 1000
+
+# Строк, читаемых из базы за раз при потоковой выгрузке каталога.
+EXPORT_CHUNK_SIZE = 2000
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -117,10 +169,30 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'ya.practicum.mdb@gmail.com'
 EMAIL_HOST_PASSWORD = EMAIL_TOKEN
 
+# Очередь писем users.outbox: EAGER отправляет сразу после коммита в том же
+# потоке, иначе после коммита письма забирает пул из THREADS потоков
+# (0 — только команда sendoutbox). Повторы — с задержкой BACKOFF * 2^n
+# секунд, но не больше MAX_BACKOFF; LEASE — на сколько секунд отправитель
+# забирает пачку.
+EMAIL_OUTBOX_EAGER = False
+EMAIL_OUTBOX_THREADS = 2
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_BACKOFF = 30
+EMAIL_OUTBOX_MAX_BACKOFF = 60 * 60
+EMAIL_OUTBOX_LEASE = 5 * 60
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
+    # Емкость корзины и скорость ее пополнения, см. api.throttling.
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '30/min',
+        'auth_user': '10/min',
+        'create_ip': '120/min',
+        'create_user': '60/min',
+    },
 }
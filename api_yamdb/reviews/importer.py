@@ -0,0 +1,519 @@
+"""
+Потоковая загрузка таблиц каталога из CSV и JSON Lines.
+
+Строки читаются генератором и пишутся пачками bulk_create, поэтому
+память не растет с размером файла: в каждый момент в памяти только
+одна пачка объектов. Каждая таблица загружается в своей транзакции.
+
+Порядок загрузки строится по внешним ключам моделей. Файлы разбираются
+в пуле процессов (reviews.sources), а независимые таблицы одного уровня
+пишутся параллельно потоками, если база это допускает. SQLite
+блокирует базу на запись целиком, поэтому на нем таблицы пишутся
+по очереди, а параллельным остается только разбор.
+
+В режиме upsert строки с новыми id добавляются, а существующие
+сравниваются с базой по хэшу значений: изменившиеся обновляются,
+совпавшие пропускаются, а id произведений, которых коснулись
+изменения, собираются для refresh_derived. В режиме delta (включает
+upsert) файл, хэш которого совпал с последней успешной загрузкой
+из ImportLog, не читается вовсе. Без delta хэш для ImportLog
+считается по ходу разбора, без отдельного чтения файла.
+
+До записи файлы проверяются (reviews.validation), и при ошибках
+не загружается ни одна таблица.
+"""
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from multiprocessing import Manager
+
+from django.db import connection, connections, transaction
+from django.db.models import Q
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    ImportLog,
+    Review,
+    Title,
+    TitleGenre,
+)
+from users.models import User
+from .sources import (
+    QUEUE_SIZE,
+    file_hash,
+    find_source,
+    iter_queue,
+    parse_source,
+    read_rows,
+)
+from .validation import ImportValidationError, validate_tables
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+FOREIGN_KEY_FIELDS = ('category', 'author')
+# Сколько id подставлять в один запрос при обновлении произведений.
+REFRESH_CHUNK_SIZE = 500
+
+# Поле строки, связывающее ее с произведениями, и условие на Title
+# по списку его значений: после upsert обновляются только эти
+# произведения.
+TITLE_LINKS = {
+    Title: ('id', lambda ids: Q(pk__in=ids)),
+    TitleGenre: ('title_id', lambda ids: Q(pk__in=ids)),
+    Review: ('title_id', lambda ids: Q(pk__in=ids)),
+    Comment: ('review_id', lambda ids: Q(reviews__in=ids)),
+    Genre: ('id', lambda ids: Q(genre__in=ids)),
+    Category: ('id', lambda ids: Q(category__in=ids)),
+    User: ('id', lambda ids: (
+        Q(reviews__author__in=ids) | Q(reviews__comments__author__in=ids)
+    )),
+}
+
+TABLES = {
+    User: 'users.csv',
+    Genre: 'genre.csv',
+    Category: 'category.csv',
+    Title: 'titles.csv',
+    TitleGenre: 'genre_title.csv',
+    Review: 'review.csv',
+    Comment: 'comments.csv',
+}
+
+
+class TableStats:
+    """Итоги загрузки одной таблицы."""
+
+    def __init__(self, model, rows, seconds, peak_memory, level=0,
+                 updated=0, skipped=0, unchanged_file=False, traced=False,
+                 linked_ids=None):
+        self.model = model
+        # Значения поля TITLE_LINKS у добавленных и измененных строк
+        # (и прежние — у измененных); None — неизвестно, какие.
+        self.linked_ids = linked_ids
+        self.rows = rows
+        self.seconds = seconds
+        self.peak_memory = peak_memory
+        self.traced = traced
+        self.level = level
+        self.updated = updated
+        self.skipped = skipped
+        self.unchanged_file = unchanged_file
+
+    @property
+    def created(self):
+        return self.rows - self.updated - self.skipped
+
+    @property
+    def changed(self):
+        return self.created + self.updated
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.unchanged_file:
+            return f'{self.model.__name__}: файл не изменился, пропущен'
+        text = (
+            f'{self.model.__name__}: {self.rows} строк за '
+            f'{self.seconds:.2f} с ({self.rows_per_second:.0f} строк/с), '
+            f'{"пик памяти" if self.traced else "пик RSS процесса"} '
+            f'{self.peak_memory / 2 ** 20:.1f} МБ'
+        )
+        if self.updated or self.skipped:
+            text += (
+                f'; добавлено {self.created}, обновлено {self.updated}, '
+                f'без изменений {self.skipped}'
+            )
+        return text
+
+
+def normalize_row(row):
+    """Переименовывает ссылки из CSV (category, author) в поля *_id."""
+    for field in FOREIGN_KEY_FIELDS:
+        if field in row:
+            row[f'{field}_id'] = row.pop(field)
+    return row
+
+
+def prepare_value(field, value):
+    if value == '' and field.null:
+        return None
+    return field.to_python(value)
+
+
+def prepare_row(model, row):
+    """Значения строки CSV в типах полей модели."""
+    return {
+        name: prepare_value(model._meta.get_field(name), value)
+        for name, value in normalize_row(row).items()
+    }
+
+
+def compared_fields(model, names):
+    """
+    Поля, по которым строка сравнивается с базой и обновляется.
+    Даты auto_now/auto_now_add не берутся из CSV и при обычной
+    загрузке, поэтому и здесь их не трогаем.
+    """
+    fields = []
+    for name in names:
+        field = model._meta.get_field(name)
+        if field.primary_key or getattr(field, 'auto_now', False) or (
+                getattr(field, 'auto_now_add', False)):
+            continue
+        fields.append(field)
+    return fields
+
+
+def row_hash(values):
+    return hashlib.sha1(repr(values).encode()).digest()
+
+
+def insert_batch(model, rows, linked_ids=None):
+    model.objects.bulk_create(model(**prepare_row(model, row)) for row in rows)
+    return 0, 0
+
+
+def upsert_batch(model, rows, linked_ids=None):
+    """
+    Добавляет новые строки пачки и обновляет изменившиеся.
+    Возвращает число обновленных и пропущенных строк. В linked_ids
+    добавляются связи с произведениями по TITLE_LINKS.
+    """
+    rows = [prepare_row(model, row) for row in rows]
+    pk_name = model._meta.pk.attname
+    link_name = TITLE_LINKS.get(model, (pk_name,))[0]
+    fields = compared_fields(model, rows[0])
+    attnames = [field.attname for field in fields]
+    existing = {
+        values[0]: (values[1], row_hash(values[2:]))
+        for values in model.objects.filter(
+            pk__in=[row[pk_name] for row in rows]
+        ).values_list(pk_name, link_name, *attnames)
+    }
+    if linked_ids is None:
+        linked_ids = set()
+    new, changed = [], []
+    for row in rows:
+        stored = existing.get(row[pk_name])
+        if stored is None:
+            new.append(model(**row))
+        elif stored[1] != row_hash(tuple(row[name] for name in attnames)):
+            changed.append(model(**row))
+            linked_ids.add(stored[0])
+        else:
+            continue
+        linked_ids.add(row.get(link_name))
+    model.objects.bulk_create(new)
+    if changed and attnames:
+        model.objects.bulk_update(changed, attnames)
+    return len(changed), len(rows) - len(new) - len(changed)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def max_rss():
+    """Наибольший RSS процесса в байтах (0, если узнать нельзя)."""
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def import_table(model, rows, batch_size=DEFAULT_BATCH_SIZE, upsert=False,
+                 trace_memory=None):
+    """
+    Загружает строки в таблицу модели пачками по batch_size
+    в одной транзакции и возвращает TableStats.
+    С trace_memory (по умолчанию — если tracemalloc уже включен) пик
+    памяти считается через tracemalloc с начала загрузки таблицы, при
+    параллельной записи он общий для таблиц уровня. Трассировка
+    замедляет загрузку в несколько раз, поэтому без нее берется
+    наибольший RSS процесса: он не растет, если память постоянна.
+    """
+    tracing = tracemalloc.is_tracing()
+    if trace_memory is None:
+        trace_memory = tracing
+    if trace_memory:
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    write_batch = upsert_batch if upsert else insert_batch
+    linked_ids = set() if upsert else None
+    count = updated = skipped = 0
+    try:
+        with transaction.atomic():
+            for batch in batched(rows, batch_size):
+                batch_updated, batch_skipped = write_batch(
+                    model, batch, linked_ids
+                )
+                count += len(batch)
+                updated += batch_updated
+                skipped += batch_skipped
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+        else:
+            peak = max_rss()
+    finally:
+        if trace_memory and not tracing:
+            tracemalloc.stop()
+    return TableStats(
+        model, count, time.perf_counter() - start, peak,
+        updated=updated, skipped=skipped, traced=trace_memory,
+        linked_ids=linked_ids,
+    )
+
+
+def affected_titles(all_stats):
+    """
+    id произведений, которых коснулась загрузка, или None, если
+    это неизвестно (обычная загрузка без upsert): тогда обновляются все.
+    """
+    title_ids = set()
+    for stats in all_stats:
+        if not stats.changed:
+            continue
+        if stats.linked_ids is None or stats.model not in TITLE_LINKS:
+            return None
+        lookup = TITLE_LINKS[stats.model][1]
+        ids = [pk for pk in stats.linked_ids if pk is not None]
+        for chunk in batched(sorted(ids), REFRESH_CHUNK_SIZE):
+            title_ids.update(
+                Title.objects.filter(lookup(chunk))
+                .values_list('pk', flat=True)
+            )
+    return title_ids
+
+
+def refresh_derived(title_ids=None):
+    """
+    bulk_create не вызывает сигналы и save(), поэтому после загрузки
+    пересчитываются биты жанров, маски и рейтинги, а версии
+    произведений сдвигаются ради ETag. С title_ids — только у этих
+    произведений, пачками по REFRESH_CHUNK_SIZE.
+    """
+    Genre.objects.assign_bits()
+    if title_ids is None:
+        chunks = [Title.objects.all()]
+    else:
+        chunks = (
+            Title.objects.filter(pk__in=chunk)
+            for chunk in batched(sorted(title_ids), REFRESH_CHUNK_SIZE)
+        )
+    for titles in chunks:
+        titles.refresh_genre_masks()
+        titles.recount_ratings()
+        titles.touch()
+
+
+def dependency_levels(models):
+    """
+    Раскладывает модели по уровням алгоритмом Кана: модель попадает
+    на уровень после всех моделей, на которые ссылаются ее внешние
+    ключи. Таблицы одного уровня друг от друга не зависят.
+    """
+    models = list(models)
+    dependencies = {
+        model: {
+            field.related_model for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in models
+            and field.related_model is not model
+        }
+        for model in models
+    }
+    levels = []
+    ready = [model for model in models if not dependencies[model]]
+    done = set()
+    while ready:
+        levels.append(ready)
+        done.update(ready)
+        ready = [
+            model for model in models
+            if model not in done and dependencies[model] <= done
+        ]
+    if len(done) != len(models):
+        cycle = ', '.join(
+            model.__name__ for model in models if model not in done
+        )
+        raise ValueError(f'Циклическая зависимость таблиц: {cycle}')
+    return levels
+
+
+def concurrent_writes_supported():
+    return connection.vendor != 'sqlite'
+
+
+def iter_parsed(rows_queue, future):
+    yield from iter_queue(rows_queue)
+    # Ошибка разбора всплывает внутри транзакции таблицы и откатывает ее.
+    future.result()
+
+
+class ImportJob:
+    """Параметры одной загрузки, общие для всех таблиц."""
+
+    def __init__(self, tables, sources, batch_size, upsert, hashes):
+        self.tables = tables
+        self.sources = sources
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.hashes = hashes
+
+    def write_table(self, model, rows, level, content_hash,
+                    close_connection=False):
+        """
+        Загружает таблицу и отмечает файл в ImportLog одной транзакцией.
+        content_hash вызывается, когда строки прочитаны: если хэш не
+        посчитан заранее (delta), он получается при разборе.
+        """
+        try:
+            with transaction.atomic():
+                stats = import_table(
+                    model, rows, self.batch_size, self.upsert
+                )
+                ImportLog.objects.update_or_create(
+                    file_name=self.tables[model],
+                    defaults={
+                        'content_hash': (
+                            self.hashes.get(model) or content_hash()
+                        ),
+                        'rows': stats.rows,
+                    },
+                )
+        finally:
+            if close_connection:
+                connections.close_all()
+        stats.level = level
+        return stats
+
+
+def unchanged_files(tables, hashes):
+    logged = dict(ImportLog.objects.filter(
+        file_name__in=tables.values()
+    ).values_list('file_name', 'content_hash'))
+    return {
+        model for model, file_name in tables.items()
+        if logged.get(file_name) == hashes[model]
+    }
+
+
+def import_tables(tables, path, batch_size=DEFAULT_BATCH_SIZE,
+                  workers=DEFAULT_WORKERS, upsert=False, delta=False,
+                  validate=True, trace_memory=False):
+    """
+    Загружает таблицы {модель: имя файла} из каталога или zip-архива
+    path по уровням зависимостей и возвращает список TableStats.
+    При workers=0 файлы разбираются в текущем процессе.
+    Если файлы не прошли проверку, бросает ImportValidationError.
+    """
+    levels = dependency_levels(tables)
+    sources = {
+        model: find_source(path, file_name)
+        for model, file_name in tables.items()
+    }
+    # Заранее хэш нужен только delta, чтобы не читать неизменные файлы.
+    hashes = {
+        model: file_hash(source) for model, source in sources.items()
+    } if delta else {}
+    skipped = unchanged_files(tables, hashes) if delta else set()
+    if validate:
+        errors = validate_tables(
+            {
+                model: source for model, source in sources.items()
+                if model not in skipped
+            },
+            workers, upsert or delta,
+        )
+        if errors:
+            raise ImportValidationError(errors)
+    job = ImportJob(tables, sources, batch_size, upsert or delta, hashes)
+    stats = [
+        TableStats(model, 0, 0.0, 0, level, unchanged_file=True)
+        for level, models in enumerate(levels)
+        for model in models if model in skipped
+    ]
+    levels = [
+        [model for model in models if model not in skipped]
+        for models in levels
+    ]
+    tracing = tracemalloc.is_tracing()
+    if trace_memory and not tracing:
+        tracemalloc.start()
+    try:
+        if workers < 1:
+            for level, models in enumerate(levels):
+                for model in models:
+                    digest = hashlib.sha256()
+                    stats.append(job.write_table(
+                        model, read_rows(sources[model], digest), level,
+                        digest.hexdigest,
+                    ))
+        else:
+            stats.extend(_import_parallel(job, workers, levels))
+    finally:
+        if trace_memory and not tracing:
+            tracemalloc.stop()
+    return sorted(stats, key=lambda item: item.level)
+
+
+def _import_parallel(job, workers, levels):
+    concurrent = concurrent_writes_supported()
+    stats = []
+    with Manager() as manager, ProcessPoolExecutor(workers) as pool:
+        stop = manager.Event()
+        sources, futures = {}, {}
+        # Задачи ставятся в порядке уровней, а пул берет их по очереди,
+        # поэтому разбор таблицы, которую сейчас пишут, уже запущен.
+        for models in levels:
+            for model in models:
+                rows_queue = manager.Queue(QUEUE_SIZE)
+                futures[model] = pool.submit(
+                    parse_source, job.sources[model],
+                    rows_queue, stop, job.batch_size,
+                    model not in job.hashes,
+                )
+                sources[model] = iter_parsed(rows_queue, futures[model])
+        try:
+            for level, models in enumerate(levels):
+                if concurrent and len(models) > 1:
+                    with ThreadPoolExecutor(len(models)) as threads:
+                        stats.extend(threads.map(
+                            lambda model: job.write_table(
+                                model, sources[model], level,
+                                futures[model].result, close_connection=True,
+                            ),
+                            models,
+                        ))
+                else:
+                    stats.extend(
+                        job.write_table(
+                            model, sources[model], level,
+                            futures[model].result,
+                        )
+                        for model in models
+                    )
+        finally:
+            # Разбор оставшихся файлов не ждет записи, которой не будет.
+            stop.set()
+    return stats
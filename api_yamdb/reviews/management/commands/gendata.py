@@ -0,0 +1,104 @@
+import csv
+import gzip
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import CATEGORIES, GENRES, TITLES, invalidate
+from reviews.importer import (
+    DEFAULT_BATCH_SIZE,
+    TABLES,
+    import_table,
+    refresh_derived,
+)
+from reviews.synthetic import COLUMNS, GENERATORS, CatalogSpec
+
+
+class Command(BaseCommand):
+    help = (
+        'генерация синтетического каталога: в базу или в файлы '
+        'для importcsv'
+    )
+
+    def add_arguments(self, parser):
+        defaults = CatalogSpec()
+        for name in ('users', 'genres', 'categories', 'titles', 'reviews',
+                     'comments'):
+            parser.add_argument(
+                f'--{name}', type=int, default=getattr(defaults, name),
+            )
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument(
+            '--skew', type=float, default=defaults.skew,
+            help='перекос популярности (показатель закона Ципфа)',
+        )
+        parser.add_argument(
+            '--output',
+            help='каталог для CSV; без него данные пишутся в базу',
+        )
+        parser.add_argument(
+            '--compress', action='store_true',
+            help='писать .csv.gz вместо .csv',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        spec = CatalogSpec(**{
+            name: options[name] for name in (
+                'users', 'genres', 'categories', 'titles', 'reviews',
+                'comments', 'seed', 'skew',
+            )
+        })
+        if options['output']:
+            self.write_files(spec, options['output'], options['compress'])
+        else:
+            self.write_database(spec, options['batch_size'])
+
+    def report(self, file_name, rows, start):
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{file_name}: {rows} строк за {elapsed:.2f} с '
+            f'({rate:.0f} строк/с)'
+        )
+
+    def write_files(self, spec, output, compress):
+        os.makedirs(output, exist_ok=True)
+        for file_name, generate in GENERATORS.items():
+            start = time.perf_counter()
+            path = os.path.join(output, file_name)
+            if compress:
+                path += '.gz'
+                stream = gzip.open(path, 'wt', encoding='utf8', newline='')
+            else:
+                stream = open(path, 'w', encoding='utf8', newline='')
+            with stream:
+                writer = csv.DictWriter(stream, COLUMNS[file_name])
+                writer.writeheader()
+                rows = 0
+                for row in generate(spec):
+                    writer.writerow(row)
+                    rows += 1
+            self.report(file_name, rows, start)
+
+    def write_database(self, spec, batch_size):
+        busy = [
+            model.__name__ for model in TABLES if model.objects.exists()
+        ]
+        if busy:
+            raise CommandError(
+                f'Таблицы не пусты: {", ".join(busy)}. '
+                'Сгенерируйте файлы через --output и загрузите их '
+                'importcsv --upsert.'
+            )
+        for model, file_name in TABLES.items():
+            start = time.perf_counter()
+            stats = import_table(
+                model, GENERATORS[file_name](spec), batch_size
+            )
+            self.report(file_name, stats.rows, start)
+        refresh_derived()
+        invalidate(TITLES, GENRES, CATEGORIES)
@@ -1,25 +1,23 @@
-import csv
 import logging
 import sys
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from reviews.models import Category, Comment, Genre, Review, Title, TitleGenre
-from users.models import User
+from api.cache import CATEGORIES, GENRES, TITLES, invalidate
 
+from reviews.importer import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_WORKERS,
+    TABLES,
+    ImportValidationError,
+    affected_titles,
+    import_tables,
+    refresh_derived,
+)
 
-CSV_PATH = 'static/data/'
-FOREIGN_KEY_FIELDS = ('category', 'author')
 
-TABLES = {
-    User: 'users.csv',
-    Genre: 'genre.csv',
-    Category: 'category.csv',
-    Title: 'titles.csv',
-    TitleGenre: 'genre_title.csv',
-    Review: 'review.csv',
-    Comment: 'comments.csv',
-}
+CSV_PATH = 'static/data/'
 
 
 logging.basicConfig(
@@ -35,32 +33,93 @@ logging.basicConfig(
 )
 
 
-def csv_import(csv_data, model):
-    objects = []
-    for row in csv_data:
-        for field in FOREIGN_KEY_FIELDS:
-            if field in row:
-                row[f'{field}_id'] = row[field]
-                del row[field]
-        objects.append(model(**row))
-    model.objects.bulk_create(objects)
-
-
 class Command(BaseCommand):
     help = 'импорт из .csv'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=CSV_PATH,
+            help='каталог или zip-архив с таблицами в .csv, .csv.gz, '
+                 '.jsonl или .jsonl.gz',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='сколько строк записывать одним INSERT',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=DEFAULT_WORKERS,
+            help='процессов для разбора файлов, 0 — разбор в этом процессе',
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='добавлять новые строки, обновлять изменившиеся',
+        )
+        parser.add_argument(
+            '--delta', action='store_true',
+            help='пропускать файлы, не изменившиеся с прошлой загрузки '
+                 '(включает --upsert)',
+        )
+        parser.add_argument(
+            '--trace-memory', action='store_true',
+            help='считать пик памяти по таблицам через tracemalloc '
+                 '(медленнее в несколько раз)',
+        )
+        parser.add_argument(
+            '--skip-validation', action='store_true',
+            help='не проверять файлы перед загрузкой',
+        )
+
     def handle(self, *args, **kwargs):
-        for model in TABLES:
-            with open(
-                    CSV_PATH + TABLES[model],
-                    newline='',
-                    encoding='utf8'
-            ) as csv_file:
-                csv_import(csv.DictReader(csv_file), model)
-                logging.info(f'Импорт данных для модели {model.__name__}'
-                             f'завершен.')
+        start = time.perf_counter()
+        try:
+            all_stats = import_tables(
+                TABLES, kwargs['path'], kwargs['batch_size'],
+                kwargs['workers'], upsert=kwargs['upsert'],
+                delta=kwargs['delta'], validate=not kwargs['skip_validation'],
+                trace_memory=kwargs['trace_memory'],
+            )
+        except FileNotFoundError as error:
+            raise CommandError(error)
+        except ImportValidationError as error:
+            for message in error.errors:
+                self.stderr.write(message)
+            raise CommandError(f'{error}. Ничего не загружено.')
+        for stats in all_stats:
+            logging.info(f'Импорт завершен. {stats}')
+        loaded = time.perf_counter() - start
+        if any(stats.changed for stats in all_stats):
+            refresh_derived(affected_titles(all_stats))
+            invalidate(TITLES, GENRES, CATEGORIES)
+        self.write_summary(all_stats, loaded, time.perf_counter() - start)
         self.stdout.write(
             self.style.SUCCESS(
                 'Загрузка завершена'
             )
         )
+
+    def write_summary(self, all_stats, loaded, total):
+        self.stdout.write(
+            'Уровень  Таблица       Строк  Добавлено  Обновлено  Время, с'
+            '  Память, КБ'
+        )
+        for stats in all_stats:
+            if stats.unchanged_file:
+                self.stdout.write(
+                    f'{stats.level:<8} {stats.model.__name__:<12} '
+                    'файл не изменился'
+                )
+                continue
+            self.stdout.write(
+                f'{stats.level:<8} {stats.model.__name__:<12} '
+                f'{stats.rows:>7} {stats.created:>10} {stats.updated:>10} '
+                f'{stats.seconds:>9.2f} {stats.peak_memory / 1024:>11.0f}'
+            )
+        traced = any(stats.traced for stats in all_stats)
+        self.stdout.write(
+            'Память: пик tracemalloc при загрузке таблицы' if traced
+            else 'Память: пик RSS процесса'
+        )
+        self.stdout.write(
+            f'Загрузка таблиц: {loaded:.2f} с, '
+            f'с пересчетом счетчиков: {total:.2f} с'
+        )
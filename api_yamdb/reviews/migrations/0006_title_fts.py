@@ -0,0 +1,17 @@
+from django.db import migrations
+
+import reviews.search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            reviews.search.create_title_fts,
+            reviews.search.drop_title_fts,
+        ),
+    ]
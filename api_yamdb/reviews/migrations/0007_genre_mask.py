@@ -0,0 +1,60 @@
+# Generated by Django 3.2 on 2026-10-18 15:47
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+import reviews.search
+
+GENRE_MASK_BITS = 63
+
+
+def fill_genre_masks(apps, schema_editor):
+    Genre = apps.get_model('reviews', 'Genre')
+    Title = apps.get_model('reviews', 'Title')
+    TitleGenre = apps.get_model('reviews', 'TitleGenre')
+    genres = list(Genre.objects.order_by('pk')[:GENRE_MASK_BITS])
+    for bit, genre in enumerate(genres):
+        genre.bit = bit
+    Genre.objects.bulk_update(genres, ('bit',))
+    masks = defaultdict(int)
+    links = TitleGenre.objects.filter(
+        genre__bit__isnull=False
+    ).values_list('title_id', 'genre__bit')
+    for title_id, bit in links.iterator():
+        masks[title_id] |= 1 << bit
+    by_mask = defaultdict(list)
+    for title_id, mask in masks.items():
+        by_mask[mask].append(title_id)
+    for mask, title_ids in by_mask.items():
+        Title.objects.filter(pk__in=title_ids).update(genre_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_fts'),
+    ]
+
+    operations = [
+        # Обратный ход: триггеры поиска теряются при откате полей Title.
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            reviews.search.restore_title_fts_triggers,
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Бит в маске жанров'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='genre_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска жанров'),
+        ),
+        migrations.RunPython(fill_genre_masks, migrations.RunPython.noop),
+        migrations.RunPython(
+            reviews.search.restore_title_fts_triggers,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+import reviews.search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_genre_mask'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            reviews.search.restore_title_fts_triggers,
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия'),
+        ),
+        migrations.RunPython(
+            reviews.search.restore_title_fts_triggers,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -1,7 +1,14 @@
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-from api.utils import MAX_TITLE_LENGTH, MAX_STR_TEXT_LIMIT
+from api.utils import GENRE_MASK_BITS, MAX_TITLE_LENGTH, MAX_STR_TEXT_LIMIT
 from users.models import User
 from .validators import validate_year
 
@@ -27,6 +34,29 @@ class Category(models.Model):
         return self.name[:MAX_STR_TEXT_LIMIT]
 
 
+class GenreQuerySet(models.QuerySet):
+
+    def free_bits(self):
+        used = set(
+            Genre.objects.exclude(bit=None).values_list('bit', flat=True)
+        )
+        return (bit for bit in range(GENRE_MASK_BITS) if bit not in used)
+
+    def assign_bits(self):
+        """
+        Раздает жанрам без бита свободные биты маски по порядку id.
+        Жанрам, которым бита не хватило, фильтр подбирает произведения
+        через связующую таблицу.
+        """
+        genres = []
+        free = self.free_bits()
+        for genre, bit in zip(self.filter(bit=None).order_by('pk'), free):
+            genre.bit = bit
+            genres.append(genre)
+        Genre.objects.bulk_update(genres, ('bit',))
+        return genres
+
+
 class Genre(models.Model):
     """Модель жанров"""
     name = models.CharField(
@@ -39,6 +69,15 @@ class Genre(models.Model):
         db_index=True,
         verbose_name='URL'
     )
+    bit = models.PositiveSmallIntegerField(
+        'Бит в маске жанров',
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+    )
+
+    objects = GenreQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Жанр'
@@ -47,6 +86,137 @@ class Genre(models.Model):
     def __str__(self):
         return self.name[:MAX_STR_TEXT_LIMIT]
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.bit is None:
+            self.bit = next(Genre.objects.free_bits(), None)
+        super().save(*args, **kwargs)
+
+    @property
+    def mask(self):
+        return 0 if self.bit is None else 1 << self.bit
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Проставляет id созданным объектам и на SQLite, где Django 3.2
+        их не возвращает. Внутри транзакции SQLite держит блокировку
+        записи, а AUTOINCREMENT выдает id больше всех существующих,
+        поэтому новые строки — последние len(objs) по id. Это верно,
+        только если id не задан ни у одного объекта; иначе id остаются
+        пустыми, как в самом Django.
+        """
+        objs = list(objs)
+        all_new = all(obj.pk is None for obj in objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if (objs and all_new and objs[0].pk is None
+                    and connections[self.db].vendor == 'sqlite'
+                    and not kwargs.get('ignore_conflicts')):
+                created_ids = sorted(self.order_by('-pk').values_list(
+                    'pk', flat=True
+                )[:len(objs)])
+                if len(created_ids) == len(objs):
+                    for pk, obj in zip(created_ids, objs):
+                        obj.pk = pk
+        return objs
+
+    def recount_ratings(self):
+        """
+        Пересчитывает сумму оценок и число отзывов по таблице отзывов.
+        Нужен после массовых операций, минующих сигналы (bulk_create).
+        """
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score'))
+                         .values('total')), 0
+            ),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('pk'))
+                         .values('total')), 0
+            ),
+        )
+
+    def refresh_genre_masks(self, batch_size=1000):
+        """
+        Пересобирает маски жанров по связующей таблице.
+        Нужен после массовых операций с TitleGenre, минующих сигналы.
+        Сначала маски считаются целиком, затем одной транзакцией
+        пишутся только отличающиеся от сохраненных: фильтр по жанрам
+        ни в какой момент не видит обнуленных или частичных масок.
+        """
+        links = TitleGenre.objects.filter(
+            title__in=self.values('pk'), genre__bit__isnull=False
+        ).order_by('title_id').values_list('title_id', 'genre__bit')
+        # Оба потока упорядочены по id произведения и сливаются за
+        # один проход; в памяти остаются только отличающиеся маски.
+        masks = (
+            (title_id, sum(1 << bit for _, bit in bits))
+            for title_id, bits in groupby(
+                links.iterator(), key=itemgetter(0)
+            )
+        )
+        link = next(masks, None)
+        by_mask = defaultdict(list)
+        for pk, stored in self.order_by('pk').values_list(
+                'pk', 'genre_mask').iterator():
+            mask = 0
+            if link is not None and link[0] == pk:
+                mask = link[1]
+                link = next(masks, None)
+            if mask != stored:
+                by_mask[mask].append(pk)
+        with transaction.atomic(using=self.db):
+            for mask, title_ids in by_mask.items():
+                for start in range(0, len(title_ids), batch_size):
+                    Title.objects.filter(
+                        pk__in=title_ids[start:start + batch_size]
+                    ).update(genre_mask=mask)
+
+    def filter_genres(self, slugs, match_all=False):
+        """
+        Произведения с любым (match_all=False) или со всеми жанрами
+        из slugs. Проверка идет по маске genre_mask, без JOIN по M2M.
+        """
+        slugs = set(slugs)
+        bits = dict(
+            Genre.objects.filter(slug__in=slugs).values_list('slug', 'bit')
+        )
+        if not bits or (match_all and len(bits) < len(slugs)):
+            return self.none()
+        if None in bits.values():
+            if match_all:
+                queryset = self
+                for slug in bits:
+                    queryset = queryset.filter(genre__slug=slug)
+                return queryset
+            return self.filter(genre__slug__in=bits).distinct()
+        mask = sum(1 << bit for bit in bits.values())
+        queryset = self.alias(genre_bits=F('genre_mask').bitand(mask))
+        if match_all:
+            return queryset.filter(genre_bits=mask)
+        return queryset.exclude(genre_bits=0)
+
+    def apply_review_delta(self, score_delta, count_delta):
+        """Атомарно сдвигает сумму оценок и число отзывов."""
+        return self.update(
+            score_sum=F('score_sum') + score_delta,
+            review_count=F('review_count') + count_delta,
+            version=F('version') + 1,
+            modified=timezone.now(),
+        )
+
+    def touch(self):
+        """
+        Отмечает, что представление произведений изменилось:
+        от version и modified зависят ETag и Last-Modified.
+        """
+        return self.update(version=F('version') + 1, modified=timezone.now())
+
 
 class Title(models.Model):
     """Модель произведений"""
@@ -75,6 +245,38 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория',
     )
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    genre_mask = models.BigIntegerField(
+        'Маска жанров',
+        default=0,
+        editable=False,
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False,
+    )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+
+    objects = TitleQuerySet.as_manager()
+
+    # Поля, которые меняются только атомарными UPDATE из сигналов
+    # и методов TitleQuerySet; обычный save() их не перезаписывает.
+    DENORMALIZED_FIELDS = (
+        'score_sum', 'review_count', 'genre_mask', 'version'
+    )
 
     class Meta:
         verbose_name = 'Произведение'
@@ -83,6 +285,32 @@ class Title(models.Model):
     def __str__(self):
         return self.name[:MAX_STR_TEXT_LIMIT]
 
+    def save(self, *args, **kwargs):
+        if (not self._state.adding
+                and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = self.get_update_fields()
+        super().save(*args, **kwargs)
+
+    def get_update_fields(self, *extra):
+        """Поля для UPDATE при save(): все, кроме денормализованных."""
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.name not in self.DENORMALIZED_FIELDS
+        ] + list(extra)
+
+    @property
+    def rating(self):
+        """Средняя оценка по хранимым счетчикам, без агрегации."""
+        return self.calculate_rating(self.score_sum, self.review_count)
+
+    @staticmethod
+    def calculate_rating(score_sum, review_count):
+        if review_count:
+            return round(score_sum / review_count)
+        return None
+
 
 class TitleGenre(models.Model):
     """Модель для связи многие ко многим"""
@@ -102,6 +330,20 @@ class TitleGenre(models.Model):
                 name='title_genre_constraint'),
         )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.refresh_title()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.refresh_title()
+        return result
+
+    def refresh_title(self):
+        titles = Title.objects.filter(pk=self.title_id)
+        titles.refresh_genre_masks()
+        titles.touch()
+
     def __str__(self):
         return (
             f'{self.title.name[:MAX_STR_TEXT_LIMIT]}'
@@ -146,6 +388,21 @@ class Review(models.Model):
                 name='unique_review'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем оценку из БД, чтобы при сохранении
+        # сдвинуть рейтинг произведения на разницу без лишнего запроса.
+        if 'score' in field_names:
+            instance._loaded_score = instance.score
+        return instance
 
 
 class Comment(models.Model):
@@ -169,5 +426,38 @@ class Comment(models.Model):
     )
     text = models.TextField(verbose_name='Комментарий')
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
+
     def __str__(self):
         return self.author
+
+
+class ImportLog(models.Model):
+    """Последняя успешная загрузка файла командой importcsv."""
+    file_name = models.CharField(
+        'Файл',
+        max_length=255,
+        unique=True,
+    )
+    content_hash = models.CharField(
+        'Хэш содержимого',
+        max_length=64,
+    )
+    rows = models.PositiveIntegerField('Строк')
+    imported_at = models.DateTimeField(
+        'Дата загрузки',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Загрузка файла'
+        verbose_name_plural = 'Загрузки файлов'
+
+    def __str__(self):
+        return self.file_name
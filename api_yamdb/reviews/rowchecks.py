@@ -0,0 +1,164 @@
+"""
+Проверки строк CSV перед импортом.
+
+Как и reviews.sources, модуль не зависит от Django и выполняется
+в процессах пула. Правила колонок строятся из полей моделей
+в reviews.validation и передаются сюда простыми словарями:
+    type        'int', 'str', 'datetime' или 'any'
+    empty       можно ли оставить значение пустым
+    max_length  наибольшая длина строки
+    min, max    границы целого значения
+    choices     допустимые значения
+"""
+import csv
+from datetime import datetime
+
+from .sources import iter_lines
+
+MAX_ERRORS = 100
+
+
+def check_int(rule, value):
+    try:
+        number = int(value)
+    except ValueError:
+        return f'ожидается целое число, получено {value!r}'
+    if rule.get('min') is not None and number < rule['min']:
+        return f'значение {number} меньше {rule["min"]}'
+    if rule.get('max') is not None and number > rule['max']:
+        return f'значение {number} больше {rule["max"]}'
+    return None
+
+
+def check_datetime(rule, value):
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return f'ожидается дата и время, получено {value!r}'
+    return None
+
+
+def check_str(rule, value):
+    max_length = rule.get('max_length')
+    if max_length is not None and len(value) > max_length:
+        return f'длина {len(value)} больше {max_length}'
+    return None
+
+
+TYPE_CHECKS = {
+    'int': check_int,
+    'datetime': check_datetime,
+    'str': check_str,
+}
+
+
+def check_value(rule, value):
+    """Возвращает текст ошибки или None, если значение подходит."""
+    if value == '':
+        return None if rule['empty'] else 'обязательное значение'
+    check = TYPE_CHECKS.get(rule['type'])
+    error = check(rule, value) if check else None
+    if error is None and rule.get('choices') and (
+            value not in rule['choices']):
+        error = f'недопустимое значение {value!r}'
+    return error
+
+
+class FileReport:
+    """Итог проверки одного файла."""
+
+    def __init__(self, source):
+        self.source = source
+        self.rows = 0
+        self.errors = []
+        self.pks = None
+        self.refs = {}
+
+    def add_error(self, line, message):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+def check_header(report, header, rules, required):
+    for column in header:
+        if column not in rules:
+            report.add_error(1, f'{column}: неизвестная колонка')
+    for names in required:
+        if not any(name in header for name in names):
+            report.add_error(1, f'{names[0]}: колонка отсутствует')
+
+
+def check_row(report, line, row, checked):
+    valid = True
+    for index, column, rule in checked:
+        error = check_value(rule, row[index])
+        if error:
+            valid = False
+            report.add_error(line, f'{column}: {error}')
+    return valid
+
+
+def collect_ids(report, line, row, pk_index, pk_column, refs):
+    pk = row[pk_index] if pk_index is not None else ''
+    if pk != '':
+        if int(pk) in report.pks:
+            report.add_error(line, f'{pk_column}: повторяется {pk}')
+        report.pks.add(int(pk))
+    for index, values in refs:
+        if row[index] != '':
+            values.add(int(row[index]))
+
+
+def check_source(source, rules, required, pk_column, ref_columns, collect_pks):
+    """
+    Проверяет типы и ограничения каждой колонки, повторы id и
+    собирает множества id: свои (если на файл ссылаются другие)
+    и упомянутые во внешних ключах, чтобы сверить их после.
+    """
+    report = FileReport(source)
+    report.refs = {column: set() for column in ref_columns}
+    report.pks = set()
+    try:
+        lines = iter_lines(source)
+        _, header = next(lines, (0, []))
+        check_header(report, header, rules, required)
+        checked = [
+            (index, column, rules[column])
+            for index, column in enumerate(header) if column in rules
+        ]
+        refs = [
+            (index, report.refs[column])
+            for index, column in enumerate(header) if column in report.refs
+        ]
+        pk_index = header.index(pk_column) if pk_column in header else None
+        for line, row in lines:
+            report.rows += 1
+            if len(row) != len(header):
+                report.add_error(
+                    line, f'ожидается {len(header)} значений, '
+                    f'получено {len(row)}'
+                )
+                continue
+            if check_row(report, line, row, checked):
+                collect_ids(report, line, row, pk_index, pk_column, refs)
+    except (UnicodeDecodeError, csv.Error, ValueError, OSError) as error:
+        report.add_error(report.rows + 1, f'файл не читается: {error}')
+    if not collect_pks:
+        report.pks = None
+    return report
+
+
+def find_references(source, column, missing):
+    """Номера строк, где в колонке column указан id из missing."""
+    found = []
+    lines = iter_lines(source)
+    _, header = next(lines, (0, []))
+    index = header.index(column)
+    for line, row in lines:
+        if len(row) == len(header) and row[index] != '':
+            value = int(row[index])
+            if value in missing:
+                found.append((line, value))
+                if len(found) >= MAX_ERRORS:
+                    break
+    return found
@@ -0,0 +1,122 @@
+"""
+Полнотекстовый поиск произведений по названию.
+
+На SQLite названия индексируются в виртуальной таблице FTS5 с триграммным
+токенизатором: она ищет подстроки без учета регистра (в том числе
+кириллицы) и ранжирует совпадения по релевантности. Таблица хранит только
+индекс (external content), а синхронизацию с reviews_title ведут триггеры,
+поэтому индекс актуален и после bulk_create и импорта из CSV.
+"""
+import sqlite3
+
+from django.db import connections
+
+TITLE_TABLE = 'reviews_title'
+FTS_TABLE = 'reviews_title_fts'
+# Триграммный индекс не находит строки короче трех символов.
+MIN_QUERY_LENGTH = 3
+
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, content='{TITLE_TABLE}', content_rowid='id', "
+    f"tokenize='trigram')"
+)
+REBUILD_FTS_TABLE = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+DROP_FTS_TABLE = f'DROP TABLE IF EXISTS {FTS_TABLE}'
+
+FTS_INSERT = (
+    f'INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);'
+)
+FTS_DELETE = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    f"VALUES ('delete', old.id, old.name);"
+)
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f'AFTER INSERT ON {TITLE_TABLE}',
+    f'{FTS_TABLE}_ad': f'AFTER DELETE ON {TITLE_TABLE}',
+    f'{FTS_TABLE}_au': f'AFTER UPDATE OF name ON {TITLE_TABLE}',
+}
+FTS_TRIGGER_BODIES = {
+    f'{FTS_TABLE}_ai': FTS_INSERT,
+    f'{FTS_TABLE}_ad': FTS_DELETE,
+    f'{FTS_TABLE}_au': FTS_DELETE + ' ' + FTS_INSERT,
+}
+
+_available = {}
+
+
+def fts_supported(connection):
+    """FTS5 с токенизатором trigram есть в SQLite начиная с 3.34."""
+    return (
+        connection.vendor == 'sqlite'
+        and sqlite3.sqlite_version_info >= (3, 34)
+    )
+
+
+def create_title_fts_triggers(schema_editor):
+    """
+    Создает триггеры синхронизации индекса.
+    SQLite удаляет триггеры вместе с таблицей, а Django пересоздает
+    reviews_title при изменении ее полей, поэтому каждая миграция,
+    меняющая Title, должна вызывать эту функцию после своих операций.
+    """
+    if not fts_supported(schema_editor.connection):
+        return
+    for name, event in FTS_TRIGGERS.items():
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(
+            f'CREATE TRIGGER {name} {event} '
+            f'BEGIN {FTS_TRIGGER_BODIES[name]} END'
+        )
+
+
+def create_title_fts(apps, schema_editor):
+    if not fts_supported(schema_editor.connection):
+        return
+    schema_editor.execute(CREATE_FTS_TABLE)
+    schema_editor.execute(REBUILD_FTS_TABLE)
+    create_title_fts_triggers(schema_editor)
+
+
+def drop_title_fts(apps, schema_editor):
+    if not fts_supported(schema_editor.connection):
+        return
+    for name in FTS_TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute(DROP_FTS_TABLE)
+
+
+def restore_title_fts_triggers(apps, schema_editor):
+    """Обертка для RunPython в миграциях, пересоздающих reviews_title."""
+    create_title_fts_triggers(schema_editor)
+
+
+def fts_available(using):
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            fts_supported(connection)
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def search_titles(queryset, query):
+    """
+    Отбирает произведения, в названии которых есть query,
+    и сортирует их по релевантности.
+    Короткие запросы и базы без FTS5 обрабатываются через icontains.
+    """
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH or not fts_available(queryset.db):
+        return queryset.filter(name__icontains=query)
+    phrase = '"{}"'.format(query.replace('"', '""'))
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {TITLE_TABLE}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[phrase],
+        order_by=[f'{FTS_TABLE}.rank', f'{TITLE_TABLE}.id'],
+    )
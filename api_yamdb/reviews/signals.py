@@ -0,0 +1,128 @@
+from django.db.models import F, Q
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from users.models import User
+from .models import Category, Comment, Genre, Review, Title
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_score(sender, instance, **kwargs):
+    """Подгружает прежнюю оценку, если объект создан не из БД."""
+    if instance._state.adding or hasattr(instance, '_loaded_score'):
+        return
+    instance._loaded_score = (
+        Review.objects.filter(pk=instance.pk)
+        .values_list('score', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    """
+    Обновляет счетчики рейтинга при создании и смене оценки
+    и версию произведения при любом изменении отзыва.
+    """
+    if created:
+        score_delta, count_delta = instance.score, 1
+    else:
+        loaded_score = getattr(instance, '_loaded_score', None)
+        if loaded_score is None:
+            loaded_score = instance.score
+        score_delta, count_delta = instance.score - loaded_score, 0
+    instance._loaded_score = instance.score
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        score_delta, count_delta
+    )
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """
+    Вычитает отзыв из счетчиков рейтинга.
+    Срабатывает и при каскадном удалении пользователя или произведения.
+    """
+    score = getattr(instance, '_loaded_score', instance.score)
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(-score, -1)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def update_genre_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    """Пересобирает маски жанров после add/remove/clear/set."""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_title_ids = list(
+            instance.titles.values_list('pk', flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        titles = Title.objects.filter(pk=instance.pk)
+    elif action == 'post_clear':
+        titles = Title.objects.filter(pk__in=instance._cleared_title_ids)
+    else:
+        titles = Title.objects.filter(pk__in=pk_set)
+    titles.refresh_genre_masks()
+    titles.touch()
+
+
+@receiver(post_delete, sender=Genre)
+def clear_genre_bit(sender, instance, **kwargs):
+    """Снимает бит удаленного жанра со всех произведений."""
+    if instance.bit is None:
+        return
+    Title.objects.alias(
+        genre_bits=F('genre_mask').bitand(instance.mask)
+    ).exclude(genre_bits=0).update(genre_mask=F('genre_mask') - instance.mask)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def touch_title_on_comment(sender, instance, **kwargs):
+    Title.objects.filter(reviews=instance.review_id).touch()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Category)
+def touch_titles_on_rename(sender, instance, created, **kwargs):
+    """Название жанра и категории выводится в карточках произведений."""
+    if created:
+        return
+    if sender is Genre:
+        Title.objects.filter(genre=instance).touch()
+    else:
+        Title.objects.filter(category=instance).touch()
+
+
+@receiver(pre_delete, sender=Genre)
+def touch_titles_on_genre_delete(sender, instance, **kwargs):
+    Title.objects.filter(genre=instance).touch()
+
+
+@receiver(pre_delete, sender=Category)
+def touch_titles_on_category_delete(sender, instance, **kwargs):
+    Title.objects.filter(category=instance).touch()
+
+
+@receiver(post_save, sender=User)
+def touch_titles_on_user_change(sender, instance, created, update_fields,
+                                **kwargs):
+    """
+    Имя автора выводится в отзывах и комментариях, остальные поля
+    пользователя — нет. Если имя из БД неизвестно, произведения
+    отмечаются на всякий случай.
+    """
+    if update_fields and 'username' not in update_fields:
+        return
+    loaded_username = getattr(instance, '_loaded_username', None)
+    instance._loaded_username = instance.username
+    if created or loaded_username == instance.username:
+        return
+    Title.objects.filter(
+        Q(reviews__author=instance) | Q(reviews__comments__author=instance)
+    ).touch()
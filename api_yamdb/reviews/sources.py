@@ -0,0 +1,232 @@
+"""
+Чтение исходных файлов импорта.
+
+Модуль не зависит от Django: его функции выполняются в процессах
+пула разбора, которые не настраивают проект и не ходят в базу.
+Разобранные строки передаются в очередь пачками, а ограниченный
+размер очереди держит память постоянной, если запись отстает.
+
+Таблица ищется в каталоге или в zip-архиве в одном из форматов:
+titles.csv, titles.csv.gz, titles.jsonl, titles.jsonl.gz. Сжатые
+файлы и члены архива распаковываются на лету, без временных файлов.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+QUEUE_SIZE = 4
+PUT_TIMEOUT = 0.5
+HASH_CHUNK_SIZE = 2 ** 20
+FORMATS = ('.csv', '.csv.gz', '.jsonl', '.jsonl.gz')
+
+# path — файл или zip-архив, member — имя файла внутри архива.
+Source = namedtuple('Source', 'path member name')
+
+
+def table_names(file_name):
+    """Имена файла таблицы во всех поддерживаемых форматах."""
+    stem = file_name[:-len('.csv')] if file_name.endswith(
+        '.csv') else file_name
+    return [stem + suffix for suffix in FORMATS]
+
+
+def find_source(path, file_name):
+    """
+    Находит таблицу file_name (например, 'titles.csv') в каталоге
+    или zip-архиве path. Внутри архива файлы могут лежать в папке.
+    """
+    names = table_names(file_name)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            members = {
+                os.path.basename(member): member
+                for member in archive.namelist() if not member.endswith('/')
+            }
+        for name in names:
+            if name in members:
+                return Source(path, members[name], name)
+    else:
+        for name in names:
+            if os.path.isfile(os.path.join(path, name)):
+                return Source(os.path.join(path, name), None, name)
+    raise FileNotFoundError(
+        f'В {path} нет файла {" / ".join(names)}'
+    )
+
+
+@contextmanager
+def open_binary(source):
+    if source.member is None:
+        with open(source.path, 'rb') as stream:
+            yield stream
+    else:
+        with zipfile.ZipFile(source.path) as archive:
+            with archive.open(source.member) as stream:
+                yield stream
+
+
+class HashingReader(io.RawIOBase):
+    """Поток, который по пути обновляет хэш прочитанных байтов."""
+
+    def __init__(self, stream, digest):
+        self.stream = stream
+        self.digest = digest
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        self.digest.update(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def drain(self):
+        """Дочитывает хвост, чтобы хэш покрыл файл целиком."""
+        for chunk in iter(lambda: self.stream.read(HASH_CHUNK_SIZE), b''):
+            self.digest.update(chunk)
+
+
+@contextmanager
+def open_text(source, digest=None):
+    """
+    Текстовый поток таблицы с распаковкой gzip на лету. С digest
+    по дороге считается хэш файла, как его считает file_hash.
+    """
+    with open_binary(source) as stream:
+        hashing = None
+        if digest is not None:
+            hashing = HashingReader(stream, digest)
+            stream = io.BufferedReader(hashing, HASH_CHUNK_SIZE)
+        if source.name.endswith('.gz'):
+            stream = gzip.GzipFile(fileobj=stream)
+        yield io.TextIOWrapper(stream, encoding='utf8', newline='')
+        if hashing is not None:
+            hashing.drain()
+
+
+def file_hash(source):
+    """SHA-256 содержимого файла (как он лежит на диске), блоками."""
+    digest = hashlib.sha256()
+    with open_binary(source) as stream:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def csv_lines(text):
+    """Заголовок и строки CSV с номером строки начала записи."""
+    reader = csv.reader(text)
+    line = reader.line_num + 1
+    for row in reader:
+        yield line, row
+        line = reader.line_num + 1
+
+
+def json_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def jsonl_lines(text):
+    """
+    Записи JSON Lines в том же виде, что csv_lines: сначала заголовок
+    из ключей первой записи, затем списки строковых значений.
+    """
+    header = None
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        record = json.loads(raw)
+        if not isinstance(record, dict):
+            raise ValueError(f'строка {line}: ожидается объект JSON')
+        if header is None:
+            header = list(record)
+            yield 0, header
+        extra = set(record) - set(header)
+        if extra:
+            raise ValueError(
+                f'строка {line}: ключи {", ".join(sorted(extra))} '
+                'отсутствуют в первой записи'
+            )
+        yield line, [json_value(record.get(key)) for key in header]
+
+
+def iter_lines(source, digest=None):
+    """
+    Номер строки и список значений: первым идет заголовок,
+    дальше записи таблицы в любом поддерживаемом формате.
+    """
+    with open_text(source, digest) as text:
+        if '.jsonl' in source.name:
+            yield from jsonl_lines(text)
+        else:
+            yield from csv_lines(text)
+
+
+def read_rows(source, digest=None):
+    """Строки таблицы словарями по заголовку."""
+    lines = iter_lines(source, digest)
+    _, header = next(lines, (0, []))
+    for _, row in lines:
+        yield dict(zip(header, row))
+
+
+def put(rows_queue, item, stop):
+    """Кладет item в очередь, пока загрузку не остановили."""
+    while not stop.is_set():
+        try:
+            rows_queue.put(item, timeout=PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def parse_source(source, rows_queue, stop, batch_size, hash_content=False):
+    """
+    Разбирает файл в процессе пула: первым сообщением отправляет
+    заголовок, затем списки строк по batch_size, в конце None.
+    С hash_content возвращает хэш файла, посчитанный при разборе.
+    """
+    digest = hashlib.sha256() if hash_content else None
+    try:
+        lines = iter_lines(source, digest)
+        _, header = next(lines, (0, []))
+        if not put(rows_queue, header, stop):
+            return
+        batch = []
+        for _, row in lines:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                if not put(rows_queue, batch, stop):
+                    return
+                batch = []
+        if batch:
+            put(rows_queue, batch, stop)
+    finally:
+        put(rows_queue, None, stop)
+    return digest and digest.hexdigest()
+
+
+def iter_queue(rows_queue):
+    """Словари строк из очереди, заполняемой parse_source."""
+    header = rows_queue.get()
+    if header is None:
+        return
+    while True:
+        batch = rows_queue.get()
+        if batch is None:
+            return
+        for row in batch:
+            yield dict(zip(header, row))
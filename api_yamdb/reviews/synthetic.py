@@ -0,0 +1,233 @@
+"""
+Детерминированный синтетический каталог для нагрузочного тестирования.
+
+Каждая таблица генерируется своим random.Random, засеянным от общего
+seed и имени таблицы, поэтому одинаковый seed дает одинаковые данные
+независимо от порядка и набора таблиц. Строки выдаются генераторами
+в формате CSV из static/data, так что их можно записать в файлы для
+importcsv или сразу отдать reviews.importer.import_table.
+
+Популярность произведений распределена по закону Ципфа с параметром
+skew: несколько произведений собирают большую часть отзывов. Автор
+пишет на произведение не больше одного отзыва: авторы отзывов на
+произведение идут по кольцу id пользователей с шагом, взаимно простым
+с их числом, поэтому повторов нет и пары не нужно хранить в памяти.
+Комментарии тоже смещены к первым отзывам.
+"""
+import random
+from array import array
+from datetime import datetime, timedelta, timezone
+from math import gcd
+
+GENRE_NAMES = (
+    'Драма', 'Комедия', 'Вестерн', 'Фэнтези', 'Фантастика', 'Детектив',
+    'Триллер', 'Сказка', 'Гонзо', 'Роман', 'Баллада', 'Рок-н-ролл',
+    'Классика', 'Рок', 'Шансон',
+)
+CATEGORY_NAMES = ('Фильм', 'Книга', 'Музыка', 'Сериал', 'Игра')
+WORDS = (
+    'тихий', 'дон', 'мастер', 'дорога', 'ночь', 'город', 'звезда',
+    'последний', 'день', 'море', 'сад', 'полет', 'песня', 'война', 'мир',
+    'солнце', 'тень', 'ветер', 'дом', 'река', 'зима', 'лето', 'сердце',
+)
+REVIEW_TEXTS = (
+    'Смотрел на одном дыхании.',
+    'Ожидал большего, но в целом неплохо.',
+    'Классика, которую стоит пересматривать.',
+    'Слишком затянуто, середина провисает.',
+    'Лучшее, что я видел за последний год.',
+    'Музыка отличная, сюжет слабый.',
+)
+COMMENT_TEXTS = (
+    'Полностью согласен.',
+    'Не соглашусь, финал сильный.',
+    'А мне понравилось.',
+    'Спасибо за отзыв!',
+)
+FIRST_PUB_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+PUB_DATE_RANGE = 8 * 365 * 24 * 3600
+# Доля модераторов и администраторов среди пользователей.
+MODERATOR_SHARE = 0.01
+ADMIN_SHARE = 0.001
+
+COLUMNS = {
+    'users.csv': (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    ),
+    'genre.csv': ('id', 'name', 'slug'),
+    'category.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+
+class CatalogSpec:
+    """Размеры каталога, seed и перекос популярности."""
+
+    def __init__(self, users=1000, genres=15, categories=5, titles=1000,
+                 reviews=10000, comments=20000, seed=1, skew=1.1,
+                 max_year=None):
+        self.users = max(users, 1)
+        self.genres = max(genres, 1)
+        self.categories = max(categories, 1)
+        self.titles = titles
+        self.reviews = min(reviews, self.users * titles)
+        self.comments = comments
+        self.seed = seed
+        self.skew = skew
+        self.max_year = max_year or datetime.now().year
+
+    def random(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+
+def pub_date(rng):
+    moment = FIRST_PUB_DATE + timedelta(seconds=rng.randrange(PUB_DATE_RANGE))
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def skewed_index(rng, size, skew):
+    """Индекс от 0 до size - 1, маленькие выпадают чаще (степенной закон)."""
+    return min(int(size * rng.random() ** (1 + skew)), size - 1)
+
+
+def gen_users(spec):
+    rng = spec.random('users')
+    for pk in range(1, spec.users + 1):
+        chance = rng.random()
+        role = 'user'
+        if chance < ADMIN_SHARE:
+            role = 'admin'
+        elif chance < ADMIN_SHARE + MODERATOR_SHARE:
+            role = 'moderator'
+        yield {
+            'id': pk,
+            'username': f'user{pk}',
+            'email': f'user{pk}@yamdb.fake',
+            'role': role,
+            'bio': '',
+            'first_name': '',
+            'last_name': '',
+        }
+
+
+def gen_genres(spec):
+    for pk in range(1, spec.genres + 1):
+        name = GENRE_NAMES[(pk - 1) % len(GENRE_NAMES)]
+        if pk > len(GENRE_NAMES):
+            name = f'{name} {pk}'
+        yield {'id': pk, 'name': name, 'slug': f'genre-{pk}'}
+
+
+def gen_categories(spec):
+    for pk in range(1, spec.categories + 1):
+        name = CATEGORY_NAMES[(pk - 1) % len(CATEGORY_NAMES)]
+        if pk > len(CATEGORY_NAMES):
+            name = f'{name} {pk}'
+        yield {'id': pk, 'name': name, 'slug': f'category-{pk}'}
+
+
+def gen_titles(spec):
+    rng = spec.random('titles')
+    for pk in range(1, spec.titles + 1):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        yield {
+            'id': pk,
+            'name': ' '.join(words).capitalize() + f' {pk}',
+            'year': rng.randint(1900, spec.max_year),
+            'category': skewed_index(rng, spec.categories, spec.skew) + 1,
+        }
+
+
+def gen_genre_titles(spec):
+    rng = spec.random('genre_title')
+    pk = 0
+    for title_id in range(1, spec.titles + 1):
+        count = min(rng.randint(1, 3), spec.genres)
+        for genre_id in sorted(rng.sample(range(1, spec.genres + 1), count)):
+            pk += 1
+            yield {'id': pk, 'title_id': title_id, 'genre_id': genre_id}
+
+
+def review_counts(spec):
+    """
+    Число отзывов на каждое произведение: доли по Ципфу от
+    spec.reviews с перемешанным рангом, не больше числа пользователей.
+    Остаток от округления добавляется самым популярным.
+    """
+    rng = spec.random('popularity')
+    order = array('l', range(spec.titles))
+    rng.shuffle(order)
+    total = sum(1 / rank ** spec.skew for rank in range(1, spec.titles + 1))
+    counts = array('l', [0]) * spec.titles
+    assigned = 0
+    for rank, index in enumerate(order, 1):
+        count = min(
+            spec.users, int(spec.reviews / rank ** spec.skew / total)
+        )
+        counts[index] = count
+        assigned += count
+    rank = 0
+    while assigned < spec.reviews:
+        index = order[rank % spec.titles]
+        if counts[index] < spec.users:
+            counts[index] += 1
+            assigned += 1
+        rank += 1
+    return counts
+
+
+def review_authors(rng, users, count):
+    """count разных id пользователей: обход кольца с взаимно простым шагом."""
+    start = rng.randrange(users)
+    step = 1
+    if users > 1:
+        step = rng.randrange(1, users)
+        while gcd(step, users) != 1:
+            step = rng.randrange(1, users)
+    for offset in range(count):
+        yield (start + offset * step) % users + 1
+
+
+def gen_reviews(spec):
+    rng = spec.random('reviews')
+    pk = 0
+    for index, count in enumerate(review_counts(spec)):
+        quality = rng.randint(3, 9)
+        for author in review_authors(rng, spec.users, count):
+            pk += 1
+            yield {
+                'id': pk,
+                'title_id': index + 1,
+                'text': rng.choice(REVIEW_TEXTS),
+                'author': author,
+                'score': max(1, min(10, quality + rng.randint(-2, 2))),
+                'pub_date': pub_date(rng),
+            }
+
+
+def gen_comments(spec):
+    if not spec.reviews:
+        return
+    rng = spec.random('comments')
+    for pk in range(1, spec.comments + 1):
+        yield {
+            'id': pk,
+            'review_id': skewed_index(rng, spec.reviews, spec.skew) + 1,
+            'text': rng.choice(COMMENT_TEXTS),
+            'author': rng.randrange(spec.users) + 1,
+            'pub_date': pub_date(rng),
+        }
+
+
+GENERATORS = {
+    'users.csv': gen_users,
+    'genre.csv': gen_genres,
+    'category.csv': gen_categories,
+    'titles.csv': gen_titles,
+    'genre_title.csv': gen_genre_titles,
+    'review.csv': gen_reviews,
+    'comments.csv': gen_comments,
+}
@@ -0,0 +1,205 @@
+"""
+Проверка файлов импорта до записи в базу.
+
+Правила колонок берутся из полей моделей: тип, длина, пустые значения,
+choices, MinValueValidator/MaxValueValidator и validate_year. Файлы
+проверяются параллельно в процессах (reviews.rowchecks), попутно
+собираются множества id. После этого внешние ключи сверяются с id
+из родительских файлов и, для недостающих, с базой: при --delta
+родительский файл может быть пропущен, а строки уже загружены.
+Номера строк для битых ссылок ищутся повторным проходом только
+по файлам, где такие ссылки нашлись.
+"""
+import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models
+
+from .rowchecks import check_source, find_references
+from .validators import validate_year
+
+INTEGER_FIELDS = (
+    models.IntegerField, models.AutoField, models.BigAutoField,
+)
+POSITIVE_FIELDS = (
+    models.PositiveIntegerField,
+    models.PositiveSmallIntegerField,
+    models.PositiveBigIntegerField,
+)
+STRING_FIELDS = (models.CharField, models.TextField)
+# Пароли не импортируются: пользователи входят по коду подтверждения.
+OPTIONAL_COLUMNS = ('password',)
+# Сколько id сверять с базой одним запросом (лимит переменных SQLite).
+DB_CHECK_CHUNK = 900
+
+
+class ImportValidationError(Exception):
+    """Файлы импорта не прошли проверку; errors — список сообщений."""
+
+    def __init__(self, errors):
+        super().__init__(f'Ошибок в файлах импорта: {len(errors)}')
+        self.errors = errors
+
+
+def field_rule(field):
+    target = field.target_field if field.is_relation else field
+    rule = {'type': 'any', 'empty': field.null or field.blank}
+    if getattr(field, 'auto_now', False) or getattr(
+            field, 'auto_now_add', False):
+        rule['empty'] = True
+        return rule
+    if isinstance(target, INTEGER_FIELDS):
+        rule['type'] = 'int'
+        if isinstance(target, POSITIVE_FIELDS):
+            rule['min'] = 0
+    elif isinstance(field, models.DateTimeField):
+        rule['type'] = 'datetime'
+    elif isinstance(field, STRING_FIELDS):
+        rule['type'] = 'str'
+        rule['max_length'] = field.max_length
+    if field.choices:
+        rule['choices'] = tuple(str(value) for value, _ in field.choices)
+    rule.update(validator_bounds(field))
+    return rule
+
+
+def validator_bounds(field):
+    bounds = {}
+    for validator in field.validators:
+        if isinstance(validator, MinValueValidator):
+            bounds['min'] = validator.limit_value
+        elif isinstance(validator, MaxValueValidator):
+            bounds['max'] = validator.limit_value
+        elif validator is validate_year:
+            bounds['max'] = dt.date.today().year
+    return bounds
+
+
+def column_rules(model):
+    """Правила для колонок CSV: по имени поля и по attname (title_id)."""
+    rules = {}
+    for field in model._meta.concrete_fields:
+        rule = field_rule(field)
+        rules[field.name] = rule
+        rules[field.attname] = rule
+    return rules
+
+
+def required_columns(model):
+    """Обязательные колонки: (имя поля, attname) — подходит любое."""
+    return [
+        (field.name, field.attname) for field in model._meta.concrete_fields
+        if not (field.null or field.blank or field.has_default()
+                or getattr(field, 'auto_now_add', False)
+                or getattr(field, 'auto_now', False)
+                or field.name in OPTIONAL_COLUMNS)
+    ]
+
+
+def reference_columns(model):
+    """{колонка: модель}, для внешних ключей модели."""
+    return {
+        column: field.related_model
+        for field in model._meta.concrete_fields if field.is_relation
+        for column in (field.name, field.attname)
+    }
+
+
+def missing_in_db(model, ids):
+    ids = sorted(ids)
+    found = set()
+    for start in range(0, len(ids), DB_CHECK_CHUNK):
+        found.update(model.objects.filter(
+            pk__in=ids[start:start + DB_CHECK_CHUNK]
+        ).values_list('pk', flat=True))
+    return set(ids) - found
+
+
+def run(pool, function, calls):
+    if pool is None:
+        return [function(*args) for args in calls]
+    return [
+        future.result()
+        for future in [pool.submit(function, *args) for args in calls]
+    ]
+
+
+def existing_in_db(model, ids):
+    """Какие из ids уже есть в таблице: один проход по диапазону id."""
+    if not ids:
+        return set()
+    stored = model.objects.filter(
+        pk__gte=min(ids), pk__lte=max(ids)
+    ).values_list('pk', flat=True).iterator()
+    return ids.intersection(stored)
+
+
+def broken_references(reports):
+    """(модель, колонка, id, текст ошибки) для ссылок на несуществующее."""
+    broken = []
+    for model, report in reports.items():
+        columns = reference_columns(model)
+        for column, ids in report.refs.items():
+            target = columns[column]
+            known = reports[target].pks if target in reports else None
+            missing = ids - known if known is not None else ids
+            if missing:
+                missing = missing_in_db(target, missing)
+            if missing:
+                broken.append((
+                    model, column, missing,
+                    f'нет объекта {target.__name__} с id',
+                ))
+    return broken
+
+
+def validate_tables(sources, workers=0, upsert=False):
+    """
+    Проверяет файлы {модель: Source} (reviews.sources.find_source).
+    Без upsert id строк не должны совпадать с уже загруженными.
+    Возвращает список ошибок вида 'файл:строка: сообщение'.
+    """
+    targets = {
+        related for model in sources
+        for related in reference_columns(model).values()
+    }
+    calls = [
+        (
+            source,
+            column_rules(model),
+            required_columns(model),
+            model._meta.pk.name,
+            list(reference_columns(model)),
+            model in targets or not upsert,
+        )
+        for model, source in sources.items()
+    ]
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    with pool or nullcontext():
+        reports = dict(zip(sources, run(pool, check_source, calls)))
+        errors = [
+            f'{sources[model].name}:{line}: {message}'
+            for model, report in reports.items()
+            for line, message in report.errors
+        ]
+        problems = broken_references(reports)
+        if not upsert:
+            for model, report in reports.items():
+                duplicates = existing_in_db(model, report.pks)
+                if duplicates:
+                    problems.append((
+                        model, model._meta.pk.name, duplicates,
+                        'уже загружена строка с id',
+                    ))
+        found = run(pool, find_references, [
+            (sources[model], column, ids)
+            for model, column, ids, _ in problems
+        ])
+    for (model, column, _, message), lines in zip(problems, found):
+        errors.extend(
+            f'{sources[model].name}:{line}: {column}: {message} {value}'
+            for line, value in lines
+        )
+    return errors
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='confirmation_code_issued',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Код выдан'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 
 from django.db import models
+from django.utils import timezone
 
 
 class Roles(models.TextChoices):
@@ -42,6 +43,11 @@ class User(AbstractUser):
         max_length=100,
         null=True,
     )
+    confirmation_code_issued = models.DateTimeField(
+        verbose_name='Код выдан',
+        null=True,
+        blank=True,
+    )
     first_name = models.CharField(
         verbose_name='Имя',
         max_length=150, blank=True,
@@ -58,6 +64,15 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Имя из БД: сигнал сбрасывает ETag отзывов и комментариев
+        # автора, только если оно изменилось.
+        if 'username' in field_names:
+            instance._loaded_username = instance.username
+        return instance
+
     @property
     def is_user(self):
         return self.role == Roles.USER
@@ -69,3 +84,71 @@ class User(AbstractUser):
     @property
     def is_moderator(self):
         return self.role == Roles.MODERATOR
+
+
+class TokenUser(User):
+    """
+    Пользователь, собранный из claims JWT без запроса к базе.
+    Знает только id, username, роль и is_superuser, поэтому
+    не сохраняется: остальные поля у него пустые.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError(
+            'TokenUser только для чтения, загрузите User из базы.'
+        )
+
+    def delete(self, *args, **kwargs):
+        raise TypeError(
+            'TokenUser только для чтения, загрузите User из базы.'
+        )
+
+
+class EmailStatus(models.TextChoices):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (users.outbox)."""
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipient = models.EmailField('Получатель', max_length=254)
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=EmailStatus.choices,
+        default=EmailStatus.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    claim = models.CharField(
+        'Метка отправителя',
+        max_length=32,
+        blank=True,
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='outbox_due_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
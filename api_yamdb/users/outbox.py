@@ -0,0 +1,155 @@
+"""
+Очередь исходящих писем в базе.
+
+Вью только сохраняет OutgoingEmail и сразу отвечает. Отправляет
+send_pending: забирает пачку писем, у которых подошло время попытки,
+и шлет их через одно соединение почтового бэкенда. Письма забираются
+арендой: next_attempt_at сдвигается на EMAIL_OUTBOX_LEASE вперед
+с уникальной меткой, так что параллельные отправители не берут одно
+письмо дважды, а письма упавшего процесса вернутся в очередь после
+окончания аренды. Неудачная попытка откладывает письмо с
+экспоненциальной задержкой, после EMAIL_OUTBOX_MAX_ATTEMPTS оно
+помечается failed.
+
+Кто вызывает send_pending:
+- EMAIL_OUTBOX_EAGER — сразу после коммита в том же потоке (тесты);
+- EMAIL_OUTBOX_THREADS > 0 — пул потоков процесса после коммита;
+- команда sendoutbox — отдельный воркер, в том числе для повторов.
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api.metrics import email_timer
+from .models import EmailStatus, OutgoingEmail
+
+_executor = None
+_executor_lock = Lock()
+
+
+def enqueue(subject, body, recipients, from_email=None):
+    """Ставит письма в очередь; отправка начнется после коммита."""
+    OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(
+            subject=subject,
+            body=body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipient=recipient,
+        )
+        for recipient in recipients
+    )
+    transaction.on_commit(dispatch)
+
+
+def dispatch():
+    if settings.EMAIL_OUTBOX_EAGER:
+        send_pending()
+    elif settings.EMAIL_OUTBOX_THREADS:
+        drain_in_background()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.EMAIL_OUTBOX_THREADS, thread_name_prefix='outbox'
+            )
+        return _executor
+
+
+def drain_in_background():
+    return executor().submit(drain)
+
+
+def drain():
+    """Отправляет, пока есть письма, и закрывает соединения потока."""
+    try:
+        while any(send_pending()):
+            pass
+    finally:
+        connections.close_all()
+
+
+def backoff(attempts):
+    delay = settings.EMAIL_OUTBOX_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_BACKOFF))
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    due = OutgoingEmail.objects.filter(
+        status=EmailStatus.PENDING, next_attempt_at__lte=now,
+    ).order_by('next_attempt_at', 'id').values_list('id', flat=True)
+    ids = list(due[:batch_size])
+    if not ids:
+        return []
+    claim = uuid.uuid4().hex
+    OutgoingEmail.objects.filter(
+        pk__in=ids, status=EmailStatus.PENDING, next_attempt_at__lte=now,
+    ).update(
+        claim=claim,
+        next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE),
+    )
+    return list(OutgoingEmail.objects.filter(claim=claim))
+
+
+def deliver(emails):
+    """Шлет письма через одно соединение, возвращает {id: ошибка}."""
+    errors = {}
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        return {email.id: error for email in emails}
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email,
+                [email.recipient], connection=connection,
+            )
+            try:
+                with email_timer():
+                    message.send()
+            except Exception as error:
+                errors[email.id] = error
+    finally:
+        connection.close()
+    return errors
+
+
+def record_results(emails, errors):
+    now = timezone.now()
+    for email in emails:
+        email.claim = ''
+        error = errors.get(email.id)
+        if error is None:
+            email.status = EmailStatus.SENT
+            email.sent_at = now
+            continue
+        email.attempts += 1
+        email.last_error = f'{type(error).__name__}: {error}'
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = EmailStatus.FAILED
+        else:
+            email.next_attempt_at = now + backoff(email.attempts)
+    OutgoingEmail.objects.bulk_update(emails, (
+        'claim', 'status', 'sent_at', 'attempts', 'last_error',
+        'next_attempt_at',
+    ))
+
+
+def send_pending(batch_size=None):
+    """Одна пачка писем; возвращает (отправлено, с ошибкой)."""
+    emails = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+    errors = deliver(emails)
+    record_results(emails, errors)
+    return len(emails) - len(errors), len(errors)
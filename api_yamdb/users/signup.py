@@ -0,0 +1,201 @@
+"""
+Регистрация одним запросом к базе.
+
+INSERT ... ON CONFLICT (username) DO UPDATE ... WHERE email совпадает
+RETURNING id: новый пользователь создается вместе с кодом, существующий
+с тем же email получает новый код. Если username занят другим email,
+UPDATE не срабатывает и RETURNING ничего не отдает; занятый email
+нарушает уникальность. В обоих случаях поднимается IntegrityError.
+Нужен SQLite 3.35+ или PostgreSQL, на других СУБД остается прежний
+путь через get_or_create и save.
+
+Код подтверждения — случайная строка, он хранится у пользователя
+вместе с временем выдачи. Код действует PASSWORD_RESET_TIMEOUT секунд
+и один раз: тот же UPDATE ... RETURNING, что находит пользователя для
+токена, стирает код.
+"""
+import secrets
+import sqlite3
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+
+from . import outbox
+from .models import User
+
+CODE_BYTES = 24
+# Все, что нужно для claims токена.
+TOKEN_USER_FIELDS = ('id', 'username', 'role', 'is_superuser')
+SUBJECT = 'Код подтверждения регистрации'
+BODY = (
+    'Вы зарегистрировались в "YAMDB"! '
+    'Ваш код подтвержения: {confirmation_code}'
+)
+
+
+def new_code():
+    return secrets.token_urlsafe(CODE_BYTES)
+
+
+def codes_match(stored, given):
+    if not stored:
+        return False
+    return secrets.compare_digest(str(stored).encode(), str(given).encode())
+
+
+def code_valid_since():
+    return timezone.now() - timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+
+
+def upsert_supported(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    return (
+        connection.vendor == 'sqlite'
+        and sqlite3.sqlite_version_info >= (3, 35)
+    )
+
+
+def upsert_sql(connection, fields):
+    quote = connection.ops.quote_name
+    table = quote(User._meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    code = quote(User._meta.get_field('confirmation_code').column)
+    issued = quote(User._meta.get_field('confirmation_code_issued').column)
+    email = quote(User._meta.get_field('email').column)
+    username = quote(User._meta.get_field('username').column)
+    return (
+        f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ({username}) DO UPDATE SET {code} = excluded.{code}, '
+        f'{issued} = excluded.{issued} '
+        f'WHERE {table}.{email} = excluded.{email} '
+        f'RETURNING {quote(User._meta.pk.column)}'
+    )
+
+
+def upsert(connection, user):
+    fields = [
+        field for field in User._meta.concrete_fields if not field.primary_key
+    ]
+    params = [
+        field.get_db_prep_save(field.pre_save(user, True), connection)
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(upsert_sql(connection, fields), params)
+        if cursor.fetchone() is None:
+            raise IntegrityError('username занят другим email.')
+
+
+def get_or_create(user):
+    stored, _ = User.objects.get_or_create(
+        email=user.email, username=user.username
+    )
+    stored.confirmation_code = user.confirmation_code
+    stored.confirmation_code_issued = user.confirmation_code_issued
+    stored.save(
+        update_fields=('confirmation_code', 'confirmation_code_issued')
+    )
+
+
+def signup(username, email, use_upsert=None):
+    """
+    Создает пользователя или выдает новый код существующему
+    с тем же username и email. Возвращает код подтверждения.
+    """
+    user = User(
+        username=username, email=email, confirmation_code=new_code(),
+        confirmation_code_issued=timezone.now(),
+    )
+    connection = connections[router.db_for_write(User)]
+    if use_upsert is None:
+        use_upsert = upsert_supported(connection)
+    if use_upsert:
+        upsert(connection, user)
+    else:
+        get_or_create(user)
+    return user.confirmation_code
+
+
+def register(username, email, from_email=None, use_upsert=None):
+    """
+    Пользователь с кодом и письмо с ним сохраняются одной транзакцией.
+    IntegrityError — username или email заняты другим пользователем.
+    """
+    with transaction.atomic(using=router.db_for_write(User)):
+        confirmation_code = signup(username, email, use_upsert)
+        outbox.enqueue(
+            subject=SUBJECT,
+            body=BODY.format(confirmation_code=confirmation_code),
+            recipients=[email],
+            from_email=from_email,
+        )
+    return confirmation_code
+
+
+def redeem_sql(connection):
+    quote = connection.ops.quote_name
+    column = User._meta.get_field
+    code = quote(column('confirmation_code').column)
+    issued = quote(column('confirmation_code_issued').column)
+    returning = ', '.join(
+        quote(column(name).column) for name in TOKEN_USER_FIELDS
+    )
+    return (
+        f'UPDATE {quote(User._meta.db_table)} '
+        f'SET {code} = NULL, {issued} = NULL '
+        f'WHERE {quote(column("username").column)} = %s '
+        f'AND {code} = %s AND {issued} >= %s '
+        f'RETURNING {returning}'
+    )
+
+
+def redeem_returning(connection, username, code):
+    params = [
+        username, code,
+        User._meta.get_field('confirmation_code_issued').get_db_prep_value(
+            code_valid_since(), connection
+        ),
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(redeem_sql(connection), params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    user = User(**dict(zip(TOKEN_USER_FIELDS, row)))
+    user._state.adding = False
+    user._state.db = connection.alias
+    return user
+
+
+def redeem_locked(using, username, code):
+    with transaction.atomic(using=using):
+        user = User.objects.using(using).select_for_update().only(
+            *TOKEN_USER_FIELDS, 'confirmation_code'
+        ).filter(
+            username=username, confirmation_code_issued__gte=code_valid_since()
+        ).first()
+        if user is None or not codes_match(user.confirmation_code, code):
+            return None
+        User.objects.using(using).filter(pk=user.pk).update(
+            confirmation_code=None, confirmation_code_issued=None
+        )
+    return user
+
+
+def redeem(username, code, use_returning=None):
+    """
+    Гасит действующий код пользователя и возвращает пользователя с
+    полями TOKEN_USER_FIELDS или None, если код неверен или устарел.
+    С RETURNING это один UPDATE.
+    """
+    using = router.db_for_write(User)
+    connection = connections[using]
+    if use_returning is None:
+        use_returning = upsert_supported(connection)
+    if use_returning:
+        return redeem_returning(connection, username, str(code))
+    return redeem_locked(using, username, code)
@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+from django.core.cache import cache
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -30,6 +32,57 @@ if FILENAME not in project_dir_content:
 
 assert get_version() < '4.0.0', 'Пожалуйста, используйте версию Django < 4.0.0'
 
+
+
+class FakeClock:
+    """Часы для тестов, время двигается вручную через now."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def user_queries(captured):
+    """SQL к таблице пользователей из CaptureQueriesContext."""
+    return [
+        query['sql'] for query in captured.captured_queries
+        if 'users_user' in query['sql']
+    ]
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_catalog',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path):
+    """Кэш ответов и его версии не должны переживать очистку БД."""
+    settings.CACHE_VERSIONS_DB_PATH = tmp_path / 'cache_versions.sqlite3'
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def metrics_store(settings, tmp_path):
+    """Общий файл метрик у каждого теста свой и изначально пуст."""
+    from api import metrics
+
+    settings.METRICS_DB_PATH = tmp_path / 'metrics.sqlite3'
+    metrics.reset()
+
+
+@pytest.fixture(autouse=True)
+def email_outbox_eager(settings):
+    """Письма из очереди уходят сразу, чтобы их видел mail.outbox."""
+    settings.EMAIL_OUTBOX_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def throttle_store(settings, tmp_path):
+    """Корзины ограничителя у каждого теста свои и изначально полны."""
+    settings.THROTTLE_DB_PATH = tmp_path / 'throttle.sqlite3'
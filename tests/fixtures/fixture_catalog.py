@@ -0,0 +1,46 @@
+import pytest
+
+from reviews.models import Category, Genre, Review, Title, TitleGenre
+
+CATALOG_TITLES = 30
+CATALOG_GENRES = 6
+CATALOG_CATEGORIES = 3
+
+
+@pytest.fixture
+def catalog(user, moderator, admin):
+    """Каталог произведений с жанрами, категориями и отзывами."""
+    categories = [
+        Category.objects.create(
+            name=f'Категория {idx}', slug=f'category-{idx}'
+        )
+        for idx in range(CATALOG_CATEGORIES)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(CATALOG_GENRES)
+    ]
+    titles = []
+    for idx in range(CATALOG_TITLES):
+        title = Title.objects.create(
+            name=f'Произведение {idx}',
+            year=1950 + idx,
+            description=f'Описание {idx}',
+            category=categories[idx % CATALOG_CATEGORIES],
+        )
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=title, genre=genre)
+            for genre in genres[idx % 3:idx % 3 + 2]
+        )
+        titles.append(title)
+    Title.objects.all().refresh_genre_masks()
+    for score, author in enumerate((user, moderator, admin), 3):
+        for title in titles[:10]:
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=score
+            )
+    return {
+        'categories': categories,
+        'genres': genres,
+        'titles': titles,
+    }
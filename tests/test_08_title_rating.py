@@ -0,0 +1,61 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_reviews, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    def get_title(self, client, title_id):
+        response = client.get(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == HTTPStatus.OK
+        return response.json()
+
+    def test_01_rating_follows_reviews(self, client, admin_client, admin,
+                                       user_client, user, moderator_client,
+                                       moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        assert self.get_title(client, title_id)['rating'] == 5, (
+            'Проверьте, что рейтинг произведения равен средней оценке отзывов.'
+        )
+
+        url = f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/'
+        response = admin_client.patch(url, data={'score': 8})
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_title(client, title_id)['rating'] == 6, (
+            'Проверьте, что рейтинг пересчитывается при изменении оценки.'
+        )
+
+        response = admin_client.delete(url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_title(client, title_id)['rating'] == 5, (
+            'Проверьте, что рейтинг пересчитывается при удалении отзыва.'
+        )
+
+        user.delete()
+        moderator.delete()
+        assert self.get_title(client, title_id)['rating'] is None, (
+            'Проверьте, что при каскадном удалении отзывов вместе с '
+            'автором рейтинг произведения сбрасывается.'
+        )
+
+    def test_02_rating_without_aggregates(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        for query in captured.captured_queries:
+            assert 'AVG(' not in query['sql'].upper(), (
+                'Проверьте, что рейтинг произведений берется из хранимых '
+                'счетчиков, а не считается агрегатом при каждом запросе.'
+            )
@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment
+
+
+def parent_selects(captured, table):
+    return [
+        query['sql'] for query in captured.captured_queries
+        if query['sql'].startswith('SELECT')
+        and f'FROM "{table}"' in query['sql']
+        and 'AS "a"' not in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryCount:
+
+    @pytest.mark.parametrize('url,expected_queries', (
+        ('/api/v1/titles/', 3),
+        ('/api/v1/titles/?category=category-1', 3),
+        ('/api/v1/genres/', 2),
+        ('/api/v1/categories/', 2),
+    ))
+    def test_01_list_query_count(self, client, catalog,
+                                 django_assert_num_queries,
+                                 url, expected_queries):
+        with django_assert_num_queries(expected_queries):
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+
+    def test_02_title_detail_query_count(self, client, catalog,
+                                         django_assert_num_queries):
+        title = catalog['titles'][0]
+        url = f'/api/v1/titles/{title.id}/'
+        # Валидаторы ETag, произведение с категорией, жанры.
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['genre']) == 2, (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'жанры произведения.'
+        )
+
+    def test_03_title_list_does_not_depend_on_page(self, client, catalog,
+                                                   django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        data = response.json()
+        assert len(data['results']) == len(catalog['titles'])
+        assert all(
+            title['category'] and len(title['genre']) == 2
+            for title in data['results']
+        ), (
+            'Проверьте, что в списке произведений для каждого элемента '
+            'выводятся категория и жанры.'
+        )
+
+    def test_04_title_write_queries_do_not_depend_on_genres(
+            self, admin_client, catalog):
+        title = catalog['titles'][0]
+        slugs = [genre.slug for genre in catalog['genres']]
+        url = f'/api/v1/titles/{title.id}/'
+        counts = []
+        for genres in (slugs[2:3], slugs[:2] + slugs[3:5], slugs[5:]):
+            with CaptureQueriesContext(connection) as captured:
+                response = admin_client.patch(
+                    url, data={'genre': genres}, format='json'
+                )
+            assert response.status_code == HTTPStatus.OK
+            assert sorted(response.json()['genre']) == sorted(genres)
+            counts.append(len(captured))
+        assert len(set(counts)) == 1, (
+            'Проверьте, что число запросов при изменении жанров '
+            f'произведения не зависит от их количества: {counts}.'
+        )
+
+    def test_05_nested_list_query_count(self, client, catalog,
+                                        django_assert_num_queries):
+        title = catalog['titles'][0]
+        review = title.reviews.order_by('id').first()
+        for author in {item.author for item in title.reviews.all()}:
+            Comment.objects.create(review=review, author=author, text='Да')
+        urls = (
+            f'/api/v1/titles/{title.id}/reviews/',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+        )
+        for url in urls:
+            # Валидаторы ETag, родитель из URL, число объектов, страница
+            # вместе с авторами.
+            with django_assert_num_queries(4):
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            results = response.json()['results']
+            assert len(results) == 3
+            assert all(item['author'] for item in results), (
+                f'Проверьте, что в ответе на GET-запрос к `{url}` '
+                'указан автор.'
+            )
+
+    def test_06_nested_create_fetches_parent_once(self, user_client,
+                                                  catalog):
+        title = catalog['titles'][10]
+        with CaptureQueriesContext(connection) as captured:
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'Отзыв', 'score': 5},
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert len(parent_selects(captured, 'reviews_title')) == 1, (
+            'Проверьте, что при создании отзыва произведение '
+            'загружается один раз.'
+        )
+        review_id = response.json()['id']
+        with CaptureQueriesContext(connection) as captured:
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/{review_id}/comments/',
+                data={'text': 'Комментарий'},
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert len(parent_selects(captured, 'reviews_review')) == 1, (
+            'Проверьте, что при создании комментария отзыв '
+            'загружается один раз.'
+        )
@@ -0,0 +1,65 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+
+from api.pagination import KeysetPagination
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10CursorPagination:
+
+    def walk(self, client, url):
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+                'статусом 200.'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в режиме `pagination=cursor` не считается '
+                'общее количество объектов.'
+            )
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    def test_01_titles_cursor(self, client, catalog, monkeypatch,
+                              django_assert_num_queries):
+        monkeypatch.setattr(KeysetPagination, 'page_size', 7)
+        pages = self.walk(client, '/api/v1/titles/?pagination=cursor')
+        ids = [title['id'] for page in pages for title in page['results']]
+        assert ids == sorted(title.id for title in catalog['titles']), (
+            'Проверьте, что курсорная пагинация по `/api/v1/titles/` '
+            'выдает все произведения по одному разу и по порядку.'
+        )
+        response = client.get(pages[1]['previous'])
+        assert response.json()['results'] == pages[0]['results'], (
+            'Проверьте, что ссылка `previous` ведет на предыдущую страницу.'
+        )
+        cache.clear()
+        with django_assert_num_queries(2):
+            client.get(pages[0]['next'])
+
+    def test_02_reviews_cursor(self, client, catalog, monkeypatch):
+        monkeypatch.setattr(KeysetPagination, 'page_size', 2)
+        title = catalog['titles'][0]
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        pages = self.walk(client, f'{url}?pagination=cursor')
+        assert len(pages) == 2
+        ids = [review['id'] for page in pages for review in page['results']]
+        assert sorted(ids) == sorted(
+            title.reviews.values_list('id', flat=True)
+        )
+        assert 'count' in client.get(url).json(), (
+            'Проверьте, что по умолчанию сохраняется пагинация по номеру '
+            'страницы.'
+        )
+
+    def test_03_invalid_cursor(self, client, catalog):
+        response = client.get(
+            '/api/v1/titles/?pagination=cursor&cursor=broken'
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,44 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleSearch:
+    url = '/api/v1/titles/'
+
+    def search(self, client, query):
+        response = client.get(self.url, {'name': query})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что поиск по `{self.url}?name=` возвращает ответ '
+            'со статусом 200.'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_substring_case_insensitive(self, client):
+        for name in ('Властелин колец: Две крепости', 'Кольцо', 'Матрица'):
+            Title.objects.create(name=name, year=2000)
+        assert self.search(client, 'КОЛ') == [
+            'Кольцо', 'Властелин колец: Две крепости'
+        ], (
+            'Проверьте, что поиск по названию находит подстроку без учета '
+            'регистра и сортирует совпадения по релевантности.'
+        )
+        assert self.search(client, 'ат') == ['Матрица'], (
+            'Проверьте, что поиск работает и для коротких запросов.'
+        )
+
+    def test_02_index_follows_changes(self, client):
+        title = Title.objects.create(name='Колобок', year=1873)
+        assert self.search(client, 'лоб') == ['Колобок']
+        title.name = 'Теремок'
+        title.save()
+        assert self.search(client, 'лоб') == []
+        assert self.search(client, 'рем') == ['Теремок']
+        title.delete()
+        assert self.search(client, 'рем') == [], (
+            'Проверьте, что поисковый индекс обновляется при изменении и '
+            'удалении произведений.'
+        )
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12GenreFilter:
+    url = '/api/v1/titles/'
+
+    def filter_ids(self, client, params):
+        response = client.get(self.url, params)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что фильтрация `{self.url}` по жанрам возвращает '
+            'ответ со статусом 200.'
+        )
+        return {title['id'] for title in response.json()['results']}
+
+    def test_01_any_and_all(self, client, catalog):
+        titles = catalog['titles']
+        assert self.filter_ids(
+            client, {'genre': 'genre-0,genre-2'}
+        ) == {title.id for title in titles}, (
+            'Проверьте, что `?genre=a,b` отбирает произведения с любым из '
+            'перечисленных жанров.'
+        )
+        assert self.filter_ids(
+            client, {'genre': 'genre-1,genre-2', 'genre_match': 'all'}
+        ) == {title.id for title in titles[1::3]}, (
+            'Проверьте, что `?genre=a,b&genre_match=all` отбирает '
+            'произведения сразу со всеми перечисленными жанрами.'
+        )
+        assert self.filter_ids(
+            client, {'genre': 'genre-1,missing', 'genre_match': 'all'}
+        ) == set()
+
+    def test_02_filter_without_m2m_join(self, client, catalog):
+        with CaptureQueriesContext(connection) as captured:
+            self.filter_ids(client, {
+                'genre': 'genre-1', 'category': 'category-1', 'year': 1951
+            })
+        title_queries = [
+            query['sql'] for query in captured.captured_queries
+            if 'FROM "reviews_title"' in query['sql']
+        ]
+        assert title_queries and all(
+            'reviews_titlegenre' not in sql for sql in title_queries
+        ), (
+            'Проверьте, что фильтрация по жанрам использует маску жанров '
+            'произведения, а не JOIN по связующей таблице.'
+        )
+
+    def test_03_mask_follows_changes(self, admin_client, catalog):
+        title = catalog['titles'][0]
+        genres = catalog['genres']
+        response = admin_client.patch(
+            f'{self.url}{title.id}/', data={'genre': [genres[5].slug]}
+        )
+        assert response.status_code == HTTPStatus.OK
+        title.refresh_from_db()
+        assert title.genre_mask == genres[5].mask
+        Genre.objects.get(pk=genres[5].pk).delete()
+        assert Title.objects.get(pk=title.pk).genre_mask == 0, (
+            'Проверьте, что при удалении жанра его бит снимается с масок '
+            'произведений.'
+        )
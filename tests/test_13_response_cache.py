@@ -0,0 +1,133 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+
+from api.cache import TITLES, read_versions, stats, version_key
+from reviews.models import Genre, Review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ResponseCache:
+
+    def test_01_hit_and_invalidation(self, client, catalog, user):
+        stats.reset()
+        title = catalog['titles'][-1]
+        url = f'/api/v1/titles/{title.id}/'
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] is None
+        response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            f'Проверьте, что повторный GET-запрос к `{url}` отдается из кэша.'
+        )
+        assert stats.snapshot()['hits'] == 1
+        assert stats.snapshot()['misses'] == 1
+
+        Review.objects.create(title=title, author=user, text='!', score=9)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 9, (
+            'Проверьте, что новый отзыв сбрасывает кэш карточки произведения.'
+        )
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/', '/api/v1/genres/', '/api/v1/categories/'
+    ))
+    def test_02_list_invalidated_by_genre_rename(self, client, catalog, url):
+        client.get(url)
+        assert client.get(url)['X-Cache'] == 'HIT'
+        genre = catalog['genres'][0]
+        genre.name = 'Новое название'
+        genre.save()
+        expected = 'HIT' if url == '/api/v1/categories/' else 'MISS'
+        assert client.get(url)['X-Cache'] == expected, (
+            'Проверьте, что изменение жанра сбрасывает кэш только зависящих '
+            'от него списков.'
+        )
+
+    def test_03_pages_cached_separately(self, client, catalog):
+        first = client.get('/api/v1/titles/', {'year': 1950})
+        second = client.get('/api/v1/titles/', {'year': 1951})
+        assert second['X-Cache'] == 'MISS'
+        assert first.json() != second.json()
+        assert client.get('/api/v1/titles/?year=1951').status_code == (
+            HTTPStatus.OK
+        )
+
+    def test_04_invalidation_reaches_other_workers(self, client, catalog,
+                                                   settings):
+        # Второй воркер со своим кэшем ответов в памяти.
+        settings.CACHES = {
+            **settings.CACHES,
+            'second': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'second-worker',
+            },
+        }
+        url = '/api/v1/genres/'
+        for alias in ('default', 'second'):
+            settings.API_CACHE_ALIAS = alias
+            client.get(url)
+            assert client.get(url)['X-Cache'] == 'HIT'
+        settings.API_CACHE_ALIAS = 'default'
+        genre = catalog['genres'][0]
+        genre.name = 'Новое название'
+        genre.save()
+        settings.API_CACHE_ALIAS = 'second'
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись в одном процессе сбрасывает кэш ответов '
+            'в других.'
+        )
+        assert 'Новое название' in {
+            item['name'] for item in response.json()['results']
+        }
+
+    def test_05_unavailable_versions_bypass_cache(
+        self, client, admin_client, catalog, settings, tmp_path, caplog
+    ):
+        settings.CACHE_VERSIONS_DB_PATH = tmp_path
+        for url in ('/api/v1/genres/', '/api/v1/titles/'):
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что недоступный файл версий не ломает чтение.'
+            )
+            assert response['X-Cache'] == 'BYPASS'
+        assert not response.has_header('ETag')
+        committed = []
+        with transaction.atomic():
+            genre = catalog['genres'][0]
+            genre.name = 'Новое название'
+            genre.save()
+            transaction.on_commit(lambda: committed.append(True))
+        assert committed, (
+            'Проверьте, что ошибка увеличения версий не мешает остальным '
+            'действиям после коммита.'
+        )
+        response = admin_client.post(
+            '/api/v1/genres/', data={'name': 'Новый', 'slug': 'new'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert {record.name for record in caplog.records} >= {'api.cache'}
+
+    def test_06_host_in_cache_key(self, client, catalog):
+        url = '/api/v1/titles/'
+        client.get(url, HTTP_HOST='first.example')
+        response = client.get(url, HTTP_HOST='second.example')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что ответы с абсолютными ссылками кэшируются '
+            'отдельно для каждого хоста.'
+        )
+        response = client.get(url, HTTP_HOST='second.example')
+        assert response['X-Cache'] == 'HIT'
+
+    def test_07_one_bump_per_transaction(self, client, catalog):
+        key = version_key(TITLES)
+        client.get('/api/v1/titles/')
+        version = read_versions([key])[key]
+        Genre.objects.get(pk=catalog['genres'][1].pk).delete()
+        assert read_versions([key])[key] == version + 1, (
+            'Проверьте, что каскадное удаление увеличивает версию группы '
+            'один раз за транзакцию.'
+        )
@@ -0,0 +1,117 @@
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from api.cache import INCREMENT, TITLES, version_key, versions_store
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14ConditionalGet:
+
+    def assert_not_modified(self, client, url, response):
+        etag = response['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+        return etag
+
+    @pytest.mark.parametrize('suffix', ('', 'reviews/'))
+    def test_01_etag(self, client, catalog, user, suffix,
+                     django_assert_num_queries):
+        title = catalog['titles'][0]
+        url = f'/api/v1/titles/{title.id}/{suffix}'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response.has_header('Last-Modified')
+        etag = self.assert_not_modified(client, url, response)
+        with django_assert_num_queries(1):
+            client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        review = Review.objects.get(title=title, author=user)
+        review.text = 'Исправленный отзыв'
+        review.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после изменения отзыва GET-запрос к `{url}` '
+            'со старым `If-None-Match` возвращает новые данные.'
+        )
+        assert response['ETag'] != etag
+
+    def test_02_comments_and_if_modified_since(self, client, catalog, user):
+        title = catalog['titles'][0]
+        review = Review.objects.filter(title=title).first()
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        response = client.get(url)
+        self.assert_not_modified(client, url, response)
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        etag = client.get(url)['ETag']
+        Comment.objects.create(review=review, author=user, text='Согласен')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 1
+
+    def test_03_titles_list(self, client, admin_client, catalog):
+        url = '/api/v1/titles/'
+        etag = self.assert_not_modified(client, url, client.get(url))
+        title = catalog['titles'][1]
+        response = admin_client.patch(
+            f'{url}{title.id}/', data={'name': 'Новое имя'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после изменения произведения список `{url}` '
+            'отдается заново.'
+        )
+
+    def test_04_titles_list_etag_without_queries(
+        self, client, catalog, django_assert_num_queries
+    ):
+        url = '/api/v1/titles/'
+        filtered = f'{url}?year=1950'
+        etag = self.assert_not_modified(client, url, client.get(url))
+        filtered_etag = self.assert_not_modified(
+            client, filtered, client.get(filtered)
+        )
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+            response = client.get(url)
+            assert response['X-Cache'] == 'HIT', (
+                'Проверьте, что валидаторы списка произведений и попадание '
+                'в кэш обходятся без запросов к базе.'
+            )
+        # Запись в другом воркере видна через общий файл версий.
+        versions_store.write(INCREMENT, [(version_key(TITLES), 0)])
+        for address, old_etag in ((url, etag), (filtered, filtered_etag)):
+            response = client.get(address, HTTP_IF_NONE_MATCH=old_etag)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что ETag `{address}` меняется вместе с '
+                'версией группы произведений.'
+            )
+
+    def test_05_only_username_change_touches_titles(self, catalog,
+                                                    django_user_model, user):
+        title = catalog['titles'][0]
+        version = Title.objects.get(pk=title.pk).version
+        author = django_user_model.objects.get(pk=user.pk)
+        author.last_login = timezone.now()
+        author.save(update_fields=('last_login',))
+        author.email = 'new-email@yamdb.fake'
+        author.save()
+        assert Title.objects.get(pk=title.pk).version == version, (
+            'Проверьте, что изменение полей пользователя, которых нет '
+            'в ответах, не сбрасывает ETag его отзывов.'
+        )
+        author.username = 'renamed'
+        author.save()
+        assert Title.objects.get(pk=title.pk).version > version, (
+            'Проверьте, что смена имени автора сбрасывает ETag его отзывов.'
+        )
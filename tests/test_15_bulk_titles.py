@@ -0,0 +1,127 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Title, TitleGenre
+
+URL = '/api/v1/titles/bulk/'
+
+
+def make_items(catalog, count, prefix='Пачка'):
+    genres = catalog['genres']
+    return [
+        {
+            'name': f'{prefix} {i}',
+            'year': 2000 + i % 20,
+            'category': catalog['categories'][i % 3].slug,
+            'genre': [genres[i % 6].slug, genres[(i + 1) % 6].slug],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15BulkTitles:
+
+    def test_01_bulk_create(self, admin_client, client, catalog):
+        items = make_items(catalog, 6)
+        response = admin_client.post(URL, data=items, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос администратора к `{URL}` со '
+            'списком произведений возвращает ответ со статусом 201.'
+        )
+        data = response.json()
+        assert [item['name'] for item in data] == [
+            item['name'] for item in items
+        ], (
+            'Проверьте, что ответ содержит созданные произведения '
+            'в порядке запроса.'
+        )
+        assert all(len(item['genre']) == 2 for item in data)
+        assert all(item['rating'] is None for item in data)
+        assert TitleGenre.objects.filter(
+            title_id__in=[item['id'] for item in data]
+        ).count() == 12
+
+        genre = catalog['genres'][0].slug
+        response = client.get(
+            f'/api/v1/titles/?genre={genre}&name=Пачка'
+        )
+        names = {item['name'] for item in response.json()['results']}
+        assert names == {'Пачка 0', 'Пачка 5'}, (
+            'Проверьте, что у созданных пачкой произведений заполняется '
+            'битовая маска жанров и они находятся поиском.'
+        )
+
+    def test_02_bulk_errors(self, admin_client, catalog):
+        items = make_items(catalog, 3)
+        items[1]['genre'] = ['no-such-genre']
+        items[2]['year'] = 3000
+        titles_count = Title.objects.count()
+        response = admin_client.post(URL, data=items, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert isinstance(errors, list) and len(errors) == 3, (
+            'Проверьте, что ошибки валидации возвращаются списком '
+            'по элементам запроса.'
+        )
+        assert errors[0] == {}
+        assert 'genre' in errors[1]
+        assert 'year' in errors[2]
+        assert Title.objects.count() == titles_count, (
+            'Проверьте, что при ошибке в одном элементе не создается '
+            'ни одно произведение.'
+        )
+
+        for data in ({'name': 'Не список'}, []):
+            response = admin_client.post(URL, data=data, format='json')
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_bulk_permissions(self, client, user_client, catalog):
+        items = make_items(catalog, 1)
+        assert client.post(
+            URL, data=json.dumps(items), content_type='application/json'
+        ).status_code == HTTPStatus.UNAUTHORIZED
+        assert user_client.post(
+            URL, data=items, format='json'
+        ).status_code == HTTPStatus.FORBIDDEN
+
+    def test_04_bulk_query_count(self, admin_client, catalog):
+        counts = []
+        for count in (2, 20):
+            items = make_items(catalog, count, prefix=f'Пачка {count}')
+            with CaptureQueriesContext(connection) as captured:
+                response = admin_client.post(URL, data=items, format='json')
+            assert response.status_code == HTTPStatus.CREATED
+            counts.append(len(captured.captured_queries))
+        assert counts[0] == counts[1], (
+            'Проверьте, что число запросов к базе при массовом создании '
+            'не зависит от количества произведений.'
+        )
+
+    def test_05_backfilled_ids(self, catalog):
+        category = catalog['categories'][0]
+        # Строка с id выше выданных последовательностью.
+        Title.objects.create(pk=5000, name='Далекий', year=2000)
+        titles = Title.objects.bulk_create(
+            Title(name=f'Новый {i}', year=2000, category=category)
+            for i in range(3)
+        )
+        assert [title.name for title in Title.objects.filter(
+            pk__in=[title.pk for title in titles]
+        ).order_by('pk')] == ['Новый 0', 'Новый 1', 'Новый 2'], (
+            'Проверьте, что bulk_create проставляет созданным '
+            'произведениям их id из базы.'
+        )
+        mixed = Title.objects.bulk_create([
+            Title(pk=9000, name='Явный', year=2000),
+            Title(name='Без id', year=2000),
+        ])
+        assert mixed[0].pk == 9000
+        assert mixed[1].pk is None, (
+            'Проверьте, что при заданных id у части объектов остальные '
+            'не получают чужие id.'
+        )
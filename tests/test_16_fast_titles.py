@@ -0,0 +1,56 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+
+from api.readers import serialize_titles, title_rows
+from api.serializers import GetTitleSerializer
+from api.views import TitleViewSet
+from reviews.models import Title
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16FastTitles:
+
+    def test_01_same_json_as_serializer(self, catalog):
+        titles = catalog['titles']
+        Title.objects.filter(pk=titles[0].pk).update(category=None)
+        Title.objects.filter(pk=titles[1].pk).update(description='')
+        titles[2].genre.clear()
+        queryset = TitleViewSet.queryset.all()
+        expected = render(GetTitleSerializer(queryset, many=True).data)
+        assert render(serialize_titles(title_rows(queryset))) == expected, (
+            'Проверьте, что быстрый путь чтения произведений отдает JSON, '
+            'совпадающий с GetTitleSerializer байт в байт.'
+        )
+
+    def test_02_api_responses_match_serializer(self, client, catalog):
+        queryset = TitleViewSet.queryset.all()
+        response = client.get('/api/v1/titles/')
+        assert render(response.json()['results']) == render(
+            GetTitleSerializer(queryset, many=True).data
+        )
+        title = catalog['titles'][0]
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert render(response.json()) == render(
+            GetTitleSerializer(queryset.get(pk=title.id)).data
+        ), (
+            'Проверьте, что карточка произведения совпадает с '
+            'представлением GetTitleSerializer.'
+        )
+        assert client.get('/api/v1/titles/0/').status_code == 404
+
+    def test_03_benchmark_command(self, catalog):
+        out = StringIO()
+        call_command('benchserialize', limit=10, repeat=2, stdout=out)
+        output = out.getvalue()
+        assert 'serializer' in output and 'fast' in output
+        assert 'совпадает' in output, (
+            'Проверьте, что команда benchserialize сравнивает JSON '
+            'обоих путей.'
+        )
@@ -0,0 +1,397 @@
+import csv
+import gzip
+import io
+import json
+import zipfile
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews import importer
+from reviews.importer import (
+    TABLES as IMPORT_TABLES,
+    affected_titles,
+    dependency_levels,
+    import_table,
+    import_tables,
+    refresh_derived,
+)
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    ImportLog,
+    Review,
+    Title,
+    TitleGenre,
+)
+from reviews.sources import file_hash, find_source
+from reviews.validation import ImportValidationError
+from users.models import User
+
+
+def genre_rows(count, start=1):
+    for idx in range(start, start + count):
+        yield {'id': str(idx), 'name': f'Жанр {idx}', 'slug': f'genre-{idx}'}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17Importer:
+
+    def test_01_import_in_batches(self):
+        data = io.StringIO('id,name,slug\n' + ''.join(
+            f'{idx},Жанр {idx},genre-{idx}\n' for idx in range(1, 8)
+        ))
+        with CaptureQueriesContext(connection) as captured:
+            stats = import_table(Genre, csv.DictReader(data), batch_size=3)
+        inserts = [
+            query for query in captured.captured_queries
+            if query['sql'].startswith('INSERT INTO "reviews_genre"')
+        ]
+        assert Genre.objects.count() == 7
+        assert stats.rows == 7
+        assert len(inserts) == 3, (
+            'Проверьте, что importcsv пишет строки пачками по batch_size.'
+        )
+        assert stats.rows_per_second > 0
+        assert 'Genre: 7 строк' in str(stats)
+
+    def test_02_memory_does_not_grow_with_file(self):
+        small = import_table(
+            Genre, genre_rows(1000), batch_size=100, trace_memory=True
+        )
+        large = import_table(
+            Genre, genre_rows(8000, start=1001), batch_size=100,
+            trace_memory=True,
+        )
+        assert Genre.objects.count() == 9000
+        assert large.peak_memory < small.peak_memory * 2, (
+            'Проверьте, что пик памяти при импорте зависит от размера '
+            'пачки, а не от размера файла.'
+        )
+
+
+    def test_03_command_traces_memory(self):
+        out = io.StringIO()
+        call_command(
+            'importcsv', path=str(settings.BASE_DIR / 'static' / 'data'),
+            workers=0, trace_memory=True, stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        assert 'Память, КБ' in lines[0]
+        rows = [
+            line for line in lines[1:]
+            if line.split() and line.split()[0].isdigit()
+        ]
+        assert len(rows) == len(IMPORT_TABLES)
+        assert all(float(row.split()[-1]) > 0 for row in rows), (
+            'Проверьте, что importcsv выводит пик памяти по таблицам.'
+        )
+        assert 'Память: пик tracemalloc' in out.getvalue(), (
+            'Проверьте, что --trace-memory включает tracemalloc.'
+        )
+
+
+def write_catalog(path):
+    files = {
+        'category.csv': 'id,name,slug\n1,Фильм,movie\n',
+        'genre.csv': 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n',
+        'titles.csv': 'id,name,year,category\n1,Чапаев,1934,1\n',
+        'genre_title.csv': 'id,title_id,genre_id\n1,1,1\n2,1,2\n',
+    }
+    for name, content in files.items():
+        (path / name).write_text(content, encoding='utf8')
+
+
+TABLES = {
+    Title: 'titles.csv',
+    TitleGenre: 'genre_title.csv',
+    Genre: 'genre.csv',
+    Category: 'category.csv',
+}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17ParallelImport:
+
+    def test_01_dependency_levels(self):
+        levels = dependency_levels(IMPORT_TABLES)
+        assert set(levels[0]) == {User, Genre, Category}, (
+            'Проверьте, что таблицы без внешних ключей загружаются '
+            'на первом уровне.'
+        )
+        assert levels[1] == [Title]
+        assert set(levels[2]) == {TitleGenre, Review}
+        assert levels[3] == [Comment]
+
+    @pytest.mark.parametrize('workers', (0, 2))
+    def test_02_import_tables(self, tmp_path, workers):
+        write_catalog(tmp_path)
+        stats = import_tables(TABLES, tmp_path, batch_size=1, workers=workers)
+        assert [item.model for item in stats][-1] is TitleGenre
+        assert {item.model: item.rows for item in stats} == {
+            Category: 1, Genre: 2, Title: 1, TitleGenre: 2,
+        }
+        title = Title.objects.get(pk=1)
+        assert title.category.slug == 'movie'
+        assert title.genre.count() == 2
+
+    def test_03_parse_error_rolls_back_table(self, tmp_path):
+        write_catalog(tmp_path)
+        (tmp_path / 'genre_title.csv').write_bytes(
+            b'id,title_id,genre_id\n1,1,1\n2,1,\xff\n'
+        )
+        with pytest.raises(UnicodeDecodeError):
+            import_tables(
+                TABLES, tmp_path, batch_size=1, workers=2, validate=False
+            )
+        assert Title.objects.count() == 1
+        assert TitleGenre.objects.count() == 0, (
+            'Проверьте, что при ошибке разбора файла таблица '
+            'не остается загруженной наполовину.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17UpsertImport:
+
+    def test_01_upsert_updates_changed_rows(self, tmp_path):
+        write_catalog(tmp_path)
+        import_tables(TABLES, tmp_path, workers=0)
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n1,Драма,drama\n2,Комедии,comedy\n3,Ужасы,horror\n',
+            encoding='utf8'
+        )
+        stats = {
+            item.model: item
+            for item in import_tables(TABLES, tmp_path, workers=0, upsert=True)
+        }
+        genre_stats = stats[Genre]
+        assert (genre_stats.created, genre_stats.updated,
+                genre_stats.skipped) == (1, 1, 1), (
+            'Проверьте, что в режиме upsert новые строки добавляются, '
+            'изменившиеся обновляются, а совпавшие пропускаются.'
+        )
+        assert stats[Title].skipped == 1 and not stats[Title].changed
+        assert Genre.objects.get(pk=2).name == 'Комедии'
+        assert Genre.objects.count() == 3
+
+    def test_02_delta_skips_unchanged_files(self, tmp_path):
+        write_catalog(tmp_path)
+        import_tables(TABLES, tmp_path, workers=0)
+        (tmp_path / 'titles.csv').write_text(
+            'id,name,year,category\n1,Чапаев,1934,1\n2,Броненосец,1925,1\n',
+            encoding='utf8'
+        )
+        stats = {
+            item.model: item
+            for item in import_tables(TABLES, tmp_path, workers=2, delta=True)
+        }
+        assert all(
+            stats[model].unchanged_file
+            for model in (Category, Genre, TitleGenre)
+        ), (
+            'Проверьте, что в режиме delta не изменившиеся файлы '
+            'пропускаются целиком.'
+        )
+        assert not stats[Title].unchanged_file
+        assert stats[Title].created == 1
+        assert Title.objects.count() == 2
+
+    def test_03_refresh_only_affected_titles(self, tmp_path):
+        write_catalog(tmp_path)
+        (tmp_path / 'titles.csv').write_text(
+            'id,name,year,category\n1,Чапаев,1934,1\n2,Броненосец,1925,1\n',
+            encoding='utf8'
+        )
+        refresh_derived(affected_titles(
+            import_tables(TABLES, tmp_path, workers=0)
+        ))
+        (tmp_path / 'genre_title.csv').write_text(
+            'id,title_id,genre_id\n1,1,1\n2,2,2\n', encoding='utf8'
+        )
+        stats = import_tables(TABLES, tmp_path, workers=0, delta=True)
+        title_ids = affected_titles(stats)
+        assert title_ids == {1, 2}, (
+            'Проверьте, что перенос связи жанра затрагивает и прежнее, '
+            'и новое произведение.'
+        )
+        refresh_derived(title_ids)
+        versions = dict(Title.objects.values_list('pk', 'version'))
+        (tmp_path / 'genre_title.csv').write_text(
+            'id,title_id,genre_id\n1,1,1\n2,2,2\n3,2,1\n', encoding='utf8'
+        )
+        stats = import_tables(TABLES, tmp_path, workers=0, delta=True)
+        assert affected_titles(stats) == {2}
+        refresh_derived(affected_titles(stats))
+        titles = Title.objects.in_bulk()
+        assert titles[1].version == versions[1], (
+            'Проверьте, что delta-загрузка обновляет только затронутые '
+            'произведения.'
+        )
+        assert titles[2].version > versions[2]
+        assert set(
+            Title.objects.filter_genres(['drama', 'comedy'], match_all=True)
+            .values_list('pk', flat=True)
+        ) == {2}
+
+    @pytest.mark.parametrize('workers', (0, 2))
+    def test_04_plain_import_hashes_while_reading(self, tmp_path,
+                                                  monkeypatch, workers):
+        write_catalog(tmp_path)
+
+        def forbidden(source):
+            raise AssertionError('Файл прочитан ради хэша.')
+
+        monkeypatch.setattr(importer, 'file_hash', forbidden)
+        import_tables(TABLES, tmp_path, workers=workers, upsert=True)
+        logged = dict(ImportLog.objects.values_list(
+            'file_name', 'content_hash'
+        ))
+        assert logged == {
+            name: file_hash(find_source(tmp_path, name))
+            for name in TABLES.values()
+        }, (
+            'Проверьте, что без --delta хэш файла для ImportLog '
+            'считается при разборе.'
+        )
+
+    def test_05_genre_masks_written_only_when_changed(self, tmp_path):
+        write_catalog(tmp_path)
+        import_tables(TABLES, tmp_path, workers=0)
+        refresh_derived()
+        with CaptureQueriesContext(connection) as captured:
+            Title.objects.all().refresh_genre_masks()
+        assert not [
+            query for query in captured.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ], 'Проверьте, что совпадающие маски жанров не перезаписываются.'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17ImportValidation:
+
+    @pytest.mark.parametrize('workers', (0, 2))
+    def test_01_errors_with_lines(self, tmp_path, workers):
+        write_catalog(tmp_path)
+        (tmp_path / 'titles.csv').write_text(
+            'id,name,year,category\n'
+            '1,Чапаев,1934,1\n'
+            '2,"Очень\nдлинное",2999,1\n'
+            '3,Броненосец,тысяча,1\n'
+            '4,Иван Грозный,1944,7\n',
+            encoding='utf8'
+        )
+        (tmp_path / 'genre_title.csv').write_text(
+            'id,title_id,genre_id\n1,1,1\n2,1,9\n2,5,2\n',
+            encoding='utf8'
+        )
+        with pytest.raises(ImportValidationError) as info:
+            import_tables(TABLES, tmp_path, workers=workers)
+        errors = info.value.errors
+        expected = (
+            'titles.csv:3: year: значение 2999 больше',
+            'titles.csv:5: year: ожидается целое число',
+            'titles.csv:6: category: нет объекта Category с id 7',
+            'genre_title.csv:3: genre_id: нет объекта Genre с id 9',
+            'genre_title.csv:4: id: повторяется 2',
+            'genre_title.csv:4: title_id: нет объекта Title с id 5',
+        )
+        for message in expected:
+            assert any(error.startswith(message) for error in errors), (
+                'Проверьте, что проверка файлов импорта сообщает файл, '
+                f'строку и причину ошибки: нет `{message}` в {errors}.'
+            )
+        assert not Category.objects.exists(), (
+            'Проверьте, что при ошибках проверки ничего не загружается.'
+        )
+
+    def test_02_references_to_loaded_rows(self, tmp_path):
+        write_catalog(tmp_path)
+        import_tables(TABLES, tmp_path, workers=0)
+        (tmp_path / 'titles.csv').write_text(
+            'id,name,year,category\n1,Чапаев,1934,1\n2,Броненосец,1925,1\n',
+            encoding='utf8'
+        )
+        (tmp_path / 'genre_title.csv').write_text(
+            'id,title_id,genre_id\n1,1,1\n2,1,2\n3,2,1\n',
+            encoding='utf8'
+        )
+        import_tables(TABLES, tmp_path, workers=0, delta=True)
+        assert TitleGenre.objects.count() == 3, (
+            'Проверьте, что ссылки на строки из пропущенных в режиме '
+            'delta файлов сверяются с базой.'
+        )
+        with pytest.raises(ImportValidationError) as info:
+            import_tables(TABLES, tmp_path, workers=0)
+        assert 'category.csv:2: id: уже загружена строка с id 1' in (
+            info.value.errors
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17ImportFormats:
+
+    def write_mixed(self, path):
+        write_catalog(path)
+        titles = path / 'titles.csv'
+        with gzip.open(path / 'titles.csv.gz', 'wb') as archive:
+            archive.write(titles.read_bytes())
+        titles.unlink()
+        genres = [
+            {'id': 1, 'name': 'Драма', 'slug': 'drama'},
+            {'id': 2, 'name': 'Комедия', 'slug': 'comedy'},
+        ]
+        (path / 'genre.jsonl').write_text(''.join(
+            json.dumps(genre, ensure_ascii=False) + '\n' for genre in genres
+        ), encoding='utf8')
+        (path / 'genre.csv').unlink()
+
+    @pytest.mark.parametrize('workers', (0, 2))
+    def test_01_gzip_and_jsonl(self, tmp_path, workers):
+        self.write_mixed(tmp_path)
+        import_tables(TABLES, tmp_path, workers=workers)
+        title = Title.objects.get(pk=1)
+        assert title.name == 'Чапаев', (
+            'Проверьте, что importcsv читает таблицы из .csv.gz.'
+        )
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }, 'Проверьте, что importcsv читает таблицы из .jsonl.'
+
+    def test_02_zip_bundle(self, tmp_path):
+        data = tmp_path / 'data'
+        data.mkdir()
+        self.write_mixed(data)
+        bundle = tmp_path / 'dump.zip'
+        with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for file in data.iterdir():
+                archive.write(file, f'dump/{file.name}')
+        import_tables(TABLES, str(bundle), workers=2)
+        assert Title.objects.get(pk=1).genre.count() == 2, (
+            'Проверьте, что importcsv читает таблицы из zip-архива.'
+        )
+
+    def test_03_bad_jsonl_and_missing_files(self, tmp_path):
+        self.write_mixed(tmp_path)
+        (tmp_path / 'genre.jsonl').write_text(
+            '{"id": 1, "name": "Драма", "slug": "drama"}\n'
+            '{"id": 2, "name": "Комедия", "slug": "comedy", "x": 1}\n',
+            encoding='utf8'
+        )
+        tables = {model: TABLES[model] for model in (Category, Genre)}
+        with pytest.raises(ImportValidationError) as info:
+            import_tables(tables, tmp_path, workers=0)
+        assert any(
+            error.startswith('genre.jsonl:') for error in info.value.errors
+        ), (
+            'Проверьте, что ошибки JSON Lines сообщаются с именем файла.'
+        )
+        out = io.StringIO()
+        with pytest.raises(Exception, match='users.csv'):
+            call_command(
+                'importcsv', path=str(tmp_path), workers=0, stdout=out
+            )
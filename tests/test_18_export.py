@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from api.readers import serialize_titles, title_rows
+from reviews.models import Comment, Review, Title
+
+
+def content(response):
+    assert response.streaming, (
+        'Проверьте, что выгрузка отдается потоком (StreamingHttpResponse).'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18Export:
+
+    def test_01_titles_ndjson(self, admin_client, catalog):
+        response = admin_client.get('/api/v1/export/titles.ndjson')
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        lines = content(response).splitlines()
+        expected = serialize_titles(title_rows(Title.objects.order_by('id')))
+        assert [json.loads(line) for line in lines] == expected, (
+            'Проверьте, что выгрузка произведений в NDJSON содержит жанры, '
+            'категорию и рейтинг, как в API.'
+        )
+
+    def test_02_csv(self, admin_client, catalog, settings):
+        settings.EXPORT_CHUNK_SIZE = 7
+        response = admin_client.get('/api/v1/export/titles.csv')
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert len(rows) == len(catalog['titles'])
+        assert rows[0]['genre'] == 'genre-0,genre-1'
+        assert rows[0]['category'] == 'category-0'
+        assert rows[0]['rating'] == '4'
+
+        response = admin_client.get('/api/v1/export/reviews.csv')
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert len(rows) == Review.objects.count()
+        assert set(rows[0]) == {
+            'id', 'title_id', 'text', 'author', 'score', 'pub_date'
+        }
+
+    def test_03_export_permissions(self, client, user_client, catalog):
+        url = '/api/v1/export/comments.ndjson'
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что выгрузка доступна только администратору.'
+        )
+
+    def test_04_export_command(self, tmp_path, catalog, admin):
+        review = Review.objects.first()
+        Comment.objects.create(review=review, author=admin, text='Да')
+        call_command(
+            'exportcsv', output=str(tmp_path), export_format='ndjson',
+            chunk_size=4, stdout=io.StringIO(),
+        )
+        for table, count in (
+            ('titles', Title.objects.count()),
+            ('reviews', Review.objects.count()),
+            ('comments', 1),
+        ):
+            lines = (tmp_path / f'{table}.ndjson').read_text(
+                encoding='utf8'
+            ).splitlines()
+            assert len(lines) == count, (
+                f'Проверьте, что exportcsv выгружает все строки {table}.'
+            )
+        comment = json.loads(lines[0])
+        assert comment['review_id'] == review.id
+        assert comment['title_id'] == review.title_id
+        assert comment['author'] == admin.username
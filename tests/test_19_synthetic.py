@@ -0,0 +1,79 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Comment, Review, Title
+from reviews.synthetic import (
+    CatalogSpec,
+    gen_comments,
+    gen_reviews,
+    gen_titles,
+    review_counts,
+)
+from users.models import User
+
+SIZES = {
+    'users': 400, 'genres': 6, 'categories': 3, 'titles': 100,
+    'reviews': 1500, 'comments': 300,
+}
+
+
+class Test19SyntheticData:
+
+    def test_01_deterministic(self):
+        spec = CatalogSpec(seed=7, **SIZES)
+        assert list(gen_reviews(spec)) == list(gen_reviews(
+            CatalogSpec(seed=7, **SIZES)
+        )), 'Проверьте, что при одном seed данные совпадают.'
+        assert list(gen_titles(spec)) != list(gen_titles(
+            CatalogSpec(seed=8, **SIZES)
+        ))
+
+    def test_02_reviews_unique_and_skewed(self):
+        spec = CatalogSpec(seed=1, skew=1.2, **SIZES)
+        reviews = list(gen_reviews(spec))
+        assert len(reviews) == SIZES['reviews']
+        pairs = {(review['author'], review['title_id']) for review in reviews}
+        assert len(pairs) == len(reviews), (
+            'Проверьте, что автор пишет не больше одного отзыва '
+            'на произведение.'
+        )
+        counts = sorted(review_counts(spec), reverse=True)
+        assert sum(counts[:10]) > sum(counts) * 0.3, (
+            'Проверьте, что популярность произведений неравномерна.'
+        )
+        assert max(counts) <= SIZES['users']
+        assert all(
+            1 <= comment['review_id'] <= SIZES['reviews']
+            for comment in gen_comments(spec)
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19GenerateCommand:
+
+    def test_01_generate_into_database(self):
+        options = {**SIZES, 'seed': 3, 'stdout': io.StringIO()}
+        call_command('gendata', **options)
+        assert User.objects.count() == SIZES['users']
+        assert Review.objects.count() == SIZES['reviews']
+        assert Comment.objects.count() == SIZES['comments']
+        title = Title.objects.filter(review_count__gt=0).first()
+        assert title.rating is not None, (
+            'Проверьте, что после генерации пересчитываются рейтинги.'
+        )
+
+    def test_02_generated_files_import(self, tmp_path):
+        call_command(
+            'gendata', output=str(tmp_path), compress=True, seed=3,
+            stdout=io.StringIO(), **SIZES
+        )
+        assert (tmp_path / 'review.csv.gz').exists()
+        call_command(
+            'importcsv', path=str(tmp_path), workers=0,
+            stdout=io.StringIO(),
+        )
+        assert Review.objects.count() == SIZES['reviews'], (
+            'Проверьте, что файлы gendata загружаются командой importcsv.'
+        )
@@ -0,0 +1,45 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from api.benchmark import compare, run_benchmarks
+from api.urls import router_v1
+
+SIZES = {
+    'users': 50, 'genres': 6, 'categories': 3, 'titles': 30,
+    'reviews': 200, 'comments': 100,
+}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20EndpointBenchmark:
+
+    def test_01_covers_router(self):
+        call_command('gendata', stdout=io.StringIO(), **SIZES)
+        results = run_benchmarks(requests=2)
+        for _, _, basename in router_v1.registry:
+            assert f'{basename}.list' in results, (
+                f'Проверьте, что бенчмарк проходит маршрут {basename}.'
+            )
+        for name in ('title.retrieve', 'title.create', 'title.bulk',
+                     'title.list[genre]', 'review.create', 'comment.list'):
+            assert name in results
+        for name, metrics in results.items():
+            assert metrics['queries'] >= 1, name
+            assert 0 < metrics['p50_ms'] <= metrics['p95_ms'], name
+            assert metrics['alloc_kb'] > 0, name
+
+    def test_02_compare(self):
+        base = {'p50_ms': 5.0, 'p95_ms': 10.0, 'queries': 4,
+                'alloc_kb': 100.0}
+        same = dict(base, p95_ms=10.5)
+        assert compare({'a': same}, {'a': base}) == [], (
+            'Проверьте, что рост в пределах допуска не считается регрессией.'
+        )
+        slower = dict(base, p95_ms=25.0, queries=5, alloc_kb=300.0)
+        assert len(compare({'a': slower}, {'a': base})) == 3, (
+            'Проверьте, что лишний запрос к базе, рост времени и памяти '
+            'сверх допуска считаются регрессиями.'
+        )
+        assert compare({'new': slower}, {'a': base}) == []
@@ -0,0 +1,102 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from rest_framework.serializers import ModelSerializer
+
+from api.timing import RollingHistogram, histograms
+from tests.conftest import FakeClock
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for item in header.split(','):
+        name, *params = item.strip().split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21ServerTiming:
+
+    def test_01_header(self, client, catalog):
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.has_header('Server-Timing'), (
+            'Проверьте, что ответ содержит заголовок Server-Timing.'
+        )
+        metrics = parse_server_timing(response['Server-Timing'])
+        assert set(metrics) == {'db', 'view', 'serialize', 'render',
+                                'total'}
+        assert metrics['db']['desc'].strip('"').split()[0] != '0', (
+            'Проверьте, что в заголовке указано число запросов к базе.'
+        )
+        durations = {name: float(metrics[name]['dur']) for name in metrics}
+        assert durations['total'] >= (
+            durations['view'] + durations['serialize'] + durations['render']
+        )
+        assert durations['view'] + durations['serialize'] >= durations['db']
+
+    def test_02_histograms_per_action(self, client, admin_client,
+                                      user_client, catalog):
+        histograms.reset()
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        title = catalog['titles'][20]
+        response = admin_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 5},
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        snapshot = histograms.snapshot()
+        assert snapshot['TitleViewSet.list']['count'] == 2, (
+            'Проверьте, что время ответа собирается по вьюсету и действию.'
+        )
+        assert snapshot['ReviewViewSet.create']['count'] == 1
+        assert snapshot['ReviewViewSet.create']['queries_mean'] > 0
+
+        response = admin_client.get('/api/v1/timings/')
+        assert response.status_code == HTTPStatus.OK
+        assert 'TitleViewSet.list' in response.json()
+        assert user_client.get('/api/v1/timings/').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), 'Проверьте, что гистограммы доступны только администратору.'
+
+    def test_03_rolling_window(self):
+        clock = FakeClock()
+        histogram = RollingHistogram((10, 100), window=60, slices=6,
+                                     clock=clock)
+        for value in (1, 5, 50, 500):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        assert snapshot['count'] == 4
+        assert snapshot['buckets'] == {'10': 2, '100': 1, '+Inf': 1}
+        assert snapshot['p50_ms'] == 10
+        assert snapshot['p99_ms'] == '+Inf'
+        clock.now = 30
+        histogram.observe(20)
+        assert histogram.snapshot()['count'] == 5
+        clock.now = 65
+        assert histogram.snapshot()['count'] == 1, (
+            'Проверьте, что данные старше окна выпадают из гистограммы.'
+        )
+
+    def test_04_serialize_phase(self, client, catalog, monkeypatch):
+        title = catalog['titles'][0]
+        to_representation = ModelSerializer.to_representation
+
+        def slow(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        # Замедляем представление под замером TimedModelSerializer.
+        monkeypatch.setattr(ModelSerializer, 'to_representation', slow)
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == HTTPStatus.OK
+        metrics = parse_server_timing(response['Server-Timing'])
+        assert float(metrics['serialize']['dur']) >= 150, (
+            'Проверьте, что сериализация DRF замеряется в фазе serialize.'
+        )
+        assert float(metrics['view']['dur']) < 150, (
+            'Проверьте, что время сериализации не входит в фазу view.'
+        )
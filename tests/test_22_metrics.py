@@ -0,0 +1,122 @@
+import multiprocessing
+import sqlite3
+import time
+from http import HTTPStatus
+
+import pytest
+
+from api.metrics import (
+    REQUEST_DURATION,
+    REQUESTS,
+    MetricsBuffer,
+    exposition,
+)
+
+WORKER_LABELS = (('view', 'Worker.list'), ('method', 'GET'), ('status', 200))
+
+
+def flush_in_worker():
+    buffer = MetricsBuffer()
+    buffer.inc(REQUESTS, WORKER_LABELS, 3)
+    buffer.flush()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Metrics:
+
+    def test_01_exposition(self, client, admin_client, user_client,
+                           catalog):
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'metrics', 'email': 'metrics@yamdb.fake',
+        })
+        assert response.status_code == HTTPStatus.OK
+
+        response = admin_client.get('/api/v1/metrics')
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/plain'), (
+            'Проверьте, что метрики отдаются в текстовом формате Prometheus.'
+        )
+        text = response.content.decode()
+        for line in (
+            'yamdb_http_requests_total{view="TitleViewSet.list",'
+            'method="GET",status="200"} 2',
+            '# TYPE yamdb_http_request_duration_seconds histogram',
+            'yamdb_http_request_duration_seconds_count'
+            '{view="TitleViewSet.list"} 2',
+            'yamdb_cache_hit_ratio 0.5',
+            'yamdb_email_send_duration_seconds_count 1',
+        ):
+            assert line in text.splitlines(), (
+                f'Проверьте, что в метриках есть строка `{line}`.'
+            )
+        assert 'yamdb_db_queries_total{view="SignUp.post"}' in text
+        assert user_client.get('/api/v1/metrics').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), 'Проверьте, что метрики доступны только администратору.'
+
+    def test_02_shared_between_processes(self):
+        worker = multiprocessing.get_context('fork').Process(
+            target=flush_in_worker
+        )
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+        buffer = MetricsBuffer()
+        buffer.inc(REQUESTS, WORKER_LABELS, 2)
+        buffer.flush()
+        assert (
+            'yamdb_http_requests_total{view="Worker.list",method="GET",'
+            'status="200"} 5'
+        ) in exposition().splitlines(), (
+            'Проверьте, что счетчики разных процессов складываются.'
+        )
+
+    def test_03_histogram_buckets(self):
+        buffer = MetricsBuffer()
+        for value in (0.004, 0.02, 7):
+            buffer.observe(REQUEST_DURATION, value, (0.005, 0.05, 1),
+                           (('view', 'Test'),))
+        buffer.flush()
+        lines = [
+            line for line in exposition().splitlines()
+            if line.startswith(REQUEST_DURATION)
+        ]
+        assert lines == [
+            f'{REQUEST_DURATION}_bucket{{view="Test",le="0.005"}} 1',
+            f'{REQUEST_DURATION}_bucket{{view="Test",le="0.05"}} 2',
+            f'{REQUEST_DURATION}_bucket{{view="Test",le="1"}} 2',
+            f'{REQUEST_DURATION}_bucket{{view="Test",le="+Inf"}} 3',
+            f'{REQUEST_DURATION}_sum{{view="Test"}} 7.024',
+            f'{REQUEST_DURATION}_count{{view="Test"}} 3',
+        ], 'Проверьте, что корзины гистограммы накопительные.'
+
+    def test_04_request_flush_does_not_wait(self, settings):
+        settings.METRICS_FLUSH_INTERVAL = 0
+        buffer = MetricsBuffer()
+        buffer.inc(REQUESTS, WORKER_LABELS, 4)
+        line = (
+            'yamdb_http_requests_total{view="Worker.list",method="GET",'
+            'status="200"} 4'
+        )
+        other = sqlite3.connect(str(settings.METRICS_DB_PATH),
+                                isolation_level=None)
+        other.execute('BEGIN IMMEDIATE')
+        try:
+            start = time.monotonic()
+            buffer.maybe_flush()
+            assert time.monotonic() - start < 1, (
+                'Проверьте, что сброс из запроса не ждет чужую запись '
+                'в файл метрик.'
+            )
+        finally:
+            other.execute('ROLLBACK')
+            other.close()
+        with buffer._flush_lock:
+            buffer.maybe_flush()
+        assert line not in exposition().splitlines()
+        buffer.maybe_flush()
+        assert line in exposition().splitlines(), (
+            'Проверьте, что несброшенные приращения остаются в буфере.'
+        )
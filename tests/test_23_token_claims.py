@@ -0,0 +1,141 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import TokenCache, access_token_for, token_user
+from tests.conftest import FakeClock, user_queries
+from users.models import TokenUser
+from users.signup import signup
+
+
+def claims_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}')
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23TokenClaims:
+
+    def test_01_token_view_adds_claims(self, client, user):
+        response = client.post('/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': signup(user.username, user.email),
+        })
+        assert response.status_code == HTTPStatus.OK
+        token = AccessToken(response.json()['token'])
+        assert (token['username'], token['role'], token['is_superuser']) == (
+            user.username, user.role, user.is_superuser
+        ), 'Проверьте, что токен содержит username, role и is_superuser.'
+
+    def test_02_reads_without_user_lookup(self, user, catalog):
+        client = claims_client(user)
+        title = catalog['titles'][0]
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{title.id}/'):
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert user_queries(captured) == [], (
+                'Проверьте, что пользователь из claims токена не '
+                'загружается из базы.'
+            )
+
+    def test_03_permissions_from_claims(self, admin, user, catalog):
+        response = claims_client(admin).post(
+            '/api/v1/genres/', data={'name': 'Новый', 'slug': 'new'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        response = claims_client(user).post(
+            '/api/v1/genres/', data={'name': 'Другой', 'slug': 'other'}
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что роль берется из claims токена.'
+        )
+        title = catalog['titles'][20]
+        response = claims_client(user).post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 6},
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == user.username
+        assert title.reviews.get().author_id == user.id
+
+    def test_04_me_and_fallback(self, user, user_client):
+        response = claims_client(user).get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['email'] == user.email, (
+            'Проверьте, что /users/me/ загружает профиль из базы.'
+        )
+        with CaptureQueriesContext(connection) as captured:
+            response = user_client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert user_queries(captured), (
+            'Проверьте, что токен без claims ищет пользователя в базе.'
+        )
+
+    def test_05_token_user_is_not_saved(self, user):
+        token = access_token_for(user)
+        built = token_user(token)
+        assert isinstance(built, TokenUser)
+        assert built == user
+        with pytest.raises(TypeError, match='только для чтения'):
+            built.save()
+
+    def test_06_writes_load_user(self, admin, user, catalog):
+        title = catalog['titles'][20]
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data = {'text': 'Отзыв', 'score': 6}
+        client = claims_client(user)
+        user.is_active = False
+        user.save()
+        response = client.post(url, data=data)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что неактивный пользователь не может писать '
+            'по старому токену.'
+        )
+        user.delete()
+        response = client.post(url, data=data)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удаленного пользователя дает 401, '
+            'а не ошибку внешнего ключа.'
+        )
+        assert not title.reviews.exists()
+        client = claims_client(admin)
+        admin.role = user.role
+        admin.save()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.post(
+                '/api/v1/genres/', data={'name': 'Новый', 'slug': 'new'}
+            )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что запись проверяет текущую роль из базы.'
+        )
+        assert len(user_queries(captured)) == 1
+
+
+class Test23TokenCache:
+
+    @override_settings(TOKEN_CACHE_SIZE=2, TOKEN_CACHE_TTL=60)
+    def test_01_lru_and_ttl(self):
+        clock = FakeClock(1000.0)
+        cache = TokenCache(clock)
+        cache.set('a', 1, clock.now + 600)
+        cache.set('b', 2, clock.now + 600)
+        assert cache.get('a') == 1
+        cache.set('c', 3, clock.now + 600)
+        assert cache.get('b') is None, (
+            'Проверьте, что из кэша вытесняется давно не читанный токен.'
+        )
+        assert cache.get('a') == 1
+        cache.set('short', 4, clock.now + 10)
+        clock.now += 30
+        assert cache.get('short') is None, (
+            'Проверьте, что запись не живет дольше самого токена.'
+        )
+        clock.now += 40
+        assert cache.get('a') is None
@@ -0,0 +1,107 @@
+import io
+from datetime import timedelta
+from http import HTTPStatus
+from smtplib import SMTPException
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from users import outbox
+from users.models import EmailStatus, OutgoingEmail
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+
+    def send_messages(self, messages):
+        raise SMTPException('Сервер недоступен')
+
+
+def signup(client, username):
+    response = client.post(SIGNUP_URL, data={
+        'username': username, 'email': f'{username}@yamdb.fake',
+    })
+    assert response.status_code == HTTPStatus.OK
+    return OutgoingEmail.objects.get(recipient=f'{username}@yamdb.fake')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24EmailOutbox:
+
+    def test_01_signup_only_enqueues(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        settings.EMAIL_OUTBOX_THREADS = 0
+        email = signup(client, 'queued')
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо в запросе.'
+        )
+        assert email.status == EmailStatus.PENDING
+        out = io.StringIO()
+        call_command('sendoutbox', stdout=out)
+        assert 'Отправлено: 1' in out.getvalue()
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['queued@yamdb.fake']
+        email.refresh_from_db()
+        assert email.status == EmailStatus.SENT
+        assert email.sent_at is not None
+
+    def test_02_batch_reuses_connection(self, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        settings.EMAIL_OUTBOX_THREADS = 0
+        settings.EMAIL_BACKEND = 'tests.test_24_email_outbox.CountingBackend'
+        outbox.enqueue('Тема', 'Текст', [
+            f'user{idx}@yamdb.fake' for idx in range(5)
+        ])
+        CountingBackend.opened = 0
+        assert outbox.send_pending(batch_size=10) == (5, 0)
+        assert len(mail.outbox) == 5
+        assert CountingBackend.opened == 1, (
+            'Проверьте, что пачка писем уходит через одно соединение.'
+        )
+
+    def test_03_retry_with_backoff(self, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        settings.EMAIL_OUTBOX_THREADS = 0
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        settings.EMAIL_BACKEND = 'tests.test_24_email_outbox.FailingBackend'
+        outbox.enqueue('Тема', 'Текст', ['retry@yamdb.fake'])
+        assert outbox.send_pending() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.status == EmailStatus.PENDING
+        assert email.attempts == 1
+        assert 'Сервер недоступен' in email.last_error
+        delay = email.next_attempt_at - timezone.now()
+        assert timedelta(seconds=settings.EMAIL_OUTBOX_BACKOFF - 5) < delay
+        assert outbox.send_pending() == (0, 0), (
+            'Проверьте, что повтор откладывается до следующей попытки.'
+        )
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert outbox.send_pending() == (0, 1)
+        email.refresh_from_db()
+        assert email.status == EmailStatus.FAILED, (
+            'Проверьте, что после EMAIL_OUTBOX_MAX_ATTEMPTS попыток письмо '
+            'помечается как неотправленное.'
+        )
+
+    def test_04_background_pool(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        settings.EMAIL_OUTBOX_THREADS = 1
+        email = signup(client, 'pooled')
+        # Пул из одного потока: эта задача выполнится после той,
+        # что поставила регистрация.
+        outbox.drain_in_background().result(timeout=30)
+        email.refresh_from_db()
+        assert email.status == EmailStatus.SENT
+        assert len(mail.outbox) == 1
@@ -0,0 +1,111 @@
+from http import HTTPStatus
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmark import signup_throughput
+from tests.conftest import user_queries
+from users.models import User
+from users.signup import redeem, signup
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+DATA = {'username': 'upsert', 'email': 'upsert@yamdb.fake'}
+
+
+def get_token(client, code):
+    return client.post(TOKEN_URL, data={
+        'username': DATA['username'], 'confirmation_code': code,
+    })
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25SignupUpsert:
+
+    def test_01_single_statement(self, client):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.post(SIGNUP_URL, data=DATA)
+        assert response.status_code == HTTPStatus.OK
+        queries = user_queries(captured)
+        assert len(queries) == 1 and queries[0].startswith('INSERT'), (
+            'Проверьте, что регистрация записывает пользователя и код '
+            'одним запросом.'
+        )
+        user = User.objects.get(username=DATA['username'])
+        assert user.email == DATA['email']
+        assert user.confirmation_code
+
+    def test_02_new_code_for_existing_user(self, client):
+        client.post(SIGNUP_URL, data=DATA)
+        old_code = User.objects.get().confirmation_code
+        response = client.post(SIGNUP_URL, data=DATA)
+        assert response.status_code == HTTPStatus.OK
+        new_code = User.objects.get().confirmation_code
+        assert new_code != old_code, (
+            'Проверьте, что повторная регистрация выдает новый код.'
+        )
+        assert get_token(client, old_code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        )
+        with CaptureQueriesContext(connection) as captured:
+            response = get_token(client, new_code)
+        assert response.status_code == HTTPStatus.OK
+        assert len(user_queries(captured)) == 1, (
+            'Проверьте, что выдача токена читает пользователя один раз.'
+        )
+
+    def test_03_conflicts(self, client):
+        client.post(SIGNUP_URL, data=DATA)
+        code = User.objects.get().confirmation_code
+        response = client.post(SIGNUP_URL, data={
+            'username': DATA['username'], 'email': 'other@yamdb.fake',
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.post(SIGNUP_URL, data={
+            'username': 'other', 'email': DATA['email'],
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert User.objects.count() == 1
+        assert User.objects.get().confirmation_code == code, (
+            'Проверьте, что чужой email не меняет код пользователя.'
+        )
+
+    def test_04_fallback_and_throughput(self):
+        code = signup('legacy', 'legacy@yamdb.fake', use_upsert=False)
+        assert User.objects.get(username='legacy').confirmation_code == code
+        result = signup_throughput(threads=1, signups=5)
+        assert result['signups'] == 5
+        assert result['errors'] == {}
+        assert User.objects.filter(username__startswith='signup').count() == 5
+
+    @pytest.mark.parametrize('use_returning', (True, False))
+    def test_05_code_is_single_use_and_expires(self, settings,
+                                               use_returning):
+        code = signup(DATA['username'], DATA['email'])
+        user = redeem(DATA['username'], code, use_returning)
+        assert user is not None and user.username == DATA['username']
+        assert redeem(DATA['username'], code, use_returning) is None, (
+            'Проверьте, что код подтверждения действует один раз.'
+        )
+        code = signup(DATA['username'], DATA['email'])
+        assert redeem(DATA['username'], 'wrong', use_returning) is None
+        User.objects.update(confirmation_code_issued=(
+            User.objects.get().confirmation_code_issued
+            - timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT + 1)
+        ))
+        assert redeem(DATA['username'], code, use_returning) is None, (
+            'Проверьте, что код старше PASSWORD_RESET_TIMEOUT не '
+            'принимается.'
+        )
+
+    def test_06_token_clears_code(self, client):
+        client.post(SIGNUP_URL, data=DATA)
+        code = User.objects.get().confirmation_code
+        assert get_token(client, code).status_code == HTTPStatus.OK
+        assert get_token(client, code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        ), 'Проверьте, что код, по которому выдан токен, нельзя использовать снова.'
+        assert User.objects.get().confirmation_code is None
@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.throttling import store, take
+from reviews.models import Title
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+
+
+def set_rates(settings, **rates):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates,
+    }
+
+
+def signup(client, username, ip='127.0.0.1'):
+    return client.post(SIGNUP_URL, data={
+        'username': username, 'email': f'{username}@yamdb.fake',
+    }, REMOTE_ADDR=ip)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26Throttling:
+
+    def test_01_signup_per_ip(self, client, settings):
+        set_rates(settings, auth_ip='3/min')
+        for idx in range(3):
+            assert signup(client, f'bot{idx}').status_code == HTTPStatus.OK
+        response = signup(client, 'bot3')
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что регистрация ограничена по IP.'
+        )
+        assert int(response['Retry-After']) > 0
+        assert signup(client, 'bot3', ip='10.0.0.2').status_code == (
+            HTTPStatus.OK
+        ), 'Проверьте, что у другого IP своя корзина.'
+
+    def test_02_token_per_ip_and_username(self, client, settings):
+        set_rates(settings, auth_user='2/min')
+
+        def get_token(ip, username='Victim'):
+            return client.post(TOKEN_URL, data={
+                'username': username, 'confirmation_code': 'guess',
+            }, REMOTE_ADDR=ip).status_code
+
+        statuses = [get_token('10.0.0.1') for _ in range(3)]
+        assert HTTPStatus.TOO_MANY_REQUESTS not in statuses[:2]
+        assert statuses[2] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что подбор кода ограничен по IP и username.'
+        )
+        assert get_token('10.0.0.1', 'other') != (
+            HTTPStatus.TOO_MANY_REQUESTS
+        )
+        assert get_token('10.0.0.2') != HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что чужой IP не может исчерпать корзину username.'
+        )
+
+    @pytest.mark.parametrize('use_upsert', (True, False))
+    def test_03_bucket_refills(self, use_upsert):
+        buckets = [('test:refill', '2/min')]
+        assert take(buckets, 0, use_upsert) is None
+        assert take(buckets, 0, use_upsert) is None
+        assert take(buckets, 0, use_upsert) == pytest.approx(30)
+        assert take(buckets, 15, use_upsert) == pytest.approx(15), (
+            'Проверьте, что отказ не списывает токен.'
+        )
+        assert take(buckets, 30, use_upsert) is None
+
+    def test_04_review_create_per_user(
+        self, settings, catalog, user_client, admin_client
+    ):
+        set_rates(settings, create_user='1/min')
+        first, second = Title.objects.order_by('-id')[:2]
+        url = '/api/v1/titles/{}/reviews/'
+        data = {'text': 'Отзыв', 'score': 5}
+        response = user_client.post(url.format(first.id), data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        response = user_client.post(url.format(second.id), data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что создание отзывов ограничено по автору.'
+        )
+        assert user_client.get(url.format(first.id)).status_code == (
+            HTTPStatus.OK
+        ), 'Проверьте, что чтение отзывов не ограничено.'
+        response = admin_client.post(url.format(second.id), data=data)
+        assert response.status_code == HTTPStatus.CREATED
+
+    def test_05_unavailable_store_allows(self, client, settings, tmp_path,
+                                         caplog):
+        set_rates(settings, auth_ip='1/min')
+        settings.THROTTLE_DB_PATH = tmp_path
+        for idx in range(2):
+            assert signup(client, f'open{idx}').status_code == HTTPStatus.OK
+        assert any(
+            record.levelname == 'WARNING' and record.name == 'api.throttling'
+            for record in caplog.records
+        ), 'Проверьте, что пропуск запроса без ограничения пишется в лог.'
+
+    def test_06_idle_buckets_expire(self, settings):
+        settings.THROTTLE_EXPIRE_SHARE = 1
+        take([('test:idle', '2/min')], now=0)
+        take([('test:active', '2/min')], now=10)
+        take([('test:active', '2/min')], now=50)
+        take([('test:other', '2/min')], now=61)
+        keys = {key for key, in store.read('SELECT key FROM token_buckets')}
+        assert keys == {'test:active', 'test:other'}, (
+            'Проверьте, что удаляются только корзины, простоявшие дольше '
+            'capacity / rate.'
+        )
+
+    @pytest.mark.parametrize('use_upsert', (True, False))
+    def test_07_denied_request_keeps_tokens(self, use_upsert):
+        wide, narrow = ('test:wide', '100/min'), ('test:narrow', '1/min')
+        assert take([wide, narrow], 0, use_upsert) is None
+        for _ in range(2):
+            assert take([wide, narrow], 0, use_upsert) == pytest.approx(60)
+        tokens, = store.read(
+            'SELECT tokens FROM token_buckets WHERE key = ?', (wide[0],)
+        )[0]
+        assert tokens == 99, (
+            'Проверьте, что отказ одной корзины не списывает токены '
+            'из остальных.'
+        )